@@ -0,0 +1,67 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by the old create_all startup already have these tables
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "company" not in existing:
+        op.create_table(
+            "company",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("contact_person", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+    if "document" not in existing:
+        op.create_table(
+            "document",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("company.id"), nullable=True),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("doc_type", sa.String(), nullable=False),
+            sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+            sa.Column("ocr_text", sa.String(), nullable=True),
+            sa.Column("parsed_json", sa.String(), nullable=True),
+        )
+
+    if "match" not in existing:
+        op.create_table(
+            "match",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("company.id"), nullable=True),
+            sa.Column("po_id", sa.Integer(), sa.ForeignKey("document.id"), nullable=True),
+            sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("document.id"), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("mismatches", sa.String(), nullable=True),
+            sa.Column("fraud_flags", sa.String(), nullable=True),
+            sa.Column("confidence_score", sa.Float(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("match")
+    op.drop_table("document")
+    op.drop_table("company")
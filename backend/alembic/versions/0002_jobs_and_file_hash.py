@@ -0,0 +1,50 @@
+"""job table and document.file_hash
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    document_columns = {c["name"] for c in inspector.get_columns("document")}
+    if "file_hash" not in document_columns:
+        op.add_column("document", sa.Column("file_hash", sa.String(), nullable=True))
+
+    if "job" not in inspector.get_table_names():
+        op.create_table(
+            "job",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("kind", sa.String(), nullable=False),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("document.id"), nullable=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("company.id"), nullable=True),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("progress", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("result", sa.String(), nullable=True),
+            sa.Column("error", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("job")
+    with op.batch_alter_table("document") as batch_op:
+        batch_op.drop_column("file_hash")
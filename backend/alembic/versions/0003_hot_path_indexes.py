@@ -0,0 +1,40 @@
+"""indexes for document listing, match lookups and job polling
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_document_company_uploaded", "document", ["company_id", "uploaded_at", "id"]),
+    ("ix_document_company_type", "document", ["company_id", "doc_type"]),
+    ("ix_document_file_hash", "document", ["file_hash"]),
+    ("ix_match_company_created", "match", ["company_id", "created_at"]),
+    ("ix_match_po_invoice", "match", ["po_id", "invoice_id"]),
+    ("ix_match_invoice", "match", ["invoice_id"]),
+    ("ix_job_status", "job", ["status"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,102 @@
+"""native JSON columns for parsed data and match results
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from backend.app.utils import json_codec
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ("document", "parsed_json"),
+    ("match", "mismatches"),
+    ("match", "fraud_flags"),
+]
+
+BATCH_SIZE = 500
+
+
+def _compact_rows(bind, table_name: str, column_name: str) -> None:
+    """
+    Rewrite pretty-printed JSON text compactly, in id order and in batches.
+    Values that were never valid JSON are kept as JSON strings, and a stored
+    "null" becomes SQL NULL so `IS NULL` filters keep working.
+    """
+    table = sa.table(table_name, sa.column("id", sa.Integer()), sa.column(column_name, sa.Text()))
+    column = table.c[column_name]
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, column)
+            .where(table.c.id > last_id, column.is_not(None))
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, raw in rows:
+            try:
+                value = json.loads(raw)
+            except (TypeError, ValueError):
+                value = raw
+            compact = json_codec.dumps(value) if value is not None else None
+            if compact != raw:
+                updates.append({"row_id": row_id, "value": compact})
+
+        if updates:
+            bind.execute(
+                table.update().where(table.c.id == sa.bindparam("row_id")).values({column_name: sa.bindparam("value")}),
+                updates
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # Rows must be valid JSON before the type change (Postgres casts them)
+    for table_name, column_name in COLUMNS:
+        _compact_rows(bind, table_name, column_name)
+
+    for table_name in ("document", "match"):
+        with op.batch_alter_table(table_name) as batch_op:
+            for name in [c for t, c in COLUMNS if t == table_name]:
+                batch_op.alter_column(
+                    name,
+                    type_=sa.JSON(none_as_null=True),
+                    existing_type=sa.String(),
+                    existing_nullable=True,
+                    postgresql_using=f"{name}::json"
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in ("match", "document"):
+        with op.batch_alter_table(table_name) as batch_op:
+            for name in [c for t, c in COLUMNS if t == table_name]:
+                batch_op.alter_column(
+                    name,
+                    type_=sa.String(),
+                    existing_type=sa.JSON(none_as_null=True),
+                    existing_nullable=True,
+                    postgresql_using=f"{name}::text"
+                )
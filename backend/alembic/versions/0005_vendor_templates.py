@@ -0,0 +1,48 @@
+"""vendor templates for rule-based parsing
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if "vendortemplate" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "vendortemplate",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("vendor_key", sa.String(), nullable=False),
+            sa.Column("doc_type", sa.String(), nullable=False),
+            sa.Column("vendor_name", sa.String(), nullable=True),
+            sa.Column("vendor_gstin", sa.String(), nullable=True),
+            sa.Column("currency", sa.String(), nullable=True),
+            sa.Column("fields", sa.JSON(none_as_null=True), nullable=True),
+            sa.Column("taxes", sa.JSON(none_as_null=True), nullable=True),
+            sa.Column("item_pattern", sa.String(), nullable=False),
+            sa.Column("source_document_id", sa.Integer(), sa.ForeignKey("document.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index(
+        "ix_vendortemplate_vendor_doc_type", "vendortemplate", ["vendor_key", "doc_type"],
+        unique=True, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_vendortemplate_vendor_doc_type", table_name="vendortemplate", if_exists=True)
+    op.drop_table("vendortemplate")
@@ -0,0 +1,32 @@
+"""match.fingerprint for incremental re-matching
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows keep NULL: their first re-match after a re-parse recomputes them
+    match_columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("match")}
+    if "fingerprint" not in match_columns:
+        op.add_column("match", sa.Column("fingerprint", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("match") as batch_op:
+        batch_op.drop_column("fingerprint")
@@ -0,0 +1,164 @@
+"""typed, indexed document header columns copied from parsed_json
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+import re
+from datetime import date, datetime
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ("doc_number", sa.String()),
+    ("doc_date", sa.Date()),
+    ("vendor_name", sa.String()),
+    ("vendor_gstin", sa.String()),
+    ("grand_total", sa.Float()),
+    ("currency", sa.String()),
+]
+
+INDEXES = [
+    ("ix_document_company_vendor", ["company_id", "vendor_name"]),
+    ("ix_document_company_date", ["company_id", "doc_date"]),
+    ("ix_document_company_total", ["company_id", "grand_total"]),
+    ("ix_document_company_number", ["company_id", "doc_number"]),
+    ("ix_document_vendor_gstin", ["vendor_gstin"]),
+]
+
+BATCH_SIZE = 500
+
+
+# ---------------------------------------------------------
+# Frozen copy of validation.header_fields (and the helpers it uses) as of
+# this revision, so the backfill doesn't change when the app's parsing does
+# ---------------------------------------------------------
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%B-%Y", "%b %d, %Y", "%B %d, %Y",
+)
+
+_AMOUNT_NOISE = re.compile(r"[^\d.\-]")
+
+
+def _parse_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+
+    text = value.strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    cleaned = _AMOUNT_NOISE.sub("", value).strip(".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _clean_text(value, max_length: int = 255) -> Optional[str]:
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text[:max_length] or None
+
+
+def header_fields(parsed) -> dict:
+    parsed = parsed if isinstance(parsed, dict) else {}
+    currency = _clean_text(parsed.get("currency"), max_length=8)
+    gstin = _clean_text(parsed.get("vendor_gstin"), max_length=32)
+    return {
+        "doc_number": _clean_text(parsed.get("doc_number"), max_length=64),
+        "doc_date": _parse_date(parsed.get("date")),
+        "vendor_name": _clean_text(parsed.get("vendor_name")),
+        "vendor_gstin": gstin.upper().replace(" ", "") if gstin else None,
+        "grand_total": _parse_amount(parsed.get("grand_total")),
+        "currency": currency.upper() if currency else None,
+    }
+
+
+def _backfill(bind) -> None:
+    """
+    Fill the header columns of every parsed document, in id order and in batches.
+    """
+    table = sa.table(
+        "document",
+        sa.column("id", sa.Integer()),
+        sa.column("parsed_json", sa.JSON(none_as_null=True)),
+        *[sa.column(name, type_) for name, type_ in COLUMNS]
+    )
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.parsed_json)
+            .where(table.c.id > last_id, table.c.parsed_json.is_not(None))
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        updates = [{"row_id": row_id, **header_fields(parsed)} for row_id, parsed in rows]
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam("row_id")).values(
+                {name: sa.bindparam(name) for name, _ in COLUMNS}
+            ),
+            updates
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    existing = {c["name"] for c in sa.inspect(bind).get_columns("document")}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            op.add_column("document", sa.Column(name, type_, nullable=True))
+
+    for name, columns in INDEXES:
+        op.create_index(name, "document", columns, if_not_exists=True)
+
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="document", if_exists=True)
+    with op.batch_alter_table("document") as batch_op:
+        for name, _ in COLUMNS:
+            batch_op.drop_column(name)
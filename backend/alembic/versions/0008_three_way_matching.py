@@ -0,0 +1,42 @@
+"""match.delivery_id and match.line_variances for three-way matching
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    match_columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("match")}
+
+    # Batch mode so SQLite gets the foreign key (it can't ALTER one in)
+    with op.batch_alter_table("match") as batch_op:
+        if "delivery_id" not in match_columns:
+            batch_op.add_column(sa.Column("delivery_id", sa.Integer(), nullable=True))
+            batch_op.create_foreign_key("fk_match_delivery_id_document", "document", ["delivery_id"], ["id"])
+        if "line_variances" not in match_columns:
+            batch_op.add_column(sa.Column("line_variances", sa.JSON(none_as_null=True), nullable=True))
+
+    op.create_index("ix_match_delivery", "match", ["delivery_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_match_delivery", table_name="match", if_exists=True)
+    with op.batch_alter_table("match") as batch_op:
+        batch_op.drop_constraint("fk_match_delivery_id_document", type_="foreignkey")
+        batch_op.drop_column("line_variances")
+        batch_op.drop_column("delivery_id")
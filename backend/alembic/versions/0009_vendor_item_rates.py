@@ -0,0 +1,187 @@
+"""per-vendor item rate history, backfilled from parsed invoices
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00
+
+"""
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 500
+
+
+# ---------------------------------------------------------
+# Frozen copy of rate_stats.accumulate_rates (and what it uses) as of this
+# revision, so the backfill doesn't change when the app's statistics do
+# ---------------------------------------------------------
+RECENT_WINDOW = 50
+QUANTILES = (0.05, 0.5, 0.95)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_AMOUNT_NOISE = re.compile(r"[^\d.\-]")
+
+
+class _Stats:
+    def __init__(self):
+        self.count, self.mean, self.m2, self.recent = 0, 0.0, 0.0, []
+        self.q_low = self.q_median = self.q_high = None
+
+
+def _normalize_key(value) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value or "").lower())
+
+
+def _parse_amount(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(_AMOUNT_NOISE.sub("", value).strip("."))
+    except ValueError:
+        return None
+
+
+def _item_rates(parsed) -> List[Tuple[str, str, float]]:
+    if not isinstance(parsed, dict):
+        return []
+    vendor = _normalize_key(parsed.get("vendor_gstin")) or _normalize_key(parsed.get("vendor_name"))
+    if not vendor:
+        return []
+
+    rates = []
+    for item in parsed.get("items") or []:
+        if not isinstance(item, dict):
+            continue
+        key = " ".join(_WORD_RE.findall(str(item.get("description") or "").lower()))[:255]
+        rate = _parse_amount(item.get("rate"))
+        if rate is None:
+            qty, total = _parse_amount(item.get("qty")), _parse_amount(item.get("line_total"))
+            rate = total / qty if qty and total is not None else None
+        if key and rate is not None and math.isfinite(rate) and rate > 0:
+            rates.append((vendor, key, rate))
+    return rates
+
+
+def _quantiles(values) -> List[float]:
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    result = []
+    for q in QUANTILES:
+        position = last * q
+        low = int(position)
+        high = min(low + 1, last)
+        result.append(ordered[low] + (ordered[high] - ordered[low]) * (position - low))
+    return result
+
+
+def accumulate_rates(documents) -> Dict[Tuple[int, str, str], _Stats]:
+    stats: Dict[Tuple[int, str, str], _Stats] = {}
+    for company_id, parsed in documents:
+        for vendor, item, rate in _item_rates(parsed):
+            s = stats.setdefault((company_id, vendor, item), _Stats())
+            s.count += 1
+            delta = rate - s.mean
+            s.mean += delta / s.count
+            s.m2 += delta * (rate - s.mean)
+            s.recent = (s.recent + [rate])[-RECENT_WINDOW:]
+
+    for s in stats.values():
+        s.q_low, s.q_median, s.q_high = _quantiles(s.recent)
+    return stats
+
+
+def _parsed_invoices(bind):
+    """
+    (company_id, parsed_json) of every parsed invoice, in id order and in batches.
+    """
+    document = sa.table(
+        "document",
+        sa.column("id", sa.Integer()),
+        sa.column("company_id", sa.Integer()),
+        sa.column("doc_type", sa.String()),
+        sa.column("parsed_json", sa.JSON(none_as_null=True)),
+    )
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(document.c.id, document.c.company_id, document.c.parsed_json)
+            .where(document.c.id > last_id, document.c.doc_type == "INVOICE", document.c.parsed_json.is_not(None))
+            .order_by(document.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for _, company_id, parsed in rows:
+            yield company_id, parsed
+        last_id = rows[-1][0]
+
+
+def _backfill(bind, table) -> None:
+    """
+    Rate statistics for the invoices parsed before the history existed;
+    from here on crud.update_document_parsed keeps them up to date.
+    """
+    stats = accumulate_rates(_parsed_invoices(bind))
+    if not stats:
+        return
+
+    now = sa.func.now()
+    rows = [
+        {"company_id": company_id, "vendor_key": vendor, "item_key": item, "count": s.count, "mean": s.mean,
+         "m2": s.m2, "recent": s.recent, "q_low": s.q_low, "q_median": s.q_median, "q_high": s.q_high}
+        for (company_id, vendor, item), s in stats.items()
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(table.insert().values(updated_at=now), rows[start:start + BATCH_SIZE])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if "vendoritemrate" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "vendoritemrate",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("company.id"), nullable=True),
+            sa.Column("vendor_key", sa.String(), nullable=False),
+            sa.Column("item_key", sa.String(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.Column("mean", sa.Float(), nullable=False),
+            sa.Column("m2", sa.Float(), nullable=False),
+            sa.Column("recent", sa.JSON(none_as_null=True), nullable=True),
+            sa.Column("q_low", sa.Float(), nullable=True),
+            sa.Column("q_median", sa.Float(), nullable=True),
+            sa.Column("q_high", sa.Float(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index(
+        "ix_vendoritemrate_company_vendor_item", "vendoritemrate", ["company_id", "vendor_key", "item_key"],
+        unique=True, if_not_exists=True
+    )
+
+    table = sa.Table("vendoritemrate", sa.MetaData(), autoload_with=bind)
+    if bind.execute(sa.select(sa.func.count()).select_from(table)).scalar() == 0:
+        _backfill(bind, table)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_vendoritemrate_company_vendor_item", table_name="vendoritemrate", if_exists=True)
+    op.drop_table("vendoritemrate")
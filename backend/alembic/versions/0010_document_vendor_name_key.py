@@ -0,0 +1,77 @@
+"""lower-cased document.vendor_name_key for indexed vendor prefix search
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 500
+
+
+def _search_key(vendor_name):
+    # Frozen copy of validation.vendor_search_key at this revision.
+    # Lower-cased in Python, not with SQL lower(): SQLite's only folds ASCII
+    text = " ".join(str(vendor_name).split()) if vendor_name is not None else ""
+    return text[:255].lower() or None
+
+
+def _backfill(bind) -> None:
+    """
+    Fill vendor_name_key from vendor_name for every document that has one,
+    in id order and in batches.
+    """
+    table = sa.table(
+        "document",
+        sa.column("id", sa.Integer()),
+        sa.column("vendor_name", sa.String()),
+        sa.column("vendor_name_key", sa.String()),
+    )
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.vendor_name)
+            .where(table.c.id > last_id, table.c.vendor_name.is_not(None))
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam("row_id")).values(
+                vendor_name_key=sa.bindparam("key")
+            ),
+            [{"row_id": row_id, "key": _search_key(name)} for row_id, name in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if "vendor_name_key" not in {c["name"] for c in sa.inspect(bind).get_columns("document")}:
+        op.add_column("document", sa.Column("vendor_name_key", sa.String(), nullable=True))
+    op.create_index("ix_document_company_vendor_key", "document", ["company_id", "vendor_name_key"],
+                    if_not_exists=True)
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_document_company_vendor_key", table_name="document", if_exists=True)
+    with op.batch_alter_table("document") as batch_op:
+        batch_op.drop_column("vendor_name_key")
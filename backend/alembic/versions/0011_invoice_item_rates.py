@@ -0,0 +1,155 @@
+"""per-invoice item rates for the recent window, in place of vendoritemrate's stored window and quantiles
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 00:00:00
+
+"""
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, Sequence[str], None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 500
+WINDOW_COLUMNS = ("recent", "q_low", "q_median", "q_high")
+
+
+# ---------------------------------------------------------
+# Frozen copy of rate_stats.item_rates / rates_by_item as of this revision
+# ---------------------------------------------------------
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_AMOUNT_NOISE = re.compile(r"[^\d.\-]")
+
+
+def _normalize_key(value) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value or "").lower())
+
+
+def _parse_amount(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(_AMOUNT_NOISE.sub("", value).strip("."))
+    except ValueError:
+        return None
+
+
+def _item_rates(parsed) -> List[Tuple[str, str, float]]:
+    if not isinstance(parsed, dict):
+        return []
+    vendor = _normalize_key(parsed.get("vendor_gstin")) or _normalize_key(parsed.get("vendor_name"))
+    if not vendor:
+        return []
+
+    rates = []
+    for item in parsed.get("items") or []:
+        if not isinstance(item, dict):
+            continue
+        key = " ".join(_WORD_RE.findall(str(item.get("description") or "").lower()))[:255]
+        rate = _parse_amount(item.get("rate"))
+        if rate is None:
+            qty, total = _parse_amount(item.get("qty")), _parse_amount(item.get("line_total"))
+            rate = total / qty if qty and total is not None else None
+        if key and rate is not None and math.isfinite(rate) and rate > 0:
+            rates.append((vendor, key, rate))
+    return rates
+
+
+def _rates_by_item(rates) -> Dict[str, List[float]]:
+    grouped: Dict[str, List[float]] = {}
+    for _, item, rate in rates:
+        grouped.setdefault(item, []).append(rate)
+    return grouped
+
+
+def _backfill(bind, table) -> None:
+    """
+    One row of item rates per parsed invoice, in id order and in batches;
+    from here on crud.update_document_parsed keeps them up to date.
+    """
+    document = sa.table(
+        "document",
+        sa.column("id", sa.Integer()),
+        sa.column("company_id", sa.Integer()),
+        sa.column("doc_type", sa.String()),
+        sa.column("parsed_json", sa.JSON(none_as_null=True)),
+    )
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(document.c.id, document.c.company_id, document.c.parsed_json)
+            .where(document.c.id > last_id, document.c.doc_type == "INVOICE", document.c.parsed_json.is_not(None))
+            .order_by(document.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        values = []
+        for document_id, company_id, parsed in rows:
+            rates = _item_rates(parsed)
+            if rates:
+                values.append({"document_id": document_id, "company_id": company_id, "vendor_key": rates[0][0],
+                               "rates": _rates_by_item(rates)})
+        if values:
+            bind.execute(table.insert(), values)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if "invoiceitemrates" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "invoiceitemrates",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("document.id"), nullable=False),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("company.id"), nullable=True),
+            sa.Column("vendor_key", sa.String(), nullable=False),
+            sa.Column("rates", sa.JSON(), nullable=False),
+            sqlite_autoincrement=True,
+        )
+    op.create_index("ix_invoiceitemrates_document", "invoiceitemrates", ["document_id"], unique=True,
+                    if_not_exists=True)
+    op.create_index(
+        "ix_invoiceitemrates_company_vendor_document", "invoiceitemrates", ["company_id", "vendor_key", "document_id"],
+        if_not_exists=True
+    )
+
+    table = sa.Table("invoiceitemrates", sa.MetaData(), autoload_with=bind)
+    if bind.execute(sa.select(sa.func.count()).select_from(table)).scalar() == 0:
+        _backfill(bind, table)
+
+    # The window and its quantiles are now read from invoiceitemrates
+    existing = {c["name"] for c in sa.inspect(bind).get_columns("vendoritemrate")}
+    with op.batch_alter_table("vendoritemrate") as batch_op:
+        for name in WINDOW_COLUMNS:
+            if name in existing:
+                batch_op.drop_column(name)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Left empty: `python -m backend.app.services.price_history` refills them
+    with op.batch_alter_table("vendoritemrate") as batch_op:
+        batch_op.add_column(sa.Column("recent", sa.JSON(none_as_null=True), nullable=True))
+        for name in WINDOW_COLUMNS[1:]:
+            batch_op.add_column(sa.Column(name, sa.Float(), nullable=True))
+    op.drop_index("ix_invoiceitemrates_company_vendor_document", table_name="invoiceitemrates", if_exists=True)
+    op.drop_index("ix_invoiceitemrates_document", table_name="invoiceitemrates", if_exists=True)
+    op.drop_table("invoiceitemrates")
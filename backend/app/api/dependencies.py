@@ -0,0 +1,118 @@
+import logging
+import threading
+from typing import Dict
+from fastapi import Request
+from backend.app.services.ocr_adapter import OCRService
+from backend.app.services.llm_adapter import LLMService
+from backend.app.services.parser import ParserService
+from backend.app.services.storage import StorageService, get_storage
+from backend.app.services.report import ReportService
+from backend.app.services.matcher import MatcherService
+from backend.app.services.price_history import PriceHistoryService
+from backend.app.services.rematch import RematchService
+from backend.app.services.vendor_templates import VendorTemplateService, get_template_service
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Application-scoped services, built once per process and shared by all requests.
+    Services hold pooled clients (boto3, LLM HTTP client) and caches, so
+    building them per request would throw those away every time.
+    """
+
+    def __init__(self):
+        self.storage = get_storage()
+        self.ocr = OCRService()
+        self.llm = LLMService()
+        self.templates = get_template_service()
+        self.parser = ParserService(ocr=self.ocr, llm=self.llm, templates=self.templates)
+        self.report = ReportService()
+        self.matcher = MatcherService()
+        self.price_history = PriceHistoryService()
+        self.rematch = RematchService(matcher=self.matcher, history=self.price_history)
+
+        self.ready = False
+        self.warmup_errors: Dict[str, str] = {}
+
+    # ------------------------------------------------------
+    # Warm-up (runs once at startup, off the event loop)
+    # ------------------------------------------------------
+    def warm_up(self):
+        """
+        Touch every expensive resource once so the first request doesn't pay for it.
+        Failures are recorded but don't block readiness: a missing Tesseract
+        only matters for image uploads, a down S3 only for S3 mode.
+        """
+        steps = {
+            "ocr": self.ocr.warm_up,
+            "llm": self.llm.warm_up,
+            "storage": self.storage.warm_up,
+            "templates": self.templates.warm_up,
+        }
+        for name, step in steps.items():
+            try:
+                step()
+            except Exception as e:
+                logger.warning("%s warm-up failed: %s", name, e)
+                self.warmup_errors[name] = str(e)
+
+        self.ready = True
+
+
+_fallback: ServiceContainer = None
+_fallback_lock = threading.Lock()
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """
+    The container built by the app lifespan. Falls back to a lazily built
+    process-wide container when the lifespan didn't run (e.g. TestClient
+    used without a `with` block).
+    """
+    container = getattr(request.app.state, "services", None)
+    if container is not None:
+        return container
+
+    global _fallback
+    with _fallback_lock:
+        if _fallback is None:
+            _fallback = ServiceContainer()
+            _fallback.warm_up()
+        return _fallback
+
+
+# ------------------------------------------------------
+# Per-service dependencies for routes
+# ------------------------------------------------------
+def get_parser_service(request: Request) -> ParserService:
+    return get_services(request).parser
+
+
+def get_llm_service(request: Request) -> LLMService:
+    return get_services(request).llm
+
+
+def get_storage_service(request: Request) -> StorageService:
+    return get_services(request).storage
+
+
+def get_report_service(request: Request) -> ReportService:
+    return get_services(request).report
+
+
+def get_matcher_service(request: Request) -> MatcherService:
+    return get_services(request).matcher
+
+
+def get_rematch_service(request: Request) -> RematchService:
+    return get_services(request).rematch
+
+
+def get_price_history_service(request: Request) -> PriceHistoryService:
+    return get_services(request).price_history
+
+
+def get_vendor_template_service(request: Request) -> VendorTemplateService:
+    return get_services(request).templates
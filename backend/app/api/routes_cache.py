@@ -0,0 +1,43 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from backend.app.db.session import get_session
+from backend.app.db import crud
+from backend.app.schemas.responses import APIResponse
+from backend.app.services.llm_adapter import LLMService
+from backend.app.api.dependencies import get_llm_service
+
+router = APIRouter()
+
+
+# -----------------------------------------------------
+# LLM response cache statistics
+# -----------------------------------------------------
+@router.get("/cache/llm")
+def llm_cache_stats(llm: LLMService = Depends(get_llm_service)):
+    if llm.cache is None:
+        return APIResponse(success=True, message="LLM cache disabled", data={"enabled": False})
+
+    return APIResponse(success=True, data={"enabled": True, **llm.cache.stats()})
+
+
+# -----------------------------------------------------
+# Invalidate LLM responses (one document's OCR text, or everything)
+# -----------------------------------------------------
+@router.delete("/cache/llm")
+def invalidate_llm_cache(
+    doc_id: Optional[int] = Query(None, description="Only drop the cached response for this document"),
+    session: Session = Depends(get_session),
+    llm: LLMService = Depends(get_llm_service)
+):
+    if doc_id is None:
+        removed = llm.invalidate_cache()
+    else:
+        doc = crud.get_document(session, doc_id)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+        if not doc.ocr_text:
+            raise HTTPException(status_code=400, detail="Document has no OCR text")
+        removed = llm.invalidate_cache(doc.ocr_text)
+
+    return APIResponse(success=True, message="LLM cache invalidated", data={"removed": removed})
@@ -1,32 +1,25 @@
 # backend/app/api/routes_documents.py
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+from datetime import date
+from typing import Optional
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
-from sqlmodel import Session, select
-import json
+from sqlmodel import Session
 
 from backend.app.db.session import get_session
 from backend.app.db import crud
-from backend.app.db.models import Document
 from backend.app.schemas.responses import APIResponse
 from backend.app.schemas.dtos import ParsedDocumentDTO
 from backend.app.services.storage import StorageService
 from backend.app.services.parser import ParserService
-from backend.app.utils.file_helpers import validate_file_size, generate_unique_filename
-
-router = APIRouter()
+from backend.app.services.rematch import RematchService
+from backend.app.api.dependencies import get_parser_service, get_rematch_service, get_storage_service
+from backend.app.services.jobs import get_job_queue
+from backend.app.utils.file_helpers import generate_unique_filename, FileTooLargeError
 
+logger = logging.getLogger(__name__)
 
-# -----------------------------
-# Helper: list documents by company
-# (local helper so you don't need to change crud.py)
-# -----------------------------
-def list_documents_by_company(session: Session, company_id: int) -> List[Document]:
-    """
-    Return all Document rows for a given company_id ordered by uploaded_at desc.
-    """
-    stmt = select(Document).where(Document.company_id == company_id).order_by(Document.uploaded_at.desc())
-    results = session.exec(stmt).all()
-    return results
+router = APIRouter()
 
 
 # -----------------------------------------------------
@@ -37,46 +30,38 @@ async def upload_document(
     company_id: int = Form(...),
     doc_type: str = Form(...),          # "PO" | "INVOICE" | "DELIVERY"
     file: UploadFile = File(...),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    storage: StorageService = Depends(get_storage_service)
 ):
     """
     Upload a document file (PDF/image), save to storage, create DB record and return document id & path.
+    Oversized bodies are refused before they are read by UploadSizeLimitMiddleware.
     """
     # Validate type
     if doc_type not in ["PO", "INVOICE", "DELIVERY"]:
         raise HTTPException(status_code=400, detail="Invalid document type")
 
-    # Read file bytes
-    try:
-        file_bytes = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read uploaded file: {e}")
-
-    # Validate size
-    try:
-        validate_file_size(file_bytes)
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"File validation error: {e}")
-
     # Generate safe filename
     unique_filename = generate_unique_filename(file.filename)
 
-    # Save file (local or S3) via StorageService
-    storage = StorageService()
+    # Stream file to storage (local or S3) in chunks, hashing on the fly
     try:
-        saved_path = storage.save(file_bytes, unique_filename)
+        saved = await storage.save_stream(file, unique_filename)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
 
+    saved_path = saved["path"]
+
     # Create DB entry
     try:
         doc = crud.create_document(
             session=session,
             company_id=company_id,
             filename=saved_path,
-            doc_type=doc_type
+            doc_type=doc_type,
+            file_hash=saved["sha256"]
         )
     except Exception as e:
         # If DB create fails, attempt to remove saved file (best-effort)
@@ -89,10 +74,52 @@ async def upload_document(
     return APIResponse(
         success=True,
         message="File uploaded successfully",
-        data={"document_id": doc.id, "path": saved_path}
+        data={"document_id": doc.id, "path": saved_path, "sha256": saved["sha256"], "size": saved["size"]}
     )
 
 
+# -----------------------------------------------------
+# Search documents by header fields (declared before /documents/{doc_id})
+# -----------------------------------------------------
+@router.get("/documents/search")
+def search_documents(
+    company_id: int = Query(..., description="Company ID to search in"),
+    doc_type: Optional[str] = Query(None, description="PO | INVOICE | DELIVERY"),
+    vendor: Optional[str] = Query(None, description="Vendor name prefix (case-insensitive)"),
+    vendor_gstin: Optional[str] = Query(None),
+    doc_number: Optional[str] = Query(None),
+    currency: Optional[str] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    min_total: Optional[float] = Query(None),
+    max_total: Optional[float] = Query(None),
+    sort: str = Query("-doc_date", description="doc_date | grand_total | vendor_name | doc_number | uploaded_at, '-' for descending"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    session: Session = Depends(get_session)
+):
+    """
+    Find documents by vendor, GSTIN, number, date range, amount range or
+    currency. Filters and sorting run on the indexed header columns, so no
+    parsed_json is loaded or decoded.
+    """
+    if sort.lstrip("-") not in crud.DOCUMENT_SEARCH_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort field: {sort.lstrip('-')}")
+
+    try:
+        docs, total = crud.search_documents(
+            session, company_id,
+            doc_type=doc_type, vendor=vendor, vendor_gstin=vendor_gstin, doc_number=doc_number,
+            currency=currency, date_from=date_from, date_to=date_to,
+            min_total=min_total, max_total=max_total,
+            sort=sort, limit=limit, offset=offset
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search documents: {e}")
+
+    return APIResponse(success=True, data={"documents": docs, "total": total})
+
+
 # -----------------------------------------------------
 # Get a document by ID
 # -----------------------------------------------------
@@ -105,13 +132,6 @@ def get_document(doc_id: int, session: Session = Depends(get_session)):
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    parsed = None
-    if doc.parsed_json:
-        try:
-            parsed = json.loads(doc.parsed_json)
-        except Exception:
-            parsed = doc.parsed_json
-
     return APIResponse(
         success=True,
         data={
@@ -121,7 +141,7 @@ def get_document(doc_id: int, session: Session = Depends(get_session)):
             "doc_type": doc.doc_type,
             "uploaded_at": doc.uploaded_at,
             "ocr_text": doc.ocr_text,
-            "parsed_json": parsed
+            "parsed_json": doc.parsed_json
         }
     )
 
@@ -130,7 +150,12 @@ def get_document(doc_id: int, session: Session = Depends(get_session)):
 # Run OCR only (optional)
 # -----------------------------------------------------
 @router.post("/documents/{doc_id}/ocr")
-def run_ocr(doc_id: int, session: Session = Depends(get_session)):
+def run_ocr(
+    doc_id: int,
+    session: Session = Depends(get_session),
+    parser: ParserService = Depends(get_parser_service),
+    storage: StorageService = Depends(get_storage_service)
+):
     """
     Run OCR on an existing saved document and save OCR text into DB.
     """
@@ -138,10 +163,8 @@ def run_ocr(doc_id: int, session: Session = Depends(get_session)):
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    parser = ParserService()
-
     try:
-        ocr_text = parser.ocr.extract_text(doc.filename)
+        ocr_text = parser.ocr.extract_text(storage.local_path(doc.filename), file_hash=doc.file_hash)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OCR extraction failed: {e}")
 
@@ -161,42 +184,89 @@ def run_ocr(doc_id: int, session: Session = Depends(get_session)):
 # Full parse pipeline → OCR + LLM
 # -----------------------------------------------------
 @router.post("/documents/{doc_id}/parse")
-def parse_document(doc_id: int, session: Session = Depends(get_session)):
+async def parse_document(
+    doc_id: int,
+    session: Session = Depends(get_session),
+    parser: ParserService = Depends(get_parser_service),
+    storage: StorageService = Depends(get_storage_service),
+    rematch: RematchService = Depends(get_rematch_service)
+):
     """
     Run the full parsing pipeline: OCR + LLM/structure extraction.
     Saves OCR and parsed JSON into DB when available and returns parsed DTO.
+    Existing matches that used this document are re-scored when the new
+    parse changed their inputs (see RematchService).
+    Async so a request waiting on the LLM doesn't hold a threadpool worker;
+    blocking DB and OCR work is pushed to threads.
     """
-    doc = crud.get_document(session, doc_id)
+    doc = await asyncio.to_thread(crud.get_document, session, doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    parser = ParserService()
-
     try:
-        result = parser.process_document(doc.filename)
+        file_path = await asyncio.to_thread(storage.local_path, doc.filename)
+        result = await parser.aprocess_document(file_path, file_hash=doc.file_hash, document_id=doc_id,
+                                                doc_type=doc.doc_type)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Parsing failed: {e}")
 
-    # Store results in DB
-    try:
+    def save_result():
         if "ocr_text" in result and result["ocr_text"] is not None:
             crud.update_document_ocr(session, doc_id, result["ocr_text"])
         if "parsed" in result and result["parsed"] is not None:
             crud.update_document_parsed(session, doc_id, result["parsed"])
+
+    # Store results in DB
+    try:
+        await asyncio.to_thread(save_result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save parse result: {e}")
 
     parsed_payload = None
+    rematched = None
     if result.get("parsed") is not None:
         parsed_payload = result["parsed"]
+        # The parse itself is saved; a failed re-match only leaves matches stale
+        try:
+            rematched = await asyncio.to_thread(rematch.rematch_document, session, doc_id)
+        except Exception as e:
+            logger.warning("Re-matching after parse of document %s failed: %s", doc_id, e)
 
     return APIResponse(
         success=True,
         message="Document parsed successfully",
-        data=ParsedDocumentDTO(
-            ocr_text=result.get("ocr_text"),
-            parsed=parsed_payload
-        ).dict()
+        data={
+            **ParsedDocumentDTO(
+                ocr_text=result.get("ocr_text"),
+                parsed=parsed_payload
+            ).dict(),
+            "rematched": rematched
+        }
+    )
+
+
+# -----------------------------------------------------
+# Background parse → returns a job id immediately
+# -----------------------------------------------------
+@router.post("/documents/{doc_id}/parse/async", status_code=202)
+def parse_document_async(doc_id: int, session: Session = Depends(get_session)):
+    """
+    Queue the OCR + LLM pipeline on the background worker pool.
+    Poll GET /jobs/{job_id} for status and the parsed result.
+    """
+    doc = crud.get_document(session, doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    try:
+        job = get_job_queue().submit_parse(session, doc)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue parse job: {e}")
+
+    return APIResponse(
+        success=True,
+        message="Parse job queued",
+        data={"job_id": job.id, "status": job.status}
     )
 
 
@@ -204,36 +274,44 @@ def parse_document(doc_id: int, session: Session = Depends(get_session)):
 # List documents by company (required query param: company_id)
 # -----------------------------------------------------
 @router.get("/documents")
-def list_documents(company_id: Optional[int] = Query(None, description="Company ID to filter documents"), session: Session = Depends(get_session)):
+def list_documents(
+    company_id: Optional[int] = Query(None, description="Company ID to filter documents"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns, e.g. id,doc_type,parsed_json"),
+    doc_type: Optional[str] = Query(None, description="PO | INVOICE | DELIVERY"),
+    parsed: Optional[bool] = Query(None, description="Only parsed (true) or unparsed (false) documents"),
+    include_total: bool = Query(True),
+    session: Session = Depends(get_session)
+):
     """
     List documents. Requires company_id query parameter.
-    Returns documents for that company ordered by uploaded_at descending.
+    Returns one page of documents for that company ordered by uploaded_at descending.
+    ocr_text and parsed_json are only loaded when listed in `fields`.
     """
     if company_id is None:
         raise HTTPException(status_code=400, detail="company_id query parameter is required")
 
+    field_list = None
+    if fields:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in field_list if f not in crud.DOCUMENT_LIST_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
     try:
-        docs = list_documents_by_company(session, company_id)
+        docs, next_cursor = crud.list_documents(
+            session, company_id,
+            limit=limit, cursor=cursor, fields=field_list,
+            doc_type=doc_type, parsed=parsed
+        )
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to query documents: {e}")
 
-    docs_out = []
-    for d in docs:
-        parsed = None
-        if d.parsed_json:
-            try:
-                parsed = json.loads(d.parsed_json)
-            except Exception:
-                parsed = d.parsed_json
-
-        docs_out.append({
-            "id": d.id,
-            "company_id": d.company_id,
-            "filename": d.filename,
-            "doc_type": d.doc_type,
-            "uploaded_at": d.uploaded_at,
-            "ocr_text": d.ocr_text,
-            "parsed_json": parsed
-        })
-
-    return APIResponse(success=True, data={"documents": docs_out})
+    data = {"documents": docs, "next_cursor": next_cursor}
+    if include_total:
+        data["total"] = crud.count_documents(session, company_id, doc_type=doc_type, parsed=parsed)
+
+    return APIResponse(success=True, data=data)
@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from backend.app.api.dependencies import ServiceContainer, get_services
 
 router = APIRouter()
 
@@ -6,3 +8,13 @@ router = APIRouter()
 @router.get("/health")
 def health_check():
     return {"status": "ok", "message": "Backend is running"}
+
+
+@router.get("/ready")
+def readiness_check(services: ServiceContainer = Depends(get_services)):
+    """
+    Ready only once startup warm-up (Tesseract, S3, LLM client, caches) has finished.
+    """
+    if not services.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready", "warmup_errors": services.warmup_errors}
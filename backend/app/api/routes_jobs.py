@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+from backend.app.db.session import get_session
+from backend.app.db import crud
+from backend.app.schemas.responses import APIResponse
+import json
+
+router = APIRouter()
+
+
+# -----------------------------------------------------
+# Poll a background job
+# -----------------------------------------------------
+@router.get("/jobs/{job_id}")
+def get_job(job_id: int, session: Session = Depends(get_session)):
+    job = crud.get_job(session, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return APIResponse(
+        success=True,
+        data={
+            "id": job.id,
+            "kind": job.kind,
+            "document_id": job.document_id,
+            "company_id": job.company_id,
+            "status": job.status,
+            "progress": job.progress,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+    )
@@ -1,21 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlmodel import Session
-from backend.app.db.session import get_session
+from backend.app.config import settings
+from backend.app.db.session import engine, get_session
 from backend.app.db import crud
-from backend.app.schemas.dtos import MatchRequestDTO, MatchResultDTO
+from backend.app.schemas.dtos import MatchRequestDTO, MatchResultDTO, BulkMatchRequestDTO
 from backend.app.schemas.responses import APIResponse
-from backend.app.services.matcher import MatcherService
+from backend.app.services.match_export import EXPORT_MEDIA_TYPES, export_chunks
+from backend.app.services.matcher import MatcherService, match_fingerprint, match_status
+from backend.app.services.price_history import PriceHistoryService, baselines_digest
 from backend.app.services.report import ReportService
-import json
+from backend.app.services.jobs import get_job_queue
+from backend.app.api.dependencies import get_matcher_service, get_price_history_service, get_report_service
 
 router = APIRouter()
 
 
 # -----------------------------------------------------
-# Perform PO–Invoice matching
+# Perform PO–Invoice (or PO–Invoice–Delivery) matching
 # -----------------------------------------------------
 @router.post("/match")
-def match_documents(payload: MatchRequestDTO, session: Session = Depends(get_session)):
+def match_documents(
+    payload: MatchRequestDTO,
+    session: Session = Depends(get_session),
+    matcher: MatcherService = Depends(get_matcher_service),
+    history: PriceHistoryService = Depends(get_price_history_service),
+):
+    """
+    Two-way PO/invoice match, or three-way when delivery_id names a
+    delivery note (GRN): billed quantities are then checked against what
+    was received, and the result carries a per-line variance breakdown.
+    """
     # Fetch PO
     po_doc = crud.get_document(session, payload.po_id)
     if not po_doc:
@@ -26,54 +43,154 @@ def match_documents(payload: MatchRequestDTO, session: Session = Depends(get_ses
     if not inv_doc:
         raise HTTPException(status_code=404, detail="Invoice document not found")
 
+    # Fetch Delivery note (three-way)
+    grn_doc = None
+    if payload.delivery_id is not None:
+        grn_doc = crud.get_document(session, payload.delivery_id)
+        if not grn_doc:
+            raise HTTPException(status_code=404, detail="Delivery document not found")
+
+    # Each id must name a document of the role it is given
+    for role, doc, expected in (("po_id", po_doc, "PO"), ("invoice_id", inv_doc, "INVOICE"),
+                                ("delivery_id", grn_doc, "DELIVERY")):
+        if doc is not None and doc.doc_type != expected:
+            raise HTTPException(status_code=400, detail=f"{role} must be a {expected} document, got {doc.doc_type}")
+
     # Parsed JSON must exist
-    if not po_doc.parsed_json or not inv_doc.parsed_json:
-        raise HTTPException(status_code=400, detail="Both documents must be parsed first")
-
-    po = json.loads(po_doc.parsed_json)
-    inv = json.loads(inv_doc.parsed_json)
-
-    matcher = MatcherService()
-    result = matcher.match_po_and_invoice(po, inv)
-
-    # Save match result in DB
-    match_record = crud.create_match(
-        session=session,
-        company_id=payload.company_id,
-        po_id=payload.po_id,
-        invoice_id=payload.invoice_id,
-        status="Matched" if not result["mismatches"] and not result["fraud_flags"]
-               else ("Warning" if result["score"] >= 60 else "Failed"),
-        mismatches=result["mismatches"],
-        fraud_flags=result["fraud_flags"],
-        confidence_score=result["score"]
-    )
+    if not po_doc.parsed_json or not inv_doc.parsed_json or (grn_doc and not grn_doc.parsed_json):
+        raise HTTPException(status_code=400, detail="All documents must be parsed first")
 
-    # Generate PDF report
-    report_service = ReportService()
-    report_path = report_service.generate_match_report(
-        match_id=match_record.id,
-        po=po,
-        inv=inv,
-        result=result
+    po = po_doc.parsed_json
+    inv = inv_doc.parsed_json
+    grn = grn_doc.parsed_json if grn_doc else None
+
+    # Same inputs as the stored match: reuse it as is (no scoring,
+    # no write, and the already rendered report stays valid)
+    baselines = history.baselines(session, payload.company_id, inv)
+    fingerprint = match_fingerprint(po, inv, grn, baselines_digest(baselines))
+    existing = crud.get_latest_match(
+        session, payload.company_id, payload.po_id, payload.invoice_id, payload.delivery_id
     )
+    if existing and existing.fingerprint == fingerprint:
+        return _match_response(existing, message="Match unchanged", unchanged=True)
+
+    result = matcher.match(po, inv, grn, rate_baselines=baselines)
+    fields = {
+        "status": match_status(result),
+        "mismatches": result["mismatches"],
+        "fraud_flags": result["fraud_flags"],
+        "confidence_score": result["score"],
+        "fingerprint": fingerprint,
+        "line_variances": result.get("line_variances"),
+    }
 
-    # Return response
+    # Save match result in DB; a stale match for the pair is updated in place
+    if existing:
+        match_record = crud.update_match_result(session, existing, **fields)
+    else:
+        match_record = crud.create_match(
+            session=session,
+            company_id=payload.company_id,
+            po_id=payload.po_id,
+            invoice_id=payload.invoice_id,
+            delivery_id=payload.delivery_id,
+            **fields
+        )
+
+    # The PDF report is rendered lazily by GET /match/{id}/report
+    return _match_response(match_record, message="Match completed", unchanged=False)
+
+
+def _match_response(match_record, message: str, unchanged: bool) -> APIResponse:
     return APIResponse(
         success=True,
-        message="Match completed",
+        message=message,
         data={
             "match_id": match_record.id,
             "result": MatchResultDTO(
-                mismatches=result["mismatches"],
-                fraud_flags=result["fraud_flags"],
-                score=result["score"]
+                mismatches=match_record.mismatches or [],
+                fraud_flags=match_record.fraud_flags or [],
+                score=match_record.confidence_score,
+                line_variances=match_record.line_variances
             ).dict(),
-            "report_path": report_path
+            "unchanged": unchanged,
+            "report_url": f"/api/match/{match_record.id}/report"
         }
     )
 
 
+# -----------------------------------------------------
+# Bulk reconciliation of all parsed invoices for a company
+# -----------------------------------------------------
+@router.post("/match/bulk", status_code=202)
+def bulk_match(payload: BulkMatchRequestDTO, session: Session = Depends(get_session)):
+    """
+    Queue a month-end style reconciliation run.
+    Poll GET /jobs/{job_id} for progress and the run summary.
+    """
+    if not crud.get_company(session, payload.company_id):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    try:
+        job = get_job_queue().submit_reconcile(session, payload.company_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue reconciliation: {e}")
+
+    return APIResponse(
+        success=True,
+        message="Reconciliation queued",
+        data={"job_id": job.id, "status": job.status}
+    )
+
+
+# -----------------------------------------------------
+# Export a company's matches (NDJSON or CSV stream)
+# -----------------------------------------------------
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # created_at is stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/match/export")
+def export_matches(
+    company_id: int,
+    created_from: Optional[datetime] = Query(None, alias="from"),
+    created_to: Optional[datetime] = Query(None, alias="to"),
+    format: str = Query("ndjson"),
+    session: Session = Depends(get_session),
+):
+    """
+    Stream every match of the company created in [from, to) as NDJSON
+    (default) or CSV, oldest first, including mismatches and fraud flags.
+    Rows come off a server-side cursor EXPORT_BATCH_SIZE at a time, so the
+    response can be arbitrarily large without growing server memory.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    if not crud.get_company(session, company_id):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    created_from, created_to = _utc_naive(created_from), _utc_naive(created_to)
+
+    def stream():
+        # The request's session is closed before the body is sent: the
+        # cursor needs a session of its own that lives as long as the stream
+        with Session(engine) as export_session:
+            batches = crud.iter_matches(
+                export_session, company_id, created_from, created_to,
+                batch_size=settings.EXPORT_BATCH_SIZE
+            )
+            yield from export_chunks(batches, format)
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="matches_{company_id}.{format}"'}
+    )
+
+
 # -----------------------------------------------------
 # Retrieve match result by ID
 # -----------------------------------------------------
@@ -90,10 +207,64 @@ def get_match(match_id: int, session: Session = Depends(get_session)):
             "company_id": match_record.company_id,
             "po_id": match_record.po_id,
             "invoice_id": match_record.invoice_id,
+            "delivery_id": match_record.delivery_id,
             "status": match_record.status,
-            "mismatches": match_record.mismatches,
-            "fraud_flags": match_record.fraud_flags,
+            "mismatches": match_record.mismatches or [],
+            "fraud_flags": match_record.fraud_flags or [],
+            "line_variances": match_record.line_variances,
             "confidence_score": match_record.confidence_score,
+            "fingerprint": match_record.fingerprint,
             "created_at": match_record.created_at
         }
     )
+
+
+# -----------------------------------------------------
+# Download the PDF report for a match (rendered on first request)
+# -----------------------------------------------------
+@router.get("/match/{match_id}/report")
+def get_match_report(
+    match_id: int,
+    request: Request,
+    session: Session = Depends(get_session),
+    report_service: ReportService = Depends(get_report_service)
+):
+    """
+    Streams the match report PDF. The file is rendered once per distinct
+    match result and named by its content hash, which doubles as the ETag.
+    Supports Range requests and If-None-Match.
+    """
+    match_record = crud.get_match(session, match_id)
+    if not match_record:
+        raise HTTPException(status_code=404, detail="Match result not found")
+
+    po_doc = crud.get_document(session, match_record.po_id)
+    inv_doc = crud.get_document(session, match_record.invoice_id)
+    if not po_doc or not inv_doc:
+        raise HTTPException(status_code=404, detail="Matched documents no longer exist")
+
+    po = crud.decode_parsed(po_doc)
+    inv = crud.decode_parsed(inv_doc)
+    po = po if isinstance(po, dict) else {}
+    inv = inv if isinstance(inv, dict) else {}
+    result = {
+        "mismatches": match_record.mismatches or [],
+        "fraud_flags": match_record.fraud_flags or [],
+        "score": match_record.confidence_score
+    }
+
+    etag = f'"{report_service.report_key(match_id, po, inv, result)}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        path, _ = report_service.get_or_render(match_id, po, inv, result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to render report: {e}")
+
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"match_{match_id}_report.pdf",
+        headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    )
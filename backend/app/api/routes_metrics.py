@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+from backend.app.utils.metrics import render_latest
+
+router = APIRouter()
+
+
+# -----------------------------------------------------
+# Prometheus scrape endpoint
+# -----------------------------------------------------
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Request, OCR, LLM, DB commit, storage and report histograms of this
+    process in the Prometheus text format.
+    """
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from backend.app.config import settings
+from backend.app.schemas.responses import APIResponse
+from backend.app.services.image_preprocess import preprocess_stats
+
+router = APIRouter()
+
+
+# -----------------------------------------------------
+# Image preprocessing / OCR timings (this API process)
+# -----------------------------------------------------
+@router.get("/ocr/stats")
+def ocr_stats():
+    """
+    Average milliseconds per preprocessing step and per Tesseract run, and how
+    many pixels preprocessing removed. Background jobs OCR in their own
+    processes and are not counted here.
+    """
+    return APIResponse(
+        success=True,
+        data={"preprocess_enabled": settings.OCR_PREPROCESS_ENABLED, **preprocess_stats.snapshot()}
+    )
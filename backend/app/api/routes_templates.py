@@ -0,0 +1,66 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from backend.app.db.session import get_session
+from backend.app.db import crud
+from backend.app.schemas.responses import APIResponse
+from backend.app.services.vendor_templates import VendorTemplateService
+from backend.app.api.dependencies import get_vendor_template_service
+
+router = APIRouter()
+
+
+# -----------------------------------------------------
+# List vendor templates
+# -----------------------------------------------------
+@router.get("/templates")
+def list_templates(session: Session = Depends(get_session)):
+    templates = crud.list_vendor_templates(session)
+    return APIResponse(
+        success=True,
+        data={"templates": [
+            {
+                "id": t.id,
+                "vendor_name": t.vendor_name,
+                "vendor_gstin": t.vendor_gstin,
+                "doc_type": t.doc_type,
+                "fields": sorted((t.fields or {}).keys()),
+                "taxes": sorted((t.taxes or {}).keys()),
+                "source_document_id": t.source_document_id,
+                "updated_at": t.updated_at
+            }
+            for t in templates
+        ]}
+    )
+
+
+# -----------------------------------------------------
+# Derive templates from already parsed documents
+# -----------------------------------------------------
+@router.post("/templates/rebuild")
+def rebuild_templates(
+    company_id: Optional[int] = Query(None, description="Only learn from this company's documents"),
+    templates: VendorTemplateService = Depends(get_vendor_template_service)
+):
+    try:
+        summary = templates.rebuild(company_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild templates: {e}")
+
+    return APIResponse(success=True, message="Templates rebuilt", data=summary)
+
+
+# -----------------------------------------------------
+# Delete a template (its vendor goes back to the LLM)
+# -----------------------------------------------------
+@router.delete("/templates/{template_id}")
+def delete_template(
+    template_id: int,
+    session: Session = Depends(get_session),
+    templates: VendorTemplateService = Depends(get_vendor_template_service)
+):
+    if not crud.delete_vendor_template(session, template_id):
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    templates.reload()
+    return APIResponse(success=True, message="Template deleted", data={"id": template_id})
@@ -10,9 +10,28 @@ class Settings(BaseSettings):
     # OpenAI / LLM configuration
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-4"
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    LLM_MAX_CONCURRENCY: int = 8          # requests in flight at once
+    LLM_REQUESTS_PER_MINUTE: int = 500    # 0 = unlimited
+    LLM_TOKENS_PER_MINUTE: int = 150000   # 0 = unlimited
+    LLM_TIMEOUT_SECONDS: float = 60.0     # per attempt
+    LLM_MAX_RETRIES: int = 5              # on 429 / 5xx / timeouts
+    LLM_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_MAX_OUTPUT_TOKENS: int = 4096
+    LLM_CHUNK_CHARS: int = 12000          # longer OCR text is extracted chunk by chunk
+    LLM_HEADER_HEAD_CHARS: int = 4000     # header pass sees the start ...
+    LLM_HEADER_TAIL_CHARS: int = 3000     # ... and the end of a long document
 
     # Database URL (SQLite for MVP)
     DATABASE_URL: str = "sqlite:///./invoice_matcher.db"
+    DB_AUTO_MIGRATE: bool = True          # run Alembic migrations at startup
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+
+    # SQLite tuning (ignored for other databases)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
 
     # Storage config
     STORAGE_TYPE: str = "local"   # or "s3"
@@ -23,13 +42,73 @@ class Settings(BaseSettings):
     S3_REGION: Optional[str] = None
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_MAX_POOL_CONNECTIONS: int = 20
 
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"      # or "text"
 
     # Upload size limit
     MAX_UPLOAD_SIZE_MB: int = 25
 
+    # Streaming uploads
+    UPLOAD_CHUNK_SIZE_KB: int = 1024
+    S3_MULTIPART_PART_MB: int = 8    # S3 requires parts >= 5 MB (except the last)
+
+    # Local read-through cache of S3 objects (OCR needs a file on disk)
+    S3_CACHE_MAX_MB: int = 2048
+    S3_DOWNLOAD_PART_MB: int = 8     # ranged GET size; larger objects download in parallel parts
+    S3_DOWNLOAD_CONCURRENCY: int = 4
+    S3_CACHE_MIN_IDLE_SECONDS: int = 900    # files fetched this recently may still be OCR'd: not evicted
+
+    # Match export (GET /match/export)
+    EXPORT_BATCH_SIZE: int = 1000    # rows fetched from the cursor and flushed per chunk
+
+    # Background parse jobs (per-stage concurrency)
+    JOB_OCR_WORKERS: int = 2      # processes
+    JOB_LLM_WORKERS: int = 4      # threads
+
+    # Bulk reconciliation
+    RECONCILE_WORKERS: int = 4
+    RECONCILE_AMOUNT_BAND: float = 0.05          # width of amount buckets (5%)
+    RECONCILE_MAX_CANDIDATES: int = 200          # POs scored per invoice at most
+    RECONCILE_PARALLEL_MIN_INVOICES: int = 50
+
+    # Page-parallel PDF extraction
+    PDF_PARALLEL_MIN_PAGES: int = 8   # below this, extract in one pass
+    PDF_PAGES_PER_CHUNK: int = 4
+    PDF_PAGE_WORKERS: int = 4
+
+    # Scanned pages (no text layer) are rasterized and OCR'd
+    PDF_TEXT_LAYER_MIN_CHARS: int = 20    # letters/digits for a page to count as text
+    PDF_OCR_DPI: int = 300
+
+    # Image OCR: preprocessing before Tesseract, run on a pool of long-lived workers
+    OCR_PREPROCESS_ENABLED: bool = True
+    OCR_TARGET_DPI: int = 300                # larger images are downscaled to this
+    OCR_ASSUMED_PAGE_INCHES: float = 11.69   # long edge (A4) for images without DPI metadata
+    OCR_DESKEW_MAX_ANGLE: float = 10.0       # degrees searched either way
+    OCR_WORKERS: int = 2                     # processes
+
+    # Vendor template fast path (rule-based parsing before the LLM)
+    TEMPLATE_PARSING_ENABLED: bool = True
+    TEMPLATE_TOTAL_TOLERANCE: float = 0.01       # relative slack for the totals checks
+    TEMPLATE_HEADER_CHARS: int = 1500            # where to look for a vendor name
+
+    # Price history: flag invoice rates outside the vendor's usual band
+    PRICE_HISTORY_ENABLED: bool = True
+    PRICE_HISTORY_MIN_SAMPLES: int = 5        # prior invoices of the item before it is judged
+    PRICE_HISTORY_SIGMA: float = 3.0          # band = mean ± sigma·std, widened to the 5-95% range on the vendor's recent invoices
+    PRICE_HISTORY_MIN_DEVIATION: float = 0.10 # ... and never narrower than ±10% around it
+
+    # Local result caches
+    CACHE_DIR: str = "./cache"
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_MAX_MB: int = 512
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_MB: int = 128
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,7 +1,16 @@
 from sqlmodel import Session, select
-from backend.app.db.models import Company, Document, Match
-from typing import Optional, List
+from sqlalchemy import DateTime, Float, and_, bindparam, case, delete, or_, func, text
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from backend.app.db.models import Company, Document, InvoiceItemRates, Match, Job, VendorItemRate, VendorTemplate
+from backend.app.utils import rate_stats
+from backend.app.utils.validation import header_fields, vendor_search_key
+from typing import Dict, Iterator, Optional, List, Tuple
+import base64
 import json
+import sys
+from collections import defaultdict
+from datetime import date, datetime
 from sqlmodel import select
 
 # ---------------------------------------
@@ -22,11 +31,12 @@ def get_company(session: Session, company_id: int) -> Optional[Company]:
 # ---------------------------------------
 # Document CRUD
 # ---------------------------------------
-def create_document(session: Session, company_id: int, filename: str, doc_type: str) -> Document:
+def create_document(session: Session, company_id: int, filename: str, doc_type: str, file_hash: str = None) -> Document:
     doc = Document(
         company_id=company_id,
         filename=filename,
-        doc_type=doc_type
+        doc_type=doc_type,
+        file_hash=file_hash
     )
     session.add(doc)
     session.commit()
@@ -47,13 +57,194 @@ def update_document_ocr(session: Session, doc_id: int, ocr_text: str):
     return doc
 
 
+# Typed copies of parsed_json header values (see validation.header_fields)
+DOCUMENT_HEADER_FIELDS = ("doc_number", "doc_date", "vendor_name", "vendor_gstin", "grand_total", "currency")
+
+# Columns a document listing may project; heavy ones must be asked for explicitly
+DOCUMENT_LIST_FIELDS = (
+    "id", "company_id", "filename", "doc_type", "uploaded_at", "file_hash", "ocr_text", "parsed_json",
+    *DOCUMENT_HEADER_FIELDS
+)
+DOCUMENT_DEFAULT_FIELDS = ("id", "company_id", "filename", "doc_type", "uploaded_at")
+
+
+def encode_document_cursor(uploaded_at: datetime, doc_id: int) -> str:
+    raw = f"{uploaded_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_document_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    uploaded_at, doc_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(uploaded_at), int(doc_id)
+
+
+def _prefix_filters(column, prefix: str) -> list:
+    """
+    column starts with prefix, as a range the column's index can serve
+    (SQLite runs ILIKE as lower(column) LIKE ..., which scans). The prefix
+    is matched literally: % and _ are not wildcards.
+    """
+    if ord(prefix[-1]) == sys.maxunicode:
+        return [column >= prefix]
+    return [column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+
+
+def _document_filters(company_id: int, doc_type: str = None, parsed: bool = None) -> list:
+    filters = [Document.company_id == company_id]
+    if doc_type:
+        filters.append(Document.doc_type == doc_type)
+    if parsed is True:
+        filters.append(Document.parsed_json.is_not(None))
+    elif parsed is False:
+        filters.append(Document.parsed_json.is_(None))
+    return filters
+
+
+def list_documents(
+    session: Session,
+    company_id: int,
+    limit: int = 50,
+    cursor: str = None,
+    fields: List[str] = None,
+    doc_type: str = None,
+    parsed: bool = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a company's documents, newest first, keyset-paginated on (uploaded_at, id).
+    Only the requested columns are selected. Returns (rows, next_cursor).
+    """
+    fields = list(fields or DOCUMENT_DEFAULT_FIELDS)
+    # The cursor columns are always needed
+    columns = list(dict.fromkeys(["id", "uploaded_at", *fields]))
+
+    statement = select(*[getattr(Document, name) for name in columns]).where(
+        *_document_filters(company_id, doc_type, parsed)
+    )
+
+    if cursor:
+        cursor_at, cursor_id = decode_document_cursor(cursor)
+        statement = statement.where(or_(
+            Document.uploaded_at < cursor_at,
+            and_(Document.uploaded_at == cursor_at, Document.id < cursor_id)
+        ))
+
+    statement = statement.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit + 1)
+    rows = [dict(row._mapping) for row in session.exec(statement)]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_document_cursor(rows[-1]["uploaded_at"], rows[-1]["id"])
+
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+def count_documents(session: Session, company_id: int, doc_type: str = None, parsed: bool = None) -> int:
+    statement = select(func.count()).select_from(Document).where(
+        *_document_filters(company_id, doc_type, parsed)
+    )
+    return session.exec(statement).one()
+
+
+DOCUMENT_SEARCH_SORTS = ("doc_date", "grand_total", "vendor_name", "doc_number", "uploaded_at")
+
+
+def search_documents(
+    session: Session,
+    company_id: int,
+    doc_type: str = None,
+    vendor: str = None,
+    vendor_gstin: str = None,
+    doc_number: str = None,
+    currency: str = None,
+    date_from: date = None,
+    date_to: date = None,
+    min_total: float = None,
+    max_total: float = None,
+    sort: str = "-doc_date",
+    limit: int = 50,
+    offset: int = 0
+) -> Tuple[List[dict], int]:
+    """
+    Filter and sort a company's documents on the header columns, all in SQL.
+    vendor is a case-insensitive prefix of vendor_name; date and total
+    bounds are inclusive. sort is one of DOCUMENT_SEARCH_SORTS, "-" prefixed
+    for descending; documents without that field sort last.
+    Returns (rows, total matching).
+    """
+    filters = _document_filters(company_id, doc_type)
+    vendor = vendor_search_key(vendor)
+    if vendor:
+        filters.extend(_prefix_filters(Document.vendor_name_key, vendor))
+    if vendor_gstin:
+        filters.append(Document.vendor_gstin == vendor_gstin.upper().replace(" ", ""))
+    if doc_number:
+        filters.append(Document.doc_number == doc_number)
+    if currency:
+        filters.append(Document.currency == currency.upper())
+    if date_from:
+        filters.append(Document.doc_date >= date_from)
+    if date_to:
+        filters.append(Document.doc_date <= date_to)
+    if min_total is not None:
+        filters.append(Document.grand_total >= min_total)
+    if max_total is not None:
+        filters.append(Document.grand_total <= max_total)
+
+    descending = sort.startswith("-")
+    sort_column = getattr(Document, sort.lstrip("-"))
+    order = [sort_column.desc(), Document.id.desc()] if descending else [sort_column.asc(), Document.id.asc()]
+
+    columns = [getattr(Document, name) for name in ("id", "doc_type", "filename", "uploaded_at", *DOCUMENT_HEADER_FIELDS)]
+    statement = (
+        select(*columns).where(*filters)
+        .order_by(sort_column.is_(None), *order)
+        .offset(offset).limit(limit)
+    )
+    rows = [dict(row._mapping) for row in session.exec(statement)]
+    total = session.exec(select(func.count()).select_from(Document).where(*filters)).one()
+    return rows, total
+
+
+def list_parsed_documents(session: Session, company_id: int, doc_types: List[str] = None) -> List[Document]:
+    statement = select(Document).where(
+        Document.company_id == company_id,
+        Document.parsed_json.is_not(None)
+    )
+    if doc_types:
+        statement = statement.where(Document.doc_type.in_(doc_types))
+    return session.exec(statement.order_by(Document.id)).all()
+
+
+def decode_parsed(doc: Document):
+    """
+    parsed_json as stored (already decoded by the JSON column), None when unparsed.
+    """
+    return doc.parsed_json or None
+
+
 def update_document_parsed(session: Session, doc_id: int, parsed_json: dict):
-    doc = session.get(Document, doc_id)
-    if doc:
-        doc.parsed_json = json.dumps(parsed_json, indent=2)
-        session.add(doc)
-        session.commit()
-    return doc
+    for attempt in range(2):
+        doc = session.get(Document, doc_id)
+        if not doc:
+            return None
+        try:
+            if doc.doc_type == "INVOICE":
+                # Swap this invoice's old rates for the new ones in the price history
+                record_item_rates(session, doc.company_id, doc.id, rate_stats.item_rates(doc.parsed_json),
+                                  rate_stats.item_rates(parsed_json))
+            doc.parsed_json = parsed_json
+            for name, value in header_fields(parsed_json).items():
+                setattr(doc, name, value)
+            session.add(doc)
+            session.commit()
+            return doc
+        except IntegrityError:
+            # A concurrent parse of the same invoice stored its rates first: redo on top of it
+            session.rollback()
+            if attempt:
+                raise
 
 
 # ---------------------------------------
@@ -65,19 +256,25 @@ def create_match(
     po_id: int,
     invoice_id: int,
     status: str,
-    mismatches: dict,
+    mismatches: list,
     fraud_flags: list,
-    confidence_score: float
+    confidence_score: float,
+    fingerprint: str = None,
+    delivery_id: int = None,
+    line_variances: list = None
 ) -> Match:
 
     match_record = Match(
         company_id=company_id,
         po_id=po_id,
         invoice_id=invoice_id,
+        delivery_id=delivery_id,
         status=status,
-        mismatches=json.dumps(mismatches, indent=2),
-        fraud_flags=json.dumps(fraud_flags, indent=2),
-        confidence_score=confidence_score
+        mismatches=mismatches,
+        fraud_flags=fraud_flags,
+        confidence_score=confidence_score,
+        fingerprint=fingerprint,
+        line_variances=line_variances
     )
 
     session.add(match_record)
@@ -90,8 +287,403 @@ def get_match(session: Session, match_id: int) -> Optional[Match]:
     return session.get(Match, match_id)
 
 
+def get_latest_match(session: Session, company_id: int, po_id: int, invoice_id: int,
+                     delivery_id: int = None) -> Optional[Match]:
+    """
+    Most recent match of exactly these documents (two-way when delivery_id is None).
+    """
+    statement = select(Match).where(
+        Match.company_id == company_id,
+        Match.po_id == po_id,
+        Match.invoice_id == invoice_id,
+        Match.delivery_id == delivery_id if delivery_id is not None else Match.delivery_id.is_(None)
+    ).order_by(Match.id.desc()).limit(1)
+    return session.exec(statement).first()
+
+
+def list_matches_for_document(session: Session, doc_id: int) -> List[Match]:
+    """
+    Matches that used the document as either side.
+    """
+    statement = select(Match).where(or_(
+        Match.po_id == doc_id, Match.invoice_id == doc_id, Match.delivery_id == doc_id
+    ))
+    return session.exec(statement.order_by(Match.id)).all()
+
+
+def update_match_result(
+    session: Session,
+    match_record: Match,
+    status: str,
+    mismatches: list,
+    fraud_flags: list,
+    confidence_score: float,
+    fingerprint: str,
+    line_variances: list = None,
+    commit: bool = True
+) -> Match:
+    match_record.status = status
+    match_record.mismatches = mismatches
+    match_record.fraud_flags = fraud_flags
+    match_record.confidence_score = confidence_score
+    match_record.fingerprint = fingerprint
+    match_record.line_variances = line_variances
+    session.add(match_record)
+    if commit:
+        session.commit()
+        session.refresh(match_record)
+    return match_record
+
+
+def get_two_way_matches(session: Session, company_id: int, invoice_ids: List[int],
+                        batch_size: int = 500) -> Dict[Tuple[int, int], List[Match]]:
+    """
+    A company's two-way matches (no delivery) of these invoices, oldest
+    first, keyed by (po_id, invoice_id).
+    """
+    found: Dict[Tuple[int, int], List[Match]] = defaultdict(list)
+    invoice_ids = sorted(set(invoice_ids))
+    for start in range(0, len(invoice_ids), batch_size):
+        statement = select(Match).where(
+            Match.company_id == company_id,
+            Match.delivery_id.is_(None),
+            Match.invoice_id.in_(invoice_ids[start:start + batch_size])
+        ).order_by(Match.id)
+        for match_record in session.exec(statement):
+            found[(match_record.po_id, match_record.invoice_id)].append(match_record)
+    return found
+
+
+def bulk_upsert_matches(session: Session, company_id: int, records: List[dict]) -> dict:
+    """
+    Store many two-way match results in a single transaction, one row per
+    (po, invoice) pair: the pair's latest row is updated in place (and left
+    alone when its fingerprint is unchanged), older copies of it are
+    removed, and new pairs are inserted.
+    Returns how many rows were created, updated and left unchanged.
+    """
+    existing = get_two_way_matches(session, company_id, [r["invoice_id"] for r in records])
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+
+    for r in records:
+        *stale, latest = existing.get((r["po_id"], r["invoice_id"])) or [None]
+        for match_record in stale:
+            session.delete(match_record)
+
+        if latest is None:
+            session.add(Match(
+                company_id=company_id,
+                po_id=r["po_id"],
+                invoice_id=r["invoice_id"],
+                status=r["status"],
+                mismatches=r["mismatches"],
+                fraud_flags=r["fraud_flags"],
+                confidence_score=r["confidence_score"],
+                fingerprint=r.get("fingerprint")
+            ))
+            counts["created"] += 1
+        elif latest.fingerprint is not None and latest.fingerprint == r.get("fingerprint"):
+            counts["unchanged"] += 1
+        else:
+            update_match_result(session, latest, r["status"], r["mismatches"], r["fraud_flags"],
+                                r["confidence_score"], r.get("fingerprint"), commit=False)
+            counts["updated"] += 1
+
+    session.commit()
+    return counts
+
 
-def list_documents_by_company(session: Session, company_id: int):
-    statement = select(Document).where(Document.company_id == company_id).order_by(Document.uploaded_at.desc())
-    results = session.exec(statement).all()
-    return results
+# Columns written by the match export, in output order
+MATCH_EXPORT_FIELDS = (
+    "id", "company_id", "po_id", "invoice_id", "delivery_id", "status",
+    "confidence_score", "created_at", "mismatches", "fraud_flags"
+)
+
+
+def iter_matches(
+    session: Session,
+    company_id: int,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    batch_size: int = 1000
+) -> Iterator[List[dict]]:
+    """
+    A company's matches (oldest first) in lists of up to batch_size rows,
+    read through a server-side cursor so memory stays flat however many
+    rows match. created_from is inclusive, created_to exclusive.
+    Columns are selected rather than Match objects, so nothing piles up in
+    the session's identity map.
+    """
+    statement = select(*[getattr(Match, name) for name in MATCH_EXPORT_FIELDS]).where(
+        Match.company_id == company_id
+    )
+    if created_from:
+        statement = statement.where(Match.created_at >= created_from)
+    if created_to:
+        statement = statement.where(Match.created_at < created_to)
+    statement = statement.order_by(Match.created_at, Match.id).execution_options(yield_per=batch_size)
+
+    for partition in session.exec(statement).partitions():
+        yield [dict(row._mapping) for row in partition]
+
+
+# ---------------------------------------
+# Job CRUD
+# ---------------------------------------
+def create_job(session: Session, kind: str, document_id: int = None, company_id: int = None) -> Job:
+    job = Job(kind=kind, document_id=document_id, company_id=company_id)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def get_job(session: Session, job_id: int) -> Optional[Job]:
+    return session.get(Job, job_id)
+
+
+def update_job_status(session: Session, job_id: int, status: str, result: dict = None, error: str = None):
+    job = session.get(Job, job_id)
+    if job:
+        job.status = status
+        if status not in ("queued", "done", "failed") and job.started_at is None:
+            job.started_at = datetime.utcnow()
+        if status in ("done", "failed"):
+            job.finished_at = datetime.utcnow()
+        if status == "done":
+            job.progress = 1.0
+        if result is not None:
+            job.result = json.dumps(result)
+        if error is not None:
+            job.error = error
+        session.add(job)
+        session.commit()
+    return job
+
+
+def update_job_progress(session: Session, job_id: int, progress: float):
+    job = session.get(Job, job_id)
+    if job:
+        job.progress = round(progress, 4)
+        session.add(job)
+        session.commit()
+    return job
+
+
+def list_unfinished_jobs(session: Session) -> List[Job]:
+    statement = select(Job).where(Job.status.in_(["queued", "ocr", "llm", "running"])).order_by(Job.id)
+    return session.exec(statement).all()
+
+
+# ---------------------------------------
+# Vendor template CRUD
+# ---------------------------------------
+def list_vendor_templates(session: Session) -> List[VendorTemplate]:
+    return session.exec(select(VendorTemplate).order_by(VendorTemplate.id)).all()
+
+
+def upsert_vendor_template(session: Session, data: dict, source_document_id: int = None) -> VendorTemplate:
+    """
+    One template per (vendor_key, doc_type); a newer derivation replaces the old one.
+    """
+    template = session.exec(
+        select(VendorTemplate).where(
+            VendorTemplate.vendor_key == data["vendor_key"],
+            VendorTemplate.doc_type == data["doc_type"]
+        )
+    ).first()
+
+    if template is None:
+        template = VendorTemplate(**data, source_document_id=source_document_id)
+    else:
+        for key, value in data.items():
+            setattr(template, key, value)
+        template.source_document_id = source_document_id
+        template.updated_at = datetime.utcnow()
+
+    session.add(template)
+    session.commit()
+    session.refresh(template)
+    return template
+
+
+def delete_vendor_template(session: Session, template_id: int) -> bool:
+    template = session.get(VendorTemplate, template_id)
+    if not template:
+        return False
+    session.delete(template)
+    session.commit()
+    return True
+
+
+def list_documents_for_templates(session: Session, company_id: int = None) -> List[Document]:
+    """
+    Parsed documents that still have their OCR text (template derivation needs both).
+    """
+    statement = select(Document).where(Document.parsed_json.is_not(None), Document.ocr_text.is_not(None))
+    if company_id is not None:
+        statement = statement.where(Document.company_id == company_id)
+    return session.exec(statement.order_by(Document.id)).all()
+
+
+# ---------------------------------------
+# Vendor item rate history
+# ---------------------------------------
+# Running statistics columns of VendorItemRate (see rate_stats)
+RATE_STAT_FIELDS = ("count", "mean", "m2")
+
+_ITEM_RATE = VendorItemRate.__table__
+_INVOICE_RATES = InvoiceItemRates.__table__
+
+
+def _remove_item_rate():
+    """
+    Welford's remove_rate as one UPDATE (every right-hand side sees the old row).
+    """
+    row, rate = _ITEM_RATE.c, bindparam("rate", type_=Float)
+    m2 = row.m2 - (rate - row.mean) * (rate - row.mean) * row.count / (row.count - 1.0)
+    return _ITEM_RATE.update().where(
+        row.company_id == bindparam("row_company_id"),
+        row.vendor_key == bindparam("row_vendor_key"),
+        row.item_key == bindparam("row_item_key")
+    ).values(
+        count=case((row.count > 1, row.count - 1), else_=0),
+        mean=case((row.count > 1, (row.count * row.mean - rate) / (row.count - 1.0)), else_=0.0),
+        m2=case((and_(row.count > 1, m2 > 0), m2), else_=0.0),
+        updated_at=bindparam("now")
+    )
+
+
+# Built once: every invoice parse runs these, and constructing the
+# statements costs more than executing them on SQLite
+_SELECT_ITEM_RATES = select(
+    VendorItemRate.item_key, *[getattr(VendorItemRate, name) for name in RATE_STAT_FIELDS]
+).where(
+    VendorItemRate.company_id == bindparam("company_id"),
+    VendorItemRate.vendor_key == bindparam("vendor_key"),
+    VendorItemRate.item_key.in_(bindparam("item_keys", expanding=True))
+)
+_SELECT_RECENT_INVOICE_RATES = select(InvoiceItemRates.id).where(
+    InvoiceItemRates.company_id == bindparam("company_id"),
+    InvoiceItemRates.vendor_key == bindparam("vendor_key")
+).order_by(InvoiceItemRates.document_id.desc()).limit(bindparam("window"))
+_SELECT_INVOICE_RATES = select(InvoiceItemRates.id, InvoiceItemRates.rates).where(
+    InvoiceItemRates.id.in_(bindparam("ids", expanding=True))
+)
+
+# Welford's add_rate as one statement: the first rate of an item inserts its
+# row, later ones are folded into it (excluded.mean is the new rate). Plain
+# SQL because SQLAlchemy doesn't cache the compiled form of the dialects'
+# insert().on_conflict_do_update(); SQLite and Postgres both accept it.
+_UPSERT_ITEM_RATE = text("""
+    INSERT INTO vendoritemrate (company_id, vendor_key, item_key, count, mean, m2, updated_at)
+    VALUES (:company_id, :vendor_key, :item_key, 1, :rate, 0.0, :now)
+    ON CONFLICT (company_id, vendor_key, item_key) DO UPDATE SET
+        count = vendoritemrate.count + 1,
+        mean = vendoritemrate.mean + (excluded.mean - vendoritemrate.mean) / (vendoritemrate.count + 1.0),
+        m2 = vendoritemrate.m2 + (excluded.mean - vendoritemrate.mean) * (excluded.mean - vendoritemrate.mean)
+             * vendoritemrate.count / (vendoritemrate.count + 1.0),
+        updated_at = excluded.updated_at
+""").bindparams(bindparam("rate", type_=Float), bindparam("now", type_=DateTime))
+
+_REMOVE_ITEM_RATE = _remove_item_rate()
+_INSERT_INVOICE_RATES = _INVOICE_RATES.insert()
+_DELETE_INVOICE_RATES = _INVOICE_RATES.delete().where(_INVOICE_RATES.c.document_id == bindparam("document_id"))
+
+
+def get_item_rates(session: Session, company_id: int, vendor_key: str, item_keys: List[str]) -> Dict[str, Row]:
+    """
+    The vendor's rate statistics for the given items, keyed by item_key:
+    read-only rows with the RATE_STAT_FIELDS columns (checked on every
+    match, so no ORM objects are built).
+    """
+    if not vendor_key or not item_keys:
+        return {}
+    params = {"company_id": company_id, "vendor_key": vendor_key, "item_keys": sorted(set(item_keys))}
+    return {row.item_key: row for row in session.exec(_SELECT_ITEM_RATES, params=params)}
+
+
+def get_recent_invoice_rate_ids(session: Session, company_id: int, vendor_key: str,
+                                window: int = rate_stats.RECENT_WINDOW) -> List[int]:
+    """
+    InvoiceItemRates ids of the vendor's latest `window` parsed invoices, newest first.
+    """
+    params = {"company_id": company_id, "vendor_key": vendor_key, "window": window}
+    return list(session.exec(_SELECT_RECENT_INVOICE_RATES, params=params))
+
+
+def get_invoice_rates(session: Session, ids: List[int]) -> Dict[int, Dict[str, List[float]]]:
+    """
+    rates_by_item of the given InvoiceItemRates rows, keyed by id.
+    """
+    if not ids:
+        return {}
+    return {row.id: row.rates for row in session.exec(_SELECT_INVOICE_RATES, params={"ids": ids})}
+
+
+def record_item_rates(session: Session, company_id: int, document_id: int,
+                      removed: List[Tuple[str, str, float]], added: List[Tuple[str, str, float]]):
+    """
+    Apply one invoice's rate changes (rate_stats.item_rates tuples) to the
+    rate history, in the caller's transaction: the running statistics are
+    updated in place by the database (one statement per line, nothing read
+    back) and the invoice's rates are stored as one row. Quantiles are left
+    to the readers, so a parse never rewrites the recent window.
+    """
+    now = datetime.utcnow()
+    if removed:
+        session.exec(_REMOVE_ITEM_RATE, params=[
+            {"row_company_id": company_id, "row_vendor_key": vendor, "row_item_key": item, "rate": rate, "now": now}
+            for vendor, item, rate in removed
+        ])
+        session.exec(_DELETE_INVOICE_RATES, params={"document_id": document_id})
+    if added:
+        session.exec(_UPSERT_ITEM_RATE, params=[
+            {"company_id": company_id, "vendor_key": vendor, "item_key": item, "rate": rate, "now": now}
+            for vendor, item, rate in added
+        ])
+        session.exec(_INSERT_INVOICE_RATES, params={
+            "document_id": document_id, "company_id": company_id, "vendor_key": added[0][0],
+            "rates": rate_stats.rates_by_item(added)
+        })
+
+
+def iter_parsed_invoices(session: Session, company_id: int = None,
+                         batch_size: int = 500) -> Iterator[Tuple[int, int, dict]]:
+    """
+    (document_id, company_id, parsed_json) of every parsed invoice, oldest first, read in batches.
+    """
+    statement = select(Document.id, Document.company_id, Document.parsed_json).where(
+        Document.doc_type == "INVOICE", Document.parsed_json.is_not(None)
+    )
+    if company_id is not None:
+        statement = statement.where(Document.company_id == company_id)
+    statement = statement.order_by(Document.id).execution_options(yield_per=batch_size)
+    for row in session.exec(statement):
+        yield row.id, row.company_id, row.parsed_json
+
+
+def replace_item_rates(session: Session, stats: Dict[Tuple[int, str, str], "rate_stats.RateAccumulator"],
+                       invoices: Dict[int, Tuple[int, str, Dict[str, List[float]]]], company_id: int = None) -> int:
+    """
+    Swap the stored rate history (one company's, or all of it) for freshly
+    accumulated statistics and invoice rates, in one transaction.
+    """
+    for model in (VendorItemRate, InvoiceItemRates):
+        statement = delete(model)
+        if company_id is not None:
+            statement = statement.where(model.company_id == company_id)
+        session.exec(statement)
+
+    now = datetime.utcnow()
+    session.add_all([
+        VendorItemRate(company_id=company, vendor_key=vendor, item_key=item, count=s.count, mean=s.mean, m2=s.m2,
+                       updated_at=now)
+        for (company, vendor, item), s in stats.items()
+    ])
+    session.add_all([
+        InvoiceItemRates(document_id=document_id, company_id=company, vendor_key=vendor, rates=rates)
+        for document_id, (company, vendor, rates) in invoices.items()
+    ])
+    session.commit()
+    return len(stats)
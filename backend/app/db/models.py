@@ -1,6 +1,7 @@
 from sqlmodel import SQLModel, Field
-from typing import Optional
-from datetime import datetime
+from sqlalchemy import Column, Index, JSON
+from typing import Any, List, Optional
+from datetime import date, datetime
 
 
 # ------------------------------
@@ -18,30 +19,155 @@ class Company(SQLModel, table=True):
 # Document Table
 # ------------------------------
 class Document(SQLModel, table=True):
+    __table_args__ = (
+        # Per-company listing, newest first (keyset pagination on uploaded_at, id)
+        Index("ix_document_company_uploaded", "company_id", "uploaded_at", "id"),
+        Index("ix_document_company_type", "company_id", "doc_type"),
+        Index("ix_document_file_hash", "file_hash"),
+        # Header search (GET /documents/search)
+        Index("ix_document_company_vendor", "company_id", "vendor_name"),
+        Index("ix_document_company_vendor_key", "company_id", "vendor_name_key"),
+        Index("ix_document_company_date", "company_id", "doc_date"),
+        Index("ix_document_company_total", "company_id", "grand_total"),
+        Index("ix_document_company_number", "company_id", "doc_number"),
+        Index("ix_document_vendor_gstin", "vendor_gstin"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     company_id: Optional[int] = Field(default=None, foreign_key="company.id")
     filename: str
     doc_type: str                          # PO / INVOICE / DELIVERY
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    file_hash: Optional[str] = None        # SHA-256 of the stored bytes
 
-    # OCR + parsed output (store as TEXT/JSON)
+    # OCR + parsed output
     ocr_text: Optional[str] = None
-    parsed_json: Optional[str] = None
+    parsed_json: Optional[Any] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
+
+    # Header fields copied out of parsed_json (validation.header_fields) so
+    # they can be filtered and sorted in SQL; written with parsed_json
+    doc_number: Optional[str] = None
+    doc_date: Optional[date] = None
+    vendor_name: Optional[str] = None
+    vendor_name_key: Optional[str] = None  # lower-cased vendor_name, for prefix search
+    vendor_gstin: Optional[str] = None
+    grand_total: Optional[float] = None
+    currency: Optional[str] = None
 
 
 # ------------------------------
 # Match Table
 # ------------------------------
 class Match(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_match_company_created", "company_id", "created_at"),
+        Index("ix_match_po_invoice", "po_id", "invoice_id"),
+        Index("ix_match_invoice", "invoice_id"),
+        Index("ix_match_delivery", "delivery_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    
+
     company_id: Optional[int] = Field(default=None, foreign_key="company.id")
     po_id: Optional[int] = Field(default=None, foreign_key="document.id")
     invoice_id: Optional[int] = Field(default=None, foreign_key="document.id")
+    delivery_id: Optional[int] = Field(default=None, foreign_key="document.id")   # set for three-way matches
 
     status: Optional[str] = None            # Matched / Warning / Failed
-    mismatches: Optional[str] = None        # JSON string
-    fraud_flags: Optional[str] = None       # JSON string
+    mismatches: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
+    fraud_flags: Optional[List[str]] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
     confidence_score: Optional[float] = None
+    fingerprint: Optional[str] = None       # match_fingerprint() of the inputs scored
+    # Three-way matches: ordered / delivered / billed quantities and rates per line
+    line_variances: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ------------------------------
+# Job Table (background parsing)
+# ------------------------------
+class Job(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_job_status", "status"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    kind: str                               # parse / reconcile
+    document_id: Optional[int] = Field(default=None, foreign_key="document.id")
+    company_id: Optional[int] = Field(default=None, foreign_key="company.id")
+
+    status: str = "queued"                  # queued / ocr / llm / running / done / failed
+    progress: float = 0.0                   # 0.0 - 1.0
+    result: Optional[str] = None            # JSON string
+    error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# ------------------------------
+# Vendor Template Table (rule-based parsing)
+# ------------------------------
+class VendorTemplate(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_vendortemplate_vendor_doc_type", "vendor_key", "doc_type", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    vendor_key: str                         # normalized GSTIN, or vendor name without one
+    doc_type: str = "UNKNOWN"               # PO / INVOICE / DELIVERY / UNKNOWN
+    vendor_name: Optional[str] = None
+    vendor_gstin: Optional[str] = None
+    currency: Optional[str] = None
+
+    fields: Optional[dict] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))   # field -> regex
+    taxes: Optional[dict] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))    # tax type -> regex
+    item_pattern: str                       # one line item per match (multiline regex)
+
+    source_document_id: Optional[int] = Field(default=None, foreign_key="document.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ------------------------------
+# Vendor Item Rate Table (price history per company / vendor / item)
+# ------------------------------
+class VendorItemRate(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_vendoritemrate_company_vendor_item", "company_id", "vendor_key", "item_key", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    company_id: Optional[int] = Field(default=None, foreign_key="company.id")
+    vendor_key: str                         # validation.vendor_key of the invoice
+    item_key: str                           # rate_stats.item_key of the line description
+
+    # Running statistics of the unit rate (Welford; variance = m2 / (count - 1))
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ------------------------------
+# Invoice Item Rates Table (each parsed invoice's rates, for the recent window)
+# ------------------------------
+class InvoiceItemRates(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_invoiceitemrates_document", "document_id", unique=True),
+        Index("ix_invoiceitemrates_company_vendor_document", "company_id", "vendor_key", "document_id"),
+        # A re-parsed invoice's row is replaced, never updated: ids are not reused
+        {"sqlite_autoincrement": True},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    document_id: int = Field(foreign_key="document.id")
+    company_id: Optional[int] = Field(default=None, foreign_key="company.id")
+    vendor_key: str
+    # rate_stats.rates_by_item: {item_key: [unit rates]}
+    rates: Any = Field(sa_column=Column(JSON, nullable=False))
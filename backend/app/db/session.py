@@ -1,16 +1,127 @@
+import time
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as ORMSession
 from sqlmodel import SQLModel, create_engine, Session
 from backend.app.config import settings
+from backend.app.utils import json_codec
+from backend.app.utils.metrics import DB_COMMIT_SECONDS
+from backend.app.logging_config import record_stage
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+# ------------------------------
+# Engine configuration
+# ------------------------------
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _sqlite_pragmas(url: str):
+    """
+    Per-connection SQLite tuning for the engine on `url`:
+    - WAL lets readers proceed while an upload/parse is writing
+    - synchronous=NORMAL is durable enough under WAL and much cheaper than FULL
+    - busy_timeout makes concurrent writers wait instead of failing with "database is locked"
+    """
+    in_memory = _is_sqlite_memory(url)
+
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+    return apply
+
+
+def build_engine(url: str = None) -> Engine:
+    url = url or settings.DATABASE_URL
+
+    kwargs = {
+        "echo": False,           # Set True to see SQL logs
+        # JSON columns (parsed_json, mismatches, fraud_flags) go through orjson, compact
+        "json_serializer": json_codec.dumps,
+        "json_deserializer": json_codec.loads,
+    }
+
+    if _is_sqlite(url):
+        kwargs["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+        }
+        if not _is_sqlite_memory(url):
+            kwargs["pool_size"] = settings.DB_POOL_SIZE
+            kwargs["max_overflow"] = settings.DB_MAX_OVERFLOW
+    else:
+        kwargs["pool_size"] = settings.DB_POOL_SIZE
+        kwargs["max_overflow"] = settings.DB_MAX_OVERFLOW
+        kwargs["pool_pre_ping"] = True
+
+    new_engine = create_engine(url, **kwargs)
+
+    if new_engine.url.get_backend_name() == "sqlite":
+        event.listen(new_engine, "connect", _sqlite_pragmas(new_engine.url.render_as_string(hide_password=False)))
+
+    return new_engine
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=False,           # Set True to see SQL logs
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = build_engine()
+
+
+# ------------------------------
+# Commit timing (every Session, any engine)
+# ------------------------------
+@event.listens_for(ORMSession, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(ORMSession, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        DB_COMMIT_SECONDS.observe(elapsed)
+        record_stage("db_commit", elapsed)
+
+
+@event.listens_for(ORMSession, "after_rollback")
+def _commit_abandoned(session):
+    session.info.pop("commit_started", None)
+
 
 # Initialize tables
 def init_db():
-    SQLModel.metadata.create_all(engine)
+    """
+    Bring the schema up to date. Runs Alembic migrations when enabled
+    (they also adopt databases created earlier by create_all), otherwise
+    falls back to create_all for throwaway/dev databases.
+    """
+    if not settings.DB_AUTO_MIGRATE:
+        SQLModel.metadata.create_all(engine)
+        return
+
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
 
 # Dependency for FastAPI (we will import this in routes)
 def get_session():
@@ -0,0 +1,109 @@
+import logging
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from backend.app.config import settings
+from backend.app.utils import json_codec
+
+# Set per HTTP request by the middleware in main.py (or per background job);
+# contextvars follow the request into threads and tasks it starts
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# Stage name -> seconds spent in it during the current request
+request_stages_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+stage_logger = logging.getLogger("backend.app.timing")
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+# ---------------------------------------------------------
+# Request context
+# ---------------------------------------------------------
+def start_request(request_id: str):
+    """
+    Bind a request id and a fresh stage-timing dict to the current context.
+    Returns tokens for end_request().
+    """
+    return request_id_var.set(request_id), request_stages_var.set({})
+
+
+def end_request(tokens):
+    request_id_token, stages_token = tokens
+    request_stages_var.reset(stages_token)
+    request_id_var.reset(request_id_token)
+
+
+def record_stage(stage: str, seconds: float, **fields):
+    """
+    Add a stage's time to the current request's breakdown and log it (DEBUG).
+    """
+    stages = request_stages_var.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+    if stage_logger.isEnabledFor(logging.DEBUG):
+        stage_logger.debug("stage", extra={"stage": stage, "duration_ms": round(seconds * 1000, 2), **fields})
+
+
+def stage_breakdown_ms() -> Dict[str, float]:
+    return {stage: round(seconds * 1000, 2) for stage, seconds in (request_stages_var.get() or {}).items()}
+
+
+# ---------------------------------------------------------
+# Formatters
+# ---------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, message, request_id, plus
+    any fields passed with `extra=`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = request_id_var.get()
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json_codec.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human-readable variant for local development.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS and not k.startswith("_")}
+        request_id = request_id_var.get()
+        if request_id:
+            extras = {"request_id": request_id, **extras}
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        return line
+
+
+def setup_logging():
+    """
+    Route the app's loggers to stdout in LOG_FORMAT ("json" or "text") at LOG_LEVEL.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT.lower() == "json" else TextFormatter())
+
+    logger = logging.getLogger("backend.app")
+    logger.handlers[:] = [handler]
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
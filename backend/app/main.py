@@ -1,22 +1,154 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
 from backend.app.config import settings
 from backend.app.api.routes_health import router as health_router
 from backend.app.api.routes_documents import router as documents_router
 from backend.app.api.routes_matches import router as matches_router
 from backend.app.api.routes_companies import router as companies_router
+from backend.app.api.routes_cache import router as cache_router
+from backend.app.api.routes_jobs import router as jobs_router
+from backend.app.api.routes_templates import router as templates_router
+from backend.app.api.routes_ocr import router as ocr_router
+from backend.app.api.routes_metrics import router as metrics_router
+from backend.app.api.dependencies import ServiceContainer
 from backend.app.db.session import init_db
+from backend.app.logging_config import end_request, setup_logging, stage_breakdown_ms, start_request
+from backend.app.services.jobs import resume_unfinished_jobs, shutdown_job_queue
+from backend.app.services.llm_client import shutdown_llm_runner
+from backend.app.utils.file_helpers import max_upload_bytes
+from backend.app.utils.metrics import REQUEST_SECONDS
+
+request_logger = logging.getLogger("backend.app.request")
+
+# Room for the multipart boundaries and the small form fields next to the file
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build shared services once; warm them off the event loop so the
+    # server accepts connections immediately and /api/ready flips when done
+    app.state.services = ServiceContainer()
+    app.state.warmup = asyncio.create_task(asyncio.to_thread(app.state.services.warm_up))
+
+    # Pick up parse jobs interrupted by a previous shutdown
+    resume_unfinished_jobs()
+    yield
+    shutdown_job_queue()
+    shutdown_llm_runner()
+
+
+class RequestObservabilityMiddleware:
+    """
+    Binds a request id (the caller's X-Request-ID, or a new one) for the
+    request's log lines, then records its latency and per-stage breakdown.
+    Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware runs
+    the route in a separate task and re-streams its response, which costs
+    about as much as a small route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        tokens = start_request(request_id)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Route template, not the raw path, so ids don't explode label cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(method=scope["method"], route=route, status=status).observe(elapsed)
+            if request_logger.isEnabledFor(logging.INFO):
+                request_logger.info("request", extra={
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "stages": stage_breakdown_ms(),
+                })
+            end_request(tokens)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Enforces MAX_UPLOAD_SIZE_MB on upload routes while the request body is
+    still on the network. Starlette reads and spools the whole multipart
+    body before the route runs, so a check in the route comes too late.
+    A declared Content-Length over the limit is refused without reading
+    the body; otherwise (chunked uploads) the body is counted as it
+    arrives and cut off with a 413 once it crosses the limit.
+    """
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_upload_bytes() + UPLOAD_FORM_OVERHEAD_BYTES
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": "File exceeds maximum upload size."}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the route's body parsing: FastAPI passes
+                    # HTTPExceptions through to its exception handler
+                    raise HTTPException(status_code=413, detail="File exceeds maximum upload size.")
+            return message
+
+        await self.app(scope, limited_receive, send)
 
 
 def create_app() -> FastAPI:
+    setup_logging()
+
     # Initialize DB (creates tables)
     init_db()
 
     app = FastAPI(
         title=settings.APP_NAME,
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
 
+    # Innermost: its 413 must reach the route's body parsing unwrapped
+    app.add_middleware(UploadSizeLimitMiddleware, paths=["/api/upload"])
+
     # CORS (allow frontend to access backend)
     app.add_middleware(
         CORSMiddleware,
@@ -24,13 +156,20 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
     )
+    app.add_middleware(RequestObservabilityMiddleware)
 
     # Register Routers
     app.include_router(health_router, prefix="/api", tags=["Health"])
     app.include_router(documents_router, prefix="/api", tags=["Documents"])
     app.include_router(matches_router, prefix="/api", tags=["Matching"])
     app.include_router(companies_router, prefix="/api", tags=["Companies"])
+    app.include_router(cache_router, prefix="/api", tags=["Cache"])
+    app.include_router(jobs_router, prefix="/api", tags=["Jobs"])
+    app.include_router(templates_router, prefix="/api", tags=["Templates"])
+    app.include_router(ocr_router, prefix="/api", tags=["OCR"])
+    app.include_router(metrics_router, tags=["Metrics"])
 
     return app
 
@@ -25,6 +25,14 @@ class MatchRequestDTO(BaseModel):
     company_id: int
     po_id: int
     invoice_id: int
+    delivery_id: Optional[int] = None   # delivery note / GRN → three-way match
+
+
+# -----------------------------------------------------
+# Bulk Reconciliation Request DTO
+# -----------------------------------------------------
+class BulkMatchRequestDTO(BaseModel):
+    company_id: int
 
 
 # -----------------------------------------------------
@@ -34,3 +42,4 @@ class MatchResultDTO(BaseModel):
     mismatches: List[dict]
     fraud_flags: List[str]
     score: float
+    line_variances: Optional[List[dict]] = None   # three-way matches only
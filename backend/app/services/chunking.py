@@ -0,0 +1,138 @@
+import re
+from typing import List, Optional, Tuple
+from backend.app.services.ocr_adapter import PAGE_BREAK
+
+
+CHUNK_OVERLAP_LINES = 2     # lines repeated at a forced split so a row cut in half is whole somewhere
+
+_BLOCK_BREAK_RE = re.compile(r"\n\s*\n")
+
+
+def _overlap(lines: List[str], budget: int) -> List[str]:
+    """
+    The last CHUNK_OVERLAP_LINES lines, fewer when they would take more than
+    `budget` characters (the room left next to the line that forced the split).
+    """
+    carried, size = [], 0
+    for line in reversed(lines[-CHUNK_OVERLAP_LINES:] if CHUNK_OVERLAP_LINES else []):
+        if size + len(line) + 1 > budget:
+            break
+        carried.insert(0, line)
+        size += len(line) + 1
+    return carried
+
+
+def _split_oversized(block: str, max_chars: int) -> List[Tuple[str, int]]:
+    """
+    Split one block that alone exceeds max_chars on line boundaries,
+    repeating the last few lines of each piece at the start of the next.
+    Returns (piece, number of leading lines repeated from the previous piece).
+    """
+    lines = block.split("\n")
+    pieces, current, carried, size = [], [], 0, 0
+
+    for line in lines:
+        # A single line longer than max_chars is hard-cut, with no overlap
+        while len(line) > max_chars:
+            if len(current) > carried:
+                pieces.append(("\n".join(current), carried))
+            pieces.append((line[:max_chars], 0))
+            line = line[max_chars:]
+            current, carried, size = [], 0, 0
+        if len(current) > carried and size + len(line) + 1 > max_chars:
+            pieces.append(("\n".join(current), carried))
+            current = _overlap(current, max_chars - len(line) - 1)
+            carried = len(current)
+            size = sum(len(l) + 1 for l in current)
+        current.append(line)
+        size += len(line) + 1
+
+    if len(current) > carried:
+        pieces.append(("\n".join(current), carried))
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int) -> Tuple[List[str], List[int]]:
+    """
+    Split OCR text into chunks of at most max_chars for item extraction.
+    Pages (form feeds) are kept whole when they fit and packed together
+    otherwise; a page that is too large is split at blank lines (table/section
+    boundaries) and, failing that, between lines.
+    Returns the chunks and, per chunk, how many of its leading lines repeat
+    the end of the previous chunk (non-zero only after a split between lines).
+    """
+    blocks = []
+    for page in text.split(PAGE_BREAK):
+        if not page.strip():
+            continue
+        if len(page) <= max_chars:
+            blocks.append((page, 0))
+            continue
+        for block in _BLOCK_BREAK_RE.split(page):
+            if not block.strip():
+                continue
+            blocks.extend(_split_oversized(block, max_chars) if len(block) > max_chars else [(block, 0)])
+
+    # A piece carrying overlap never fits next to the piece before it (that
+    # one was flushed because the next line did not fit), so it always
+    # starts a new chunk
+    chunks, overlaps, current, carried = [], [], "", 0
+    for block, block_carried in blocks:
+        if current and len(current) + len(block) + 1 > max_chars:
+            chunks.append(current)
+            overlaps.append(carried)
+            current = ""
+        if not current:
+            carried = block_carried
+        current = f"{current}\n{block}" if current else block
+    if current:
+        chunks.append(current)
+        overlaps.append(carried)
+
+    return chunks, overlaps
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    return chunk_text(text, max_chars)[0]
+
+
+def header_excerpt(text: str, head_chars: int, tail_chars: int) -> str:
+    """
+    Header fields live at the top (number, date, vendor) and the bottom
+    (subtotal, taxes, grand total), so the header pass only sees both ends.
+    """
+    if len(text) <= head_chars + tail_chars:
+        return text
+    return f"{text[:head_chars]}\n...\n{text[-tail_chars:]}"
+
+
+def _item_key(item: dict) -> tuple:
+    description = " ".join(str(item.get("description") or "").lower().split())
+    return (description, item.get("qty"), item.get("rate"), item.get("line_total"))
+
+
+def merge_items(chunk_items: List[List[dict]], overlaps: Optional[List[int]] = None) -> List[dict]:
+    """
+    Concatenate per-chunk line items in document order. overlaps (from
+    chunk_text) gives, per chunk, how many leading lines repeat the previous
+    chunk; only items within that window that match the end of the previous
+    chunk are dropped. Repeats anywhere else, including across a page
+    boundary, are real lines.
+    """
+    merged: List[dict] = []
+    previous: List[dict] = []
+    overlaps = overlaps or [0] * len(chunk_items)
+
+    for items, overlap in zip(chunk_items, overlaps):
+        items = [item for item in (items or []) if isinstance(item, dict)]
+
+        tail_keys = [_item_key(item) for item in previous[-overlap:]] if overlap else []
+        skip = 0
+        while skip < len(items) and tail_keys and _item_key(items[skip]) in tail_keys:
+            tail_keys.remove(_item_key(items[skip]))
+            skip += 1
+
+        merged.extend(items[skip:])
+        previous = items or previous
+
+    return merged
@@ -0,0 +1,207 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from sqlmodel import Session
+from backend.app.config import settings
+from backend.app.db import crud
+from backend.app.db.models import Document, Job
+from backend.app.db.session import engine
+from backend.app.services.ocr_adapter import OCRService, mark_worker_process
+from backend.app.services.llm_adapter import LLMService
+from backend.app.services.parser import ParserService
+from backend.app.services.reconciler import ReconciliationService
+from backend.app.services.rematch import RematchService
+from backend.app.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def run_ocr_stage(local_path: str, file_hash: Optional[str] = None) -> str:
+    """
+    OCR stage entry point. Module-level so it can be pickled into the process pool.
+    Takes a local path: S3 objects are fetched by the parent (see JobQueue._fetch_stage).
+    """
+    return OCRService().extract_text(local_path, file_hash=file_hash)
+
+
+class JobQueue:
+    """
+    In-process worker pool for document parsing.
+
+    OCR is CPU bound and runs in a process pool; fetching S3 objects and the
+    LLM call are I/O bound and run in a thread pool. Bulk reconciliation runs on its own thread (it fans
+    out to a process pool internally). Job state lives in the `job` table, so status can be
+    polled from any request and unfinished jobs are resumed on startup.
+    """
+
+    def __init__(self, ocr_workers: int = None, llm_workers: int = None):
+        self.ocr_pool = ProcessPoolExecutor(max_workers=ocr_workers or settings.JOB_OCR_WORKERS,
+                                            initializer=mark_worker_process)
+        self.llm_pool = ThreadPoolExecutor(
+            max_workers=llm_workers or settings.JOB_LLM_WORKERS,
+            thread_name_prefix="llm-worker"
+        )
+        self.batch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-worker")
+        # Shared by all LLM worker threads (one HTTP client, one response cache)
+        self.llm = LLMService()
+        self.parser = ParserService(llm=self.llm)
+        self.rematch = RematchService()
+
+    # ------------------------------------------------------
+    # Submit
+    # ------------------------------------------------------
+    def submit_parse(self, session: Session, doc: Document) -> Job:
+        """
+        Create a parse job for the document and return immediately.
+        """
+        job = crud.create_job(session, kind="parse", document_id=doc.id)
+        self._enqueue(job.id, doc.id, doc.filename, doc.file_hash)
+        session.refresh(job)
+        return job
+
+    def submit_reconcile(self, session: Session, company_id: int) -> Job:
+        """
+        Create a bulk reconciliation job for the company and return immediately.
+        """
+        job = crud.create_job(session, kind="reconcile", company_id=company_id)
+        self.batch_pool.submit(self._reconcile_stage, job.id, company_id)
+        return job
+
+    def _enqueue(self, job_id: int, doc_id: int, file_path: str, file_hash: Optional[str] = None):
+        # Mark the stage before submitting so a fast worker can't be overwritten
+        with Session(engine) as session:
+            crud.update_job_status(session, job_id, "ocr")
+
+        # Carry the submitting request's id into the job's log lines
+        context = contextvars.copy_context()
+        self.llm_pool.submit(context.run, self._fetch_stage, job_id, doc_id, file_path, file_hash)
+
+    # ------------------------------------------------------
+    # Fetch stage (thread pool)
+    # ------------------------------------------------------
+    def _fetch_stage(self, job_id: int, doc_id: int, file_path: str, file_hash: Optional[str]):
+        """
+        Resolve the stored file to a local path here rather than in the OCR
+        worker: the parent's object cache is shared by every job, so jobs for
+        the same S3 key download it once. Then hand the path to the OCR pool.
+        """
+        try:
+            local_path = get_storage().local_path(file_path)
+        except Exception as e:
+            # Reported as an OCR failure by the LLM stage
+            future = Future()
+            future.set_exception(e)
+        else:
+            future = self.ocr_pool.submit(run_ocr_stage, local_path, file_hash)
+        # Callback runs on the pool's management thread: hand off immediately.
+        # A fresh copy of this (the request's) context: one that is still
+        # entered here can't be entered again on another thread.
+        context = contextvars.copy_context()
+        future.add_done_callback(
+            lambda f: self.llm_pool.submit(context.run, self._llm_stage, job_id, doc_id, f)
+        )
+
+    # ------------------------------------------------------
+    # LLM stage (thread pool)
+    # ------------------------------------------------------
+    def _llm_stage(self, job_id: int, doc_id: int, ocr_future: Future):
+        with Session(engine) as session:
+            try:
+                ocr_text = ocr_future.result()
+                doc = crud.update_document_ocr(session, doc_id, ocr_text)
+                crud.update_job_status(session, job_id, "llm")
+
+                # Vendor template first, LLM otherwise
+                parsed = self.parser.parse_text(ocr_text, document_id=doc_id, doc_type=doc.doc_type if doc else None)
+                rematched = None
+                if parsed is not None:
+                    crud.update_document_parsed(session, doc_id, parsed)
+                    # Matches built from the previous parse are refreshed
+                    rematched = self.rematch.rematch_document(session, doc_id)
+
+                crud.update_job_status(session, job_id, "done", result={"parsed": parsed, "rematched": rematched})
+            except Exception as e:
+                session.rollback()
+                logger.error("Parse job %s failed: %s", job_id, e)
+                crud.update_job_status(session, job_id, "failed", error=str(e))
+
+    # ------------------------------------------------------
+    # Bulk reconciliation (batch thread)
+    # ------------------------------------------------------
+    def _reconcile_stage(self, job_id: int, company_id: int):
+        with Session(engine) as session:
+            try:
+                crud.update_job_status(session, job_id, "running")
+
+                def report(progress: float):
+                    crud.update_job_progress(session, job_id, progress)
+
+                summary = ReconciliationService().reconcile(session, company_id, progress=report)
+                crud.update_job_status(session, job_id, "done", result=summary)
+            except Exception as e:
+                session.rollback()
+                logger.error("Reconcile job %s failed: %s", job_id, e)
+                crud.update_job_status(session, job_id, "failed", error=str(e))
+
+    # ------------------------------------------------------
+    # Recovery / shutdown
+    # ------------------------------------------------------
+    def resume(self, session: Session, jobs) -> int:
+        """
+        Re-enqueue jobs left queued or running by a previous process.
+        """
+        resumed = 0
+        for job in jobs:
+            if job.kind == "reconcile":
+                self.batch_pool.submit(self._reconcile_stage, job.id, job.company_id)
+                resumed += 1
+                continue
+
+            doc = crud.get_document(session, job.document_id)
+            if not doc:
+                crud.update_job_status(session, job.id, "failed", error="Document not found")
+                continue
+            self._enqueue(job.id, doc.id, doc.filename, doc.file_hash)
+            resumed += 1
+        return resumed
+
+    def shutdown(self, wait: bool = True):
+        self.ocr_pool.shutdown(wait=wait, cancel_futures=not wait)
+        self.llm_pool.shutdown(wait=wait, cancel_futures=not wait)
+        self.batch_pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Lazily created process-wide job queue.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def resume_unfinished_jobs() -> int:
+    """
+    Called at startup. Only spins up the worker pools if there is work to resume.
+    """
+    with Session(engine) as session:
+        jobs = crud.list_unfinished_jobs(session)
+        if not jobs:
+            return 0
+        return get_job_queue().resume(session, jobs)
+
+
+def shutdown_job_queue(wait: bool = True):
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown(wait=wait)
+            _queue = None
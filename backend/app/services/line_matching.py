@@ -0,0 +1,163 @@
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+
+
+NGRAM_SIZE = 3
+MIN_SIMILARITY = 0.5        # cosine similarity of n-gram sets to accept a pair
+LINE_TOLERANCE = 0.02       # same 2% tolerance as the grand total check
+DENSE_INDEX_LIMIT = 20_000_000   # lines × vocabulary cells before staying fully sparse
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def to_float(value) -> float:
+    """
+    Best-effort numeric parse ("1,200.50" → 1200.5). Returns NaN when missing.
+    """
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(re.sub(r"[^0-9.\-]", "", str(value)))
+    except ValueError:
+        return np.nan
+
+
+def description_ngrams(text: str, n: int = NGRAM_SIZE) -> List[str]:
+    """
+    Character n-grams per word (padded with spaces), so word order doesn't
+    matter and very short names still produce a few grams.
+    """
+    grams = set()
+    for word in _WORD_RE.findall((text or "").lower()):
+        padded = f" {word} "
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return sorted(grams)
+
+
+class LineItemIndex:
+    """
+    Sparse n-gram index over invoice line descriptions.
+    similarity() scores many query descriptions against every indexed line
+    in a single matrix product.
+    """
+
+    def __init__(self, descriptions: List[str]):
+        self.vocab: Dict[str, int] = {}
+        self.matrix, self.norms = self._vectorize(descriptions, grow=True)
+
+    def _vectorize(self, descriptions: List[str], grow: bool):
+        rows, cols = [], []
+        sizes = np.zeros(len(descriptions), dtype=np.float64)
+
+        for row, text in enumerate(descriptions):
+            grams = description_ngrams(text)
+            sizes[row] = len(grams)
+            for gram in grams:
+                col = self.vocab.get(gram)
+                if col is None:
+                    if not grow:
+                        continue
+                    col = self.vocab[gram] = len(self.vocab)
+                rows.append(row)
+                cols.append(col)
+
+        data = np.ones(len(rows), dtype=np.float32)
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(descriptions), max(1, len(self.vocab))))
+        return matrix, np.sqrt(sizes)
+
+    def similarity(self, descriptions: List[str]) -> np.ndarray:
+        """
+        Cosine similarity matrix (queries × indexed lines).
+        """
+        queries, query_norms = self._vectorize(descriptions, grow=False)
+
+        # Sparse × dense avoids materialising a sparse result that is mostly full
+        # (common grams like "nut" or "pcs" are shared by nearly every line)
+        rows, cols = self.matrix.shape
+        if rows * cols <= DENSE_INDEX_LIMIT:
+            overlap = np.asarray(queries @ self.matrix.T.toarray())
+        else:
+            overlap = (queries @ self.matrix.T).toarray()
+        denom = np.outer(query_norms, self.norms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sim = np.where(denom > 0, overlap / denom, 0.0)
+        return sim
+
+
+def assign_descriptions(left: List[str], right: List[str],
+                        min_similarity: float = MIN_SIMILARITY) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Optimal one-to-one pairing of two lists of line descriptions.
+    Returns parallel arrays (left_index, right_index, similarity) of the
+    accepted pairs.
+    """
+    if not left or not right:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, np.zeros(0)
+
+    sim = LineItemIndex(right).similarity(left)
+
+    # Hungarian assignment maximising total similarity
+    rows, cols = linear_sum_assignment(sim, maximize=True)
+    keep = sim[rows, cols] >= min_similarity
+    return rows[keep], cols[keep], sim[rows[keep], cols[keep]]
+
+
+def assign_line_items(po_items: List[dict], inv_items: List[dict],
+                      min_similarity: float = MIN_SIMILARITY) -> List[Tuple[int, int, float]]:
+    """
+    Optimal one-to-one pairing of PO lines to invoice lines by description.
+    Returns (po_index, invoice_index, similarity) for accepted pairs.
+    """
+    rows, cols, sim = assign_descriptions(
+        [item.get("description") or "" for item in po_items],
+        [item.get("description") or "" for item in inv_items],
+        min_similarity
+    )
+    return [(int(r), int(c), float(s)) for r, c, s in zip(rows, cols, sim)]
+
+
+def compare_matched_lines(po_items: List[dict], inv_items: List[dict],
+                          pairs: List[Tuple[int, int, float]],
+                          tolerance: float = LINE_TOLERANCE) -> List[dict]:
+    """
+    Vectorised qty / rate / line_total comparison for matched line pairs.
+    Returns one mismatch dict per field that differs beyond tolerance.
+    """
+    if not pairs:
+        return []
+
+    po_idx = [p for p, _, _ in pairs]
+    inv_idx = [i for _, i, _ in pairs]
+    mismatches = []
+
+    for field, kind in (("qty", "item_qty_mismatch"),
+                        ("rate", "item_rate_mismatch"),
+                        ("line_total", "item_total_mismatch")):
+        po_vals = np.array([to_float(po_items[p].get(field)) for p in po_idx])
+        inv_vals = np.array([to_float(inv_items[i].get(field)) for i in inv_idx])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel = np.abs(inv_vals - po_vals) / np.where(po_vals != 0, np.abs(po_vals), 1.0)
+
+        # NaN (missing on either side) compares False and is skipped
+        for k in np.nonzero(rel > tolerance)[0]:
+            mismatches.append({
+                "type": kind,
+                "item": (po_items[po_idx[k]].get("description") or "").lower(),
+                "invoice_item": (inv_items[inv_idx[k]].get("description") or "").lower(),
+                f"po_{field}": float(po_vals[k]),
+                f"invoice_{field}": float(inv_vals[k]),
+                "difference_percentage": float(rel[k])
+            })
+
+    return mismatches
@@ -1,38 +1,22 @@
+import asyncio
 import json
+import logging
 from typing import Optional
 from backend.app.config import settings
+from backend.app.services.chunking import chunk_text, header_excerpt, merge_items
+from backend.app.services.llm_cache import LLMResponseCache, get_llm_cache
+from backend.app.services.llm_client import LLMClientRunner, LLMRequestError, get_llm_runner
 
-# OpenAI only if API key is present
-if settings.OPENAI_API_KEY:
-    import openai
-    openai.api_key = settings.OPENAI_API_KEY
-else:
-    openai = None
+logger = logging.getLogger(__name__)
 
 
-class LLMService:
-    """
-    Wrapper around OpenAI. 
-    Later you can swap in Anthropic, Vertex AI, or a local Llama model.
-    """
+# Bump PROMPT_VERSION whenever a prompt template or the chunking changes, so
+# cached responses produced the old way are no longer served.
+PROMPT_VERSION = "v2"
 
-    def __init__(self):
-        self.enabled = settings.OPENAI_API_KEY is not None
+SYSTEM_PROMPT = "You are a JSON-only parser."
 
-    # -----------------------------------------------------
-    # Parse OCR text using LLM → structured JSON
-    # -----------------------------------------------------
-    def parse_ocr_text(self, text: str) -> Optional[dict]:
-        """
-        Sends OCR text to the LLM and expects a JSON response.
-        Returns None if LLM disabled.
-        """
-
-        if not self.enabled:
-            print("[LLM] LLM disabled. Returning None.")
-            return None
-
-        prompt = f"""
+PARSE_PROMPT_TEMPLATE = """
 You are an accurate invoice/PO parser.
 Extract structured JSON using this schema:
 
@@ -56,22 +40,199 @@ Extract structured JSON using this schema:
 Return ONLY valid JSON and nothing else.
 
 Input text:
-{text[:20000]}
+{text}
+"""
+
+# Long documents: header fields once from both ends of the text ...
+HEADER_PROMPT_TEMPLATE = """
+You are an accurate invoice/PO parser.
+The text below is the beginning and end of a long document.
+Extract the document-level fields as JSON using this schema:
+
+{{
+  "doc_type": "PO | INVOICE | DELIVERY | UNKNOWN",
+  "doc_number": "",
+  "date": "",
+  "vendor_name": "",
+  "vendor_gstin": "",
+  "subtotal": 0.0,
+  "taxes": [
+    {{"type": "GST", "amount": 0.0}}
+  ],
+  "grand_total": 0.0,
+  "currency": "INR"
+}}
+
+Return ONLY valid JSON and nothing else.
+
+Input text:
+{text}
 """
 
+# ... and line items from every chunk in parallel
+ITEMS_PROMPT_TEMPLATE = """
+You are an accurate invoice/PO parser.
+The text below is one part of a longer document.
+Extract every line item in it as JSON using this schema:
+
+{{
+  "items": [
+    {{"description": "", "qty": 0, "unit": "", "rate": 0.0, "line_total": 0.0}}
+  ]
+}}
+
+Ignore totals, taxes and header details. Return {{"items": []}} if there are no line items.
+Return ONLY valid JSON and nothing else.
+
+Input text:
+{text}
+"""
+
+
+class LLMService:
+    """
+    Wrapper around an OpenAI-compatible chat completions API.
+    Calls go through the shared async client (bounded concurrency, rate limits,
+    retries); point OPENAI_BASE_URL elsewhere to use another provider or a local model.
+    """
+
+    def __init__(self, cache: Optional[LLMResponseCache] = None, runner: Optional[LLMClientRunner] = None):
+        self.enabled = settings.OPENAI_API_KEY is not None
+        if cache is None and settings.LLM_CACHE_ENABLED:
+            cache = get_llm_cache()
+        self.cache = cache
+        self._runner = runner
+
+    @property
+    def runner(self) -> LLMClientRunner:
+        if self._runner is None:
+            self._runner = get_llm_runner()
+        return self._runner
+
+    # -----------------------------------------------------
+    # Startup warm-up
+    # -----------------------------------------------------
+    def warm_up(self):
+        """
+        Open the response cache so the first parse doesn't scan it, and start
+        the client loop when the LLM is enabled.
+        """
+        if self.cache is not None:
+            self.cache.stats()
+        if self.enabled:
+            self.runner
+
+    # -----------------------------------------------------
+    # Parse OCR text using LLM → structured JSON
+    # -----------------------------------------------------
+    def parse_ocr_text(self, text: str, use_cache: bool = True) -> Optional[dict]:
+        """
+        Sends OCR text to the LLM and expects a JSON response.
+        Identical (whitespace-normalized) text is answered from the response cache.
+        Returns None if LLM disabled. Blocks the calling thread; async code
+        should use aparse_ocr_text.
+        """
+        if not self.enabled:
+            logger.info("LLM disabled. Returning None.")
+            return None
+
+        cached = self._cached(text, use_cache)
+        if cached is not None:
+            return cached
+
+        return self._store(text, self.runner.run(self._call_llm(text)))
+
+    async def aparse_ocr_text(self, text: str, use_cache: bool = True) -> Optional[dict]:
+        """
+        Same as parse_ocr_text, without holding a thread while the LLM responds.
+        """
+        if not self.enabled:
+            logger.info("LLM disabled. Returning None.")
+            return None
+
+        cached = self._cached(text, use_cache)
+        if cached is not None:
+            return cached
+
+        return self._store(text, await self.runner.arun(self._call_llm(text)))
+
+    def cached_parse(self, text: str) -> Optional[dict]:
+        """
+        The cached answer for this OCR text, without calling the LLM.
+        """
+        return self._cached(text, use_cache=True) if self.enabled else None
+
+    def _cached(self, text: str, use_cache: bool) -> Optional[dict]:
+        if use_cache and self.cache is not None:
+            return self.cache.get(text, settings.OPENAI_MODEL, PROMPT_VERSION)
+        return None
+
+    def _store(self, text: str, parsed: Optional[dict]) -> Optional[dict]:
+        # Failed parses return None and are never cached
+        if parsed is not None and self.cache is not None:
+            self.cache.set(text, settings.OPENAI_MODEL, PROMPT_VERSION, parsed)
+        return parsed
+
+    # -----------------------------------------------------
+    # Cache invalidation
+    # -----------------------------------------------------
+    def invalidate_cache(self, text: Optional[str] = None) -> int:
+        """
+        Drop the cached response for one OCR text, or the whole cache when text is None.
+        Returns the number of entries removed.
+        """
+        if self.cache is None:
+            return 0
+        if text is None:
+            return self.cache.clear()
+        return int(self.cache.invalidate(text, settings.OPENAI_MODEL, PROMPT_VERSION))
+
+    async def _call_llm(self, text: str) -> Optional[dict]:
+        """
+        Runs on the client loop. Short text is parsed in one call; longer text
+        goes through _call_llm_chunked.
+        """
+        if len(text) > settings.LLM_CHUNK_CHARS:
+            return await self._call_llm_chunked(text)
+        return await self._complete_json(PARSE_PROMPT_TEMPLATE.format(text=text), settings.LLM_MAX_OUTPUT_TOKENS)
+
+    async def _call_llm_chunked(self, text: str) -> Optional[dict]:
+        """
+        Map-reduce extraction: one header call on both ends of the document and
+        one items call per chunk, all issued together (bounded by the client's
+        concurrency limit), then items are merged in document order.
+        Any failed call fails the whole parse rather than silently dropping items.
+        """
+        chunks, overlaps = chunk_text(text, settings.LLM_CHUNK_CHARS)
+        excerpt = header_excerpt(text, settings.LLM_HEADER_HEAD_CHARS, settings.LLM_HEADER_TAIL_CHARS)
+
+        header, *chunk_results = await asyncio.gather(
+            self._complete_json(HEADER_PROMPT_TEMPLATE.format(text=excerpt), settings.LLM_MAX_OUTPUT_TOKENS),
+            *[
+                self._complete_json(ITEMS_PROMPT_TEMPLATE.format(text=chunk), settings.LLM_MAX_OUTPUT_TOKENS)
+                for chunk in chunks
+            ]
+        )
+
+        if not isinstance(header, dict) or any(not isinstance(r, dict) for r in chunk_results):
+            logger.warning("Chunked parse failed (%d chunks)", len(chunks))
+            return None
+
+        parsed = dict(header)
+        parsed["items"] = merge_items([r.get("items") or [] for r in chunk_results], overlaps)
+        return parsed
+
+    async def _complete_json(self, prompt: str, max_tokens: int) -> Optional[dict]:
         try:
-            response = openai.ChatCompletion.create(
-                model=settings.OPENAI_MODEL,
+            content = await self.runner.client.chat(
                 messages=[
-                    {"role": "system", "content": "You are a JSON-only parser."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user",    "content": prompt}
                 ],
                 temperature=0,
-                max_tokens=1200
+                max_tokens=max_tokens
             )
 
-            content = response["choices"][0]["message"]["content"]
-
             # Try to safely parse JSON portion
             start = content.find("{")
             end = content.rfind("}")
@@ -83,6 +244,10 @@ Input text:
             # fallback
             return json.loads(content)
 
+        except LLMRequestError as e:
+            logger.warning("LLM request failed: %s", e)
+            return None
+
         except Exception as e:
-            print(f"[LLM] Parsing failed: {e}")
+            logger.warning("LLM response parsing failed: %s", e)
             return None
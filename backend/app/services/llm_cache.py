@@ -0,0 +1,118 @@
+import hashlib
+import json
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from backend.app.config import settings
+from backend.app.utils.disk_cache import DiskCache
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace so OCR runs that differ only in spacing share a cache entry.
+    """
+    return " ".join((text or "").split())
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of parsed LLM responses.
+
+    Key = sha256(normalized OCR text | model | prompt version), so changing the
+    model or bumping the prompt template version naturally misses.
+    Entries older than ttl_seconds are treated as misses and removed.
+    """
+
+    def __init__(self, store: DiskCache, ttl_seconds: Optional[int] = None):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    # -------------------------------------------------
+    # Key building
+    # -------------------------------------------------
+    def make_key(self, text: str, model: str, prompt_version: str) -> str:
+        raw = f"{normalize_text(text)}|{model}|{prompt_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    # -------------------------------------------------
+    # Lookup / store
+    # -------------------------------------------------
+    def get(self, text: str, model: str, prompt_version: str) -> Optional[dict]:
+        key = self.make_key(text, model, prompt_version)
+        raw = self.store.get(key)
+        if raw is None:
+            self._count("misses")
+            return None
+
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            self.store.delete(key)
+            self._count("misses")
+            return None
+
+        if self.ttl_seconds and time.time() - entry.get("cached_at", 0) > self.ttl_seconds:
+            self.store.delete(key)
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return entry.get("parsed")
+
+    def set(self, text: str, model: str, prompt_version: str, parsed: dict):
+        key = self.make_key(text, model, prompt_version)
+        entry = {
+            "cached_at": time.time(),
+            "model": model,
+            "prompt_version": prompt_version,
+            "parsed": parsed
+        }
+        self.store.set(key, json.dumps(entry).encode("utf-8"))
+
+    # -------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------
+    def invalidate(self, text: str, model: str, prompt_version: str) -> bool:
+        """
+        Remove the cached response for one input. Returns True if an entry existed.
+        """
+        return self.store.delete(self.make_key(text, model, prompt_version))
+
+    def clear(self) -> int:
+        """
+        Remove all cached responses. Returns the number of entries removed.
+        """
+        return self.store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+@lru_cache(maxsize=1)
+def get_llm_cache() -> LLMResponseCache:
+    """
+    Process-wide LLM response cache, so hit/miss counters survive across requests.
+    """
+    store = DiskCache(
+        Path(settings.CACHE_DIR) / "llm",
+        max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024
+    )
+    return LLMResponseCache(store, ttl_seconds=settings.LLM_CACHE_TTL_SECONDS)
@@ -0,0 +1,291 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import List, Optional
+import httpx
+from backend.app.config import settings
+from backend.app.utils.metrics import LLM_SECONDS, LLM_TOKENS
+from backend.app.logging_config import record_stage
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 30.0
+CHARS_PER_TOKEN = 4         # rough estimate used for tokens/min budgeting
+
+logger = logging.getLogger(__name__)
+
+
+class LLMRequestError(Exception):
+    """
+    The LLM call failed for good: a non-retryable status, or retries exhausted.
+    """
+
+
+def estimate_tokens(messages: List[dict], max_tokens: int) -> int:
+    """
+    Prompt size estimate plus the completion budget, which is what
+    providers count against tokens/min.
+    """
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // CHARS_PER_TOKEN + max_tokens
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """
+    Retry-After as seconds (either delta-seconds or an HTTP date), if present.
+    """
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def record_usage(usage: Optional[dict]) -> dict:
+    """
+    Count the provider-reported prompt/completion tokens of one call.
+    Returns {"prompt_tokens": n, "completion_tokens": n} (what was reported).
+    """
+    counts = {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = (usage or {}).get(kind)
+        if count:
+            LLM_TOKENS.labels(kind=kind.split("_")[0]).inc(count)
+            counts[kind] = count
+    return counts
+
+
+async def _in_context(context: contextvars.Context, coro):
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+# ---------------------------------------------------------
+# Token bucket (requests/min and tokens/min)
+# ---------------------------------------------------------
+class TokenBucket:
+    """
+    Refills continuously at `per_minute / 60` per second up to `per_minute`.
+    acquire() waits until enough budget is available; callers queue in order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # A single call larger than the bucket could never run otherwise
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+# ---------------------------------------------------------
+# Async chat-completions client
+# ---------------------------------------------------------
+class AsyncLLMClient:
+    """
+    OpenAI-compatible /chat/completions client.
+    - at most `max_concurrency` requests in flight
+    - requests/min and tokens/min token buckets (0 disables a limit)
+    - exponential backoff with jitter on 429/5xx, timeouts and connection errors,
+      honouring Retry-After
+    - a hard per-call timeout
+    `transport` lets tests plug in httpx.MockTransport or a local fake server.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        model: str = None,
+        max_concurrency: int = None,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        timeout: float = None,
+        max_retries: int = None,
+        backoff_base: float = None,
+        transport: httpx.AsyncBaseTransport = None
+    ):
+        self.model = model or settings.OPENAI_MODEL
+        self.timeout = timeout if timeout is not None else settings.LLM_TIMEOUT_SECONDS
+        self.max_retries = max_retries if max_retries is not None else settings.LLM_MAX_RETRIES
+        self.backoff_base = backoff_base if backoff_base is not None else settings.LLM_BACKOFF_BASE_SECONDS
+        max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+
+        rpm = requests_per_minute if requests_per_minute is not None else settings.LLM_REQUESTS_PER_MINUTE
+        tpm = tokens_per_minute if tokens_per_minute is not None else settings.LLM_TOKENS_PER_MINUTE
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        api_key = api_key or settings.OPENAI_API_KEY
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.AsyncClient(
+            base_url=base_url or settings.OPENAI_BASE_URL,
+            headers=headers,
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(MAX_BACKOFF_SECONDS, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _throttle(self, tokens: int):
+        if self.request_bucket is not None:
+            await self.request_bucket.acquire(1)
+        if self.token_bucket is not None:
+            await self.token_bucket.acquire(tokens)
+
+    async def chat(self, messages: List[dict], max_tokens: int = 1200, temperature: float = 0) -> str:
+        """
+        Returns the first choice's message content.
+        Raises LLMRequestError when the call can't be completed.
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        tokens = estimate_tokens(messages, max_tokens)
+
+        start = time.perf_counter()
+        outcome, usage = "error", {}
+        try:
+            content, usage = await self._chat(payload, tokens)
+            outcome = "ok"
+            return content
+        finally:
+            elapsed = time.perf_counter() - start
+            LLM_SECONDS.labels(outcome=outcome).observe(elapsed)
+            record_stage("llm", elapsed, outcome=outcome, **usage)
+
+    async def _chat(self, payload: dict, tokens: int) -> tuple:
+        # The slot is held across retries so a struggling provider sees less load, not more
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._throttle(tokens)
+
+                try:
+                    response = await asyncio.wait_for(
+                        self._client.post("/chat/completions", json=payload), self.timeout
+                    )
+                except (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError) as e:
+                    error, delay = f"{type(e).__name__}: {e}", self._backoff(attempt)
+                else:
+                    if response.status_code in RETRY_STATUS:
+                        error = f"HTTP {response.status_code}"
+                        delay = retry_after_seconds(response)
+                        if delay is None:
+                            delay = self._backoff(attempt)
+                        delay = min(delay, MAX_BACKOFF_SECONDS)
+                    elif response.status_code >= 400:
+                        raise LLMRequestError(f"HTTP {response.status_code}: {response.text[:200]}")
+                    else:
+                        try:
+                            body = response.json()
+                            content = body["choices"][0]["message"]["content"]
+                        except (ValueError, KeyError, IndexError, TypeError) as e:
+                            raise LLMRequestError(f"Unexpected response body: {e}")
+                        return content, record_usage(body.get("usage"))
+
+                if attempt == self.max_retries:
+                    break
+                logger.warning("%s, retrying in %.2fs (attempt %d/%d)", error, delay, attempt + 1, self.max_retries)
+                await asyncio.sleep(delay)
+
+        raise LLMRequestError(f"LLM request failed after {self.max_retries + 1} attempts: {error}")
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# ---------------------------------------------------------
+# Shared client on a dedicated event loop
+# ---------------------------------------------------------
+class LLMClientRunner:
+    """
+    Owns one AsyncLLMClient and the event loop it runs on (a daemon thread),
+    so sync code (worker threads) and async routes share the same
+    concurrency and rate limits.
+    """
+
+    def __init__(self, client_factory=AsyncLLMClient):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self._thread.start()
+        # Build the client on its loop so its primitives belong there
+        self.client = asyncio.run_coroutine_threadsafe(self._build(client_factory), self.loop).result()
+
+    @staticmethod
+    async def _build(client_factory):
+        return client_factory()
+
+    def _submit(self, coro):
+        # Tasks on the client loop start from that loop's context; carry the
+        # caller's (request id, stage timings) over so logs and metrics line up
+        return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), self.loop)
+
+    def run(self, coro):
+        """
+        Blocking: run a coroutine on the client loop from a sync thread.
+        """
+        return self._submit(coro).result()
+
+    async def arun(self, coro):
+        """
+        Await a coroutine on the client loop from any other event loop.
+        """
+        return await asyncio.wrap_future(self._submit(coro))
+
+    def close(self):
+        if self.loop.is_running():
+            self.run(self.client.aclose())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+
+@lru_cache(maxsize=1)
+def get_llm_runner() -> LLMClientRunner:
+    """
+    Process-wide runner, created on first use.
+    """
+    return LLMClientRunner()
+
+
+def shutdown_llm_runner():
+    """
+    Close the shared client (if it was ever started). Called on app shutdown.
+    """
+    if get_llm_runner.cache_info().currsize:
+        get_llm_runner().close()
+        get_llm_runner.cache_clear()
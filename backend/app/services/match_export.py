@@ -0,0 +1,50 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterable, Iterator, List
+from backend.app.db.crud import MATCH_EXPORT_FIELDS
+from backend.app.utils import json_codec
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+# ---------------------------------------------------------
+# Encoders: one output chunk per cursor batch
+# ---------------------------------------------------------
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """
+    One JSON object per line; mismatches and fraud_flags stay nested.
+    """
+    for rows in batches:
+        yield "".join(json_codec.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+
+def _csv_cell(value):
+    if isinstance(value, (list, dict)):
+        return json_codec.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """
+    Header row first; mismatches and fraud_flags are JSON-encoded cells.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(MATCH_EXPORT_FIELDS)
+    yield buffer.getvalue().encode("utf-8")
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(row[name]) for name in MATCH_EXPORT_FIELDS] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_chunks(batches: Iterable[List[dict]], fmt: str) -> Iterator[bytes]:
+    return csv_chunks(batches) if fmt == "csv" else ndjson_chunks(batches)
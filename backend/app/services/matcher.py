@@ -1,4 +1,46 @@
-from datetime import datetime
+import hashlib
+from typing import Optional
+from backend.app.services.line_matching import assign_line_items, compare_matched_lines
+from backend.app.services.price_history import flag_rate_anomalies
+from backend.app.services.three_way import reconcile_three_way
+from backend.app.utils import json_codec
+from backend.app.utils.validation import parse_date
+
+# Bump MATCHER_VERSION whenever the scoring rules change, so every stored
+# match fingerprint goes stale and the next re-match recomputes it
+MATCHER_VERSION = "2"
+
+
+def match_status(result: dict) -> str:
+    """
+    Matched / Warning / Failed label stored on a Match row.
+    """
+    if not result["mismatches"] and not result["fraud_flags"]:
+        return "Matched"
+    return "Warning" if result["score"] >= 60 else "Failed"
+
+
+def parsed_hash(parsed) -> str:
+    """
+    SHA-256 of a parsed document in canonical (key-sorted) JSON.
+    """
+    return hashlib.sha256(json_codec.dumps(parsed, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def match_fingerprint(po: dict, inv: dict, grn: dict = None, history: str = None) -> str:
+    """
+    Fingerprint of everything a match result depends on: the parsed
+    documents (the delivery note too for three-way matches), the vendor
+    rate history the invoice was checked against (price_history.baselines_digest)
+    and the matcher rules version.
+    """
+    raw = f"{MATCHER_VERSION}|{parsed_hash(po)}|{parsed_hash(inv)}"
+    if grn is not None:
+        raw += f"|grn:{parsed_hash(grn)}"
+    if history is not None:
+        raw += f"|rates:{history}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
 
 class MatcherService:
     """
@@ -6,6 +48,20 @@ class MatcherService:
     Detects mismatches, fraud flags, and computes a confidence score.
     """
 
+    def match(self, po: dict, inv: dict, grn: dict = None, rate_baselines: dict = None) -> dict:
+        """
+        Three-way match when a delivery note is given, two-way otherwise.
+        rate_baselines (PriceHistoryService.baselines) adds a check of each
+        invoice rate against the vendor's history for the item.
+        """
+        if grn is not None:
+            result = self.match_three_way(po, inv, grn)
+        else:
+            result = self.match_po_and_invoice(po, inv)
+        if rate_baselines:
+            flag_rate_anomalies(result, inv, rate_baselines)
+        return result
+
     # ---------------------------------------------------------
     # Main matching function
     # ---------------------------------------------------------
@@ -36,56 +92,40 @@ class MatcherService:
                 pass
 
         # -----------------------------------------------------
-        # 2. Item-level matching (simple name check)
+        # 2. Item-level matching (n-gram index + optimal assignment)
         # -----------------------------------------------------
-        po_items = { (item.get("description") or "").lower(): item for item in (po.get("items") or []) }
-        inv_items = { (item.get("description") or "").lower(): item for item in (inv.get("items") or []) }
-
-        for name, p_item in po_items.items():
-            if name not in inv_items:
-                # fuzzy fallback: substring match
-                matched = False
-                for inv_name in inv_items.keys():
-                    if name in inv_name or inv_name in name:
-                        matched = True
-                        break
-
-                if not matched:
-                    mismatches.append({
-                        "type": "missing_item_in_invoice",
-                        "item": name
-                    })
-                    score -= 10
+        po_items = [item for item in (po.get("items") or []) if item.get("description")]
+        inv_items = [item for item in (inv.get("items") or []) if item.get("description")]
+
+        pairs = assign_line_items(po_items, inv_items)
+        matched_po = {p for p, _, _ in pairs}
+
+        for idx, p_item in enumerate(po_items):
+            if idx not in matched_po:
+                mismatches.append({
+                    "type": "missing_item_in_invoice",
+                    "item": p_item["description"].lower()
+                })
+                score -= 10
+
+        # Quantity / rate / line total deltas on matched lines
+        line_mismatches = compare_matched_lines(po_items, inv_items, pairs)
+        mismatches.extend(line_mismatches)
+        score -= min(30, 3 * len(line_mismatches))
 
         # -----------------------------------------------------
         # 3. Fraud flag: invoice date earlier than PO date
         # -----------------------------------------------------
-        try:
-            po_date = po.get("date")
-            inv_date = inv.get("date")
-
-            if po_date and inv_date:
-                po_dt = datetime.fromisoformat(po_date)
-                inv_dt = datetime.fromisoformat(inv_date)
-
-                if inv_dt < po_dt:
-                    fraud_flags.append("invoice_date_before_po")
-                    score -= 15
-        except Exception:
-            pass
+        if self._dated_before(inv, po):
+            fraud_flags.append("invoice_date_before_po")
+            score -= 15
 
         # -----------------------------------------------------
         # 4. Vendor mismatch
         # -----------------------------------------------------
-        po_vendor = (po.get("vendor_name") or "").lower()
-        inv_vendor = (inv.get("vendor_name") or "").lower()
-
-        if po_vendor and inv_vendor and po_vendor != inv_vendor:
-            mismatches.append({
-                "type": "vendor_mismatch",
-                "po_vendor": po_vendor,
-                "invoice_vendor": inv_vendor
-            })
+        vendor_mismatch = self._vendor_mismatch(po, inv)
+        if vendor_mismatch:
+            mismatches.append(vendor_mismatch)
             score -= 8
 
         # -----------------------------------------------------
@@ -98,3 +138,60 @@ class MatcherService:
             "fraud_flags": fraud_flags,
             "score": score
         }
+
+    # ---------------------------------------------------------
+    # Three-way matching: PO / invoice / delivery note (GRN)
+    # ---------------------------------------------------------
+    def match_three_way(self, po: dict, inv: dict, grn: dict) -> dict:
+        """
+        Reconcile ordered (PO), delivered (GRN) and billed (invoice)
+        quantities and rates line by line. The invoice is held against
+        what was delivered rather than what was ordered, so partial
+        deliveries billed correctly are not mismatches.
+        Adds "line_variances" (one entry per line) to the usual result.
+        """
+        lines = reconcile_three_way(po.get("items"), inv.get("items"), grn.get("items"))
+        mismatches = list(lines["mismatches"])
+        fraud_flags = list(lines["fraud_flags"])
+        score = 100.0 - lines["penalty"]
+
+        if self._dated_before(inv, po):
+            fraud_flags.append("invoice_date_before_po")
+            score -= 15
+        if self._dated_before(grn, po):
+            fraud_flags.append("delivery_date_before_po")
+            score -= 15
+
+        vendor_mismatch = self._vendor_mismatch(po, inv)
+        if vendor_mismatch:
+            mismatches.append(vendor_mismatch)
+            score -= 8
+
+        return {
+            "mismatches": mismatches,
+            "fraud_flags": fraud_flags,
+            "score": max(0, round(score, 2)),
+            "line_variances": lines["line_variances"]
+        }
+
+    # ---------------------------------------------------------
+    # Header checks shared by both modes
+    # ---------------------------------------------------------
+    @staticmethod
+    def _dated_before(doc: dict, reference: dict) -> bool:
+        # Same date formats as the stored doc_date column (day-first included)
+        doc_date, ref_date = parse_date(doc.get("date")), parse_date(reference.get("date"))
+        return doc_date is not None and ref_date is not None and doc_date < ref_date
+
+    @staticmethod
+    def _vendor_mismatch(po: dict, inv: dict) -> Optional[dict]:
+        po_vendor = (po.get("vendor_name") or "").lower()
+        inv_vendor = (inv.get("vendor_name") or "").lower()
+
+        if po_vendor and inv_vendor and po_vendor != inv_vendor:
+            return {
+                "type": "vendor_mismatch",
+                "po_vendor": po_vendor,
+                "invoice_vendor": inv_vendor
+            }
+        return None
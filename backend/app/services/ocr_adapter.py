@@ -1,56 +1,449 @@
+import logging
+import os
 import subprocess
-from pdfminer.high_level import extract_text as extract_pdf_text
+import hashlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO, StringIO
+from typing import List, Optional, Tuple
+import pdfminer
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
 from PIL import Image
 import pytesseract
 from pathlib import Path
+from backend.app.config import settings
+from backend.app.logging_config import record_stage
+from backend.app.services.image_preprocess import PREPROCESS_VERSION, preprocess_image, preprocess_stats
+from backend.app.utils.disk_cache import DiskCache
+from backend.app.utils.file_helpers import sha256_file
+from backend.app.utils.metrics import OCR_SECONDS, observe, timed
+
+# Rasterizing scanned PDF pages needs pdfium; without it those pages stay empty
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    """
+    Installed Tesseract version (spawns the binary once per process).
+    """
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+
+@lru_cache(maxsize=1)
+def get_ocr_cache() -> DiskCache:
+    """
+    Process-wide OCR result cache (one directory scan per process, not per request).
+    """
+    return DiskCache(
+        Path(settings.CACHE_DIR) / "ocr",
+        max_bytes=settings.OCR_CACHE_MAX_MB * 1024 * 1024
+    )
+
+
+# pdfminer terminates every page with a form feed
+PAGE_BREAK = "\f"
+
+
+def count_pdf_pages(file_path: str) -> int:
+    with open(file_path, "rb") as fp:
+        return sum(1 for _ in PDFPage.get_pages(fp))
+
+
+def extract_pdf_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Extract pages [start, end) and return one string per page (without the page break).
+    Module-level so it can be pickled into the page pool.
+    """
+    rsrcmgr = PDFResourceManager()
+    output = StringIO()
+    device = TextConverter(rsrcmgr, output, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+
+    pages = []
+    offset = 0
+    with open(file_path, "rb") as fp:
+        for page in PDFPage.get_pages(fp, set(range(start, end))):
+            interpreter.process_page(page)
+            text = output.getvalue()
+            pages.append(text[offset:].rstrip(PAGE_BREAK))
+            offset = len(text)
+    device.close()
+    return pages
+
+
+def has_text_layer(page_text: str) -> bool:
+    """
+    A page "has text" when pdfminer found enough letters/digits on it;
+    scanned pages yield nothing (or a stray header) and need OCR.
+    """
+    return sum(ch.isalnum() for ch in page_text) >= settings.PDF_TEXT_LAYER_MIN_CHARS
+
+
+def run_tesseract(image: Image.Image, dpi: Optional[float] = None) -> str:
+    """
+    OCR an in-memory image. The image is piped to Tesseract's stdin as PNG
+    (1-bit after preprocessing, so a few KB) instead of going through a temp file.
+    """
+    buf = BytesIO()
+    image.save(buf, format="PNG")
+
+    cmd = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout"]
+    if dpi:
+        cmd += ["--dpi", str(int(dpi))]
+    proc = subprocess.run(cmd, input=buf.getvalue(), capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace").strip() or "tesseract failed")
+    return proc.stdout.decode("utf-8")
+
+
+def ocr_image(image: Image.Image, dpi: Optional[float] = None) -> Tuple[str, dict]:
+    """
+    Preprocess (if enabled) and OCR one image. Returns (text, stats) with
+    per-step timings in stats["steps_ms"], Tesseract included.
+    """
+    if settings.OCR_PREPROCESS_ENABLED:
+        image, stats = preprocess_image(image, dpi=dpi)
+        dpi = stats["dpi"]
+    else:
+        pixels = image.width * image.height
+        stats = {"steps_ms": {}, "input_pixels": pixels, "output_pixels": pixels}
+
+    start = time.perf_counter()
+    text = run_tesseract(image, dpi)
+    stats["steps_ms"]["tesseract"] = (time.perf_counter() - start) * 1000
+    return text, stats
+
+
+def ocr_image_file(file_path: str) -> Tuple[str, dict]:
+    """
+    OCR an image file. Module-level so it can be pickled into the OCR pool.
+    """
+    with Image.open(file_path) as image:
+        return ocr_image(image)
+
+
+def render_pdf_page(file_path: str, index: int, dpi: int) -> Image.Image:
+    if pdfium is None:
+        raise RuntimeError("pypdfium2 is not installed; scanned PDF pages can't be rasterized")
+
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return pdf[index].render(scale=dpi / 72).to_pil()
+    finally:
+        pdf.close()
+
+
+def ocr_pdf_page(file_path: str, index: int, dpi: int) -> str:
+    """
+    Rasterize one PDF page at `dpi` and run it through the image OCR path.
+    Module-level so it can be pickled into the OCR pool.
+    """
+    return ocr_image(render_pdf_page(file_path, index, dpi), dpi=dpi)[0]
+
+
+def ocr_pdf_page_timed(file_path: str, index: int, dpi: int) -> Tuple[str, float]:
+    """
+    ocr_pdf_page and its duration in seconds, measured where it runs so
+    pooled pages are timed one by one rather than by the parent's wait.
+    """
+    start = time.perf_counter()
+    text = ocr_pdf_page(file_path, index, dpi)
+    return text, time.perf_counter() - start
+
+
+def split_pages(text: str) -> dict:
+    """
+    Split pdfminer output into pages and their [start, end) offsets in text,
+    so downstream stages can work page by page.
+    """
+    pages = []
+    boundaries = []
+    start = 0
+    for page_text in text.split(PAGE_BREAK):
+        end = start + len(page_text)
+        pages.append(page_text)
+        boundaries.append((start, end))
+        start = end + len(PAGE_BREAK)
+
+    # Trailing break after the last page leaves an empty tail
+    if len(pages) > 1 and pages[-1] == "":
+        pages.pop()
+        boundaries.pop()
+
+    return {"pages": pages, "boundaries": boundaries}
+
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=settings.PDF_PAGE_WORKERS)
+        return _page_pool
+
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+# Set by the initializer of every pool whose workers do OCR. Not derived
+# from multiprocessing.parent_process(): uvicorn --reload / --workers also
+# start the API processes through multiprocessing
+_in_worker_process = False
+
+
+def mark_worker_process():
+    global _in_worker_process
+    _in_worker_process = True
+
+
+def _init_ocr_worker():
+    mark_worker_process()
+    # Each worker runs one Tesseract at a time; its own OpenMP threads would
+    # only fight the other workers for cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """
+    Long-lived workers for image / scanned-page OCR, so preprocessing
+    (numpy + PIL) runs outside the API process and Tesseract runs are bounded.
+    """
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(max_workers=settings.OCR_WORKERS, initializer=_init_ocr_worker)
+        return _ocr_pool
+
+
+def in_worker_process() -> bool:
+    # Job OCR already runs in a pool worker; don't fan out again from there
+    return _in_worker_process
 
 
 class OCRService:
 
-    def __init__(self):
-        pass
+    def __init__(self, cache: Optional[DiskCache] = None):
+        if cache is None and settings.OCR_CACHE_ENABLED:
+            cache = get_ocr_cache()
+        self.cache = cache
+
+    # -------------------------------------------------
+    # Startup warm-up
+    # -------------------------------------------------
+    def warm_up(self):
+        """
+        Resolve the Tesseract binary once (it is spawned to read its version).
+        """
+        if tesseract_version() == "unknown":
+            raise RuntimeError("Tesseract binary not found; image OCR is unavailable")
 
     # -------------------------------------------------
     # Extract text from PDF
     # -------------------------------------------------
-    def extract_from_pdf(self, file_path: str) -> str:
+    def extract_from_pdf(self, file_path: str, file_hash: Optional[str] = None) -> str:
         """
-        Extract text from a PDF.
-        Uses pdfminer (pure Python) → no external dependencies
+        Extract text from a PDF, page by page.
+        Pages with a text layer go through pdfminer; pages without one
+        (scans) are rasterized and OCR'd with Tesseract.
         """
         try:
-            text = extract_pdf_text(file_path)
-            return text
+            return self.extract_pdf_pages(file_path, file_hash=file_hash)["text"]
         except Exception as e:
-            print(f"[OCR] PDF text extraction failed: {e}")
+            logger.warning("PDF text extraction failed: %s", e)
             return ""
 
+    # -------------------------------------------------
+    # Page-level PDF extraction (process pool)
+    # -------------------------------------------------
+    def extract_pdf_pages(self, file_path: str, file_hash: Optional[str] = None) -> dict:
+        """
+        Extract a PDF page by page: text layers in one pass (across the page
+        pool for large PDFs), then OCR for the pages that have none.
+        Returns dict:
+        {
+          "text": "...",              # same layout as extract_from_pdf
+          "pages": ["...", ...],      # in page order
+          "boundaries": [(start, end), ...]
+        }
+        """
+        with timed(OCR_SECONDS, "ocr", engine="pdfminer"):
+            total = count_pdf_pages(file_path)
+
+            if total >= settings.PDF_PARALLEL_MIN_PAGES:
+                chunk = max(1, settings.PDF_PAGES_PER_CHUNK)
+                ranges = [(start, min(start + chunk, total)) for start in range(0, total, chunk)]
+
+                pool = get_page_pool()
+                futures = [pool.submit(extract_pdf_page_range, file_path, start, end) for start, end in ranges]
+
+                pages = []
+                for future in futures:
+                    pages.extend(future.result())
+            else:
+                pages = extract_pdf_page_range(file_path, 0, total)
+
+        pages = self._ocr_scanned_pages(file_path, pages, file_hash)
+
+        text = "".join(page + PAGE_BREAK for page in pages)
+        return {"text": text, **split_pages(text)}
+
+    # -------------------------------------------------
+    # OCR fallback for pages without a text layer
+    # -------------------------------------------------
+    def page_cache_key(self, file_hash: str, index: int) -> str:
+        raw = f"page|{file_hash}|{index}|{self.image_engine()}|{settings.PDF_OCR_DPI}dpi"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _ocr_scanned_pages(self, file_path: str, pages: List[str], file_hash: Optional[str]) -> List[str]:
+        """
+        Replace pages without a text layer by their OCR text. Each page's OCR
+        result is cached on its own, so it survives changes that invalidate
+        the whole-document entry (e.g. a pdfminer upgrade).
+        """
+        scanned = [i for i, page in enumerate(pages) if not has_text_layer(page)]
+        if not scanned:
+            return pages
+        if pdfium is None or tesseract_version() == "unknown":
+            logger.warning("%d page(s) without a text layer skipped: pypdfium2/Tesseract unavailable", len(scanned))
+            return pages
+
+        pages = list(pages)
+        keys = {}
+        todo = []
+        if self.cache is not None:
+            file_hash = file_hash or sha256_file(file_path)
+        for i in scanned:
+            if self.cache is not None:
+                keys[i] = self.page_cache_key(file_hash, i)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    pages[i] = cached.decode("utf-8")
+                    continue
+            todo.append(i)
+
+        dpi = settings.PDF_OCR_DPI
+        start = time.perf_counter()
+        if len(todo) == 1 or in_worker_process():
+            # One page: not worth the trip through the pool
+            results = {i: self._run_page_ocr(lambda i=i: ocr_pdf_page_timed(file_path, i, dpi), i) for i in todo}
+        else:
+            pool = get_ocr_pool()
+            futures = {i: pool.submit(ocr_pdf_page_timed, file_path, i, dpi) for i in todo}
+            results = {i: self._run_page_ocr(future.result, i) for i, future in futures.items()}
+        if todo:
+            # Pages are observed one by one; the request's stage gets the wall time
+            record_stage("ocr", time.perf_counter() - start, engine="tesseract")
+
+        for i, text in results.items():
+            if text:
+                pages[i] = text.rstrip(PAGE_BREAK)
+                if i in keys:
+                    self.cache.set(keys[i], pages[i].encode("utf-8"))
+
+        return pages
+
+    @staticmethod
+    def _run_page_ocr(call, index: int) -> str:
+        try:
+            text, seconds = call()
+        except Exception as e:
+            logger.warning("OCR of PDF page %d failed: %s", index + 1, e)
+            return ""
+        OCR_SECONDS.labels(engine="tesseract").observe(seconds)
+        return text
+
     # -------------------------------------------------
     # Extract text from Image (JPG, PNG)
     # -------------------------------------------------
     def extract_from_image(self, file_path: str) -> str:
         """
-        Extract text from image using Tesseract.
+        Extract text from image using Tesseract, after downscaling, binarizing,
+        deskewing and cropping it (see image_preprocess). Runs on the OCR pool.
         Requires Tesseract installed on the system.
         """
         try:
-            img = Image.open(file_path)
-            text = pytesseract.image_to_string(img)
-            return text
+            if in_worker_process():
+                text, stats = ocr_image_file(file_path)
+            else:
+                text, stats = get_ocr_pool().submit(ocr_image_file, file_path).result()
         except Exception as e:
-            print(f"[OCR] Image OCR failed: {e}")
+            logger.warning("Image OCR failed: %s", e)
             return ""
 
+        preprocess_stats.record(stats)
+        return text
+
+    # -------------------------------------------------
+    # Cache key: file content + engine + engine version
+    # -------------------------------------------------
+    @staticmethod
+    def image_engine() -> str:
+        engine = f"tesseract:{tesseract_version()}"
+        if settings.OCR_PREPROCESS_ENABLED:
+            engine += f"+prep:{PREPROCESS_VERSION}@{settings.OCR_TARGET_DPI}dpi"
+        return engine
+
+    def engine_for(self, file_path: str) -> str:
+        """
+        Returns "engine:version" for the extractor that would handle this file.
+        """
+        if Path(file_path).suffix.lower() == ".pdf":
+            # Scanned pages are OCR'd, so the Tesseract version and DPI matter too
+            return f"pdfminer:{pdfminer.__version__}+{self.image_engine()}@{settings.PDF_OCR_DPI}dpi"
+        return self.image_engine()
+
+    def cache_key(self, file_path: str, file_hash: Optional[str] = None) -> str:
+        file_hash = file_hash or sha256_file(file_path)
+        raw = f"{file_hash}|{self.engine_for(file_path)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
     # -------------------------------------------------
     # Auto-detect type and extract
     # -------------------------------------------------
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, file_path: str, file_hash: Optional[str] = None) -> str:
         """
         Automatically selects PDF or image extraction based on extension.
+        Results are cached by file content, so re-OCR of the same bytes is a disk read.
+        Pass file_hash when the SHA-256 of the file is already known.
         """
+        key = None
+        if self.cache is not None:
+            start = time.perf_counter()
+            key = self.cache_key(file_path, file_hash)
+            cached = self.cache.get(key)
+            if cached is not None:
+                observe(OCR_SECONDS, "ocr", time.perf_counter() - start, engine="cache")
+                return cached.decode("utf-8")
+
         ext = Path(file_path).suffix.lower()
 
         if ext == ".pdf":
-            return self.extract_from_pdf(file_path)
+            # Timed inside: the text-layer pass and each OCR'd page separately
+            text = self.extract_from_pdf(file_path, file_hash=file_hash)
         else:
-            return self.extract_from_image(file_path)
+            with timed(OCR_SECONDS, "ocr", engine="tesseract"):
+                text = self.extract_from_image(file_path)
+
+        # Empty output usually means the extractor failed, so don't pin it
+        if key is not None and text:
+            self.cache.set(key, text.encode("utf-8"))
+
+        return text
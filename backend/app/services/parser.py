@@ -1,5 +1,12 @@
+import asyncio
+import logging
+from typing import Optional
+from backend.app.config import settings
 from backend.app.services.ocr_adapter import OCRService
 from backend.app.services.llm_adapter import LLMService
+from backend.app.services.vendor_templates import VendorTemplateService, get_template_service
+
+logger = logging.getLogger(__name__)
 
 
 class ParserService:
@@ -7,21 +14,27 @@ class ParserService:
     High-level orchestrator:
     1. Take uploaded file → path
     2. Run OCR on it → raw text
-    3. Send text to LLM → structured JSON
+    3. Known vendor layout → vendor template (no LLM call)
+    4. Otherwise send text to LLM → structured JSON, and learn a template from it
     """
 
-    def __init__(self):
-        self.ocr = OCRService()
-        self.llm = LLMService()
+    def __init__(self, ocr: Optional[OCRService] = None, llm: Optional[LLMService] = None,
+                 templates: Optional[VendorTemplateService] = None):
+        self.ocr = ocr or OCRService()
+        self.llm = llm or LLMService()
+        if templates is None and settings.TEMPLATE_PARSING_ENABLED:
+            templates = get_template_service()
+        self.templates = templates
 
     # ------------------------------------------------------
-    # Full parse pipeline: OCR → LLM → JSON result
+    # Full parse pipeline: OCR → template / LLM → JSON result
     # ------------------------------------------------------
-    def process_document(self, file_path: str) -> dict:
+    def process_document(self, file_path: str, file_hash: Optional[str] = None,
+                         document_id: Optional[int] = None, doc_type: Optional[str] = None) -> dict:
         """
         Performs:
-        - OCR extraction
-        - LLM parsing (if enabled)
+        - OCR extraction (served from the OCR cache when the file was seen before)
+        - Template or LLM parsing (see parse_text)
         Returns dict:
         {
           "ocr_text": "...",
@@ -30,14 +43,85 @@ class ParserService:
         """
 
         # 1. OCR
-        ocr_text = self.ocr.extract_text(file_path)
+        ocr_text = self.ocr.extract_text(file_path, file_hash=file_hash)
 
-        # 2. LLM parsing
-        parsed_json = None
-        if self.llm.enabled:
-            parsed_json = self.llm.parse_ocr_text(ocr_text)
+        # 2. Structured parsing
+        return {
+            "ocr_text": ocr_text,
+            "parsed": self.parse_text(ocr_text, document_id=document_id, doc_type=doc_type)
+        }
+
+    async def aprocess_document(self, file_path: str, file_hash: Optional[str] = None,
+                                document_id: Optional[int] = None, doc_type: Optional[str] = None) -> dict:
+        """
+        Async variant for async routes: OCR runs in a worker thread, the LLM
+        call is awaited without holding one.
+        """
+        ocr_text = await asyncio.to_thread(self.ocr.extract_text, file_path, file_hash)
 
         return {
             "ocr_text": ocr_text,
-            "parsed": parsed_json
+            "parsed": await self.aparse_text(ocr_text, document_id=document_id, doc_type=doc_type)
         }
+
+    # ------------------------------------------------------
+    # OCR text → structured JSON
+    # ------------------------------------------------------
+    def parse_text(self, ocr_text: str, document_id: Optional[int] = None,
+                   doc_type: Optional[str] = None) -> Optional[dict]:
+        """
+        Vendor template first (one for doc_type, the stored document's type);
+        the LLM only when no template matches or the template's result fails
+        the totals checks. Returns None if neither works.
+        """
+        parsed = self._from_template(ocr_text, doc_type)
+        if parsed is not None:
+            return parsed
+
+        if not self.llm.enabled:
+            return None
+
+        # A cached answer was already learned from when it was first parsed
+        parsed = self.llm.cached_parse(ocr_text)
+        if parsed is not None:
+            return parsed
+
+        parsed = self.llm.parse_ocr_text(ocr_text, use_cache=False)
+        self._learn(ocr_text, parsed, document_id, doc_type)
+        return parsed
+
+    async def aparse_text(self, ocr_text: str, document_id: Optional[int] = None,
+                          doc_type: Optional[str] = None) -> Optional[dict]:
+        parsed = await asyncio.to_thread(self._from_template, ocr_text, doc_type)
+        if parsed is not None:
+            return parsed
+
+        if not self.llm.enabled:
+            return None
+
+        parsed = self.llm.cached_parse(ocr_text)
+        if parsed is not None:
+            return parsed
+
+        parsed = await self.llm.aparse_ocr_text(ocr_text, use_cache=False)
+        await asyncio.to_thread(self._learn, ocr_text, parsed, document_id, doc_type)
+        return parsed
+
+    def _from_template(self, ocr_text: str, doc_type: Optional[str] = None) -> Optional[dict]:
+        if self.templates is None or not ocr_text:
+            return None
+        try:
+            return self.templates.extract(ocr_text, doc_type)
+        except Exception as e:
+            logger.warning("Template extraction failed: %s", e)
+            return None
+
+    def _learn(self, ocr_text: str, parsed: Optional[dict], document_id: Optional[int],
+               doc_type: Optional[str] = None):
+        # Learning is best effort: a failure here must not fail the parse
+        if self.templates is None or not isinstance(parsed, dict):
+            return
+        try:
+            self.templates.learn(ocr_text, parsed, document_id=document_id, doc_type=doc_type)
+        except Exception as e:
+            logger.warning("Template derivation failed: %s", e)
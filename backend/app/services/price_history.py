@@ -0,0 +1,220 @@
+"""
+Per-vendor item rate history and rate anomaly checks.
+
+    python -m backend.app.services.price_history                 # rebuild everything
+    python -m backend.app.services.price_history --company-id 3  # one company
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from backend.app.config import settings
+from backend.app.db import crud
+from backend.app.utils import rate_stats
+
+RATE_ANOMALY_PENALTY = 5
+RATE_ANOMALY_PENALTY_CAP = 20
+# Decoded invoice rate rows kept between checks (up to RECENT_WINDOW per vendor)
+INVOICE_RATES_CACHE_ROWS = 4096
+
+
+@dataclass(frozen=True)
+class RateBaseline:
+    """
+    What an item's rate from this vendor usually is, and the band outside
+    which a new rate is flagged.
+    """
+    count: int
+    mean: float
+    std: float
+    low: float
+    high: float
+
+
+def baseline_from(stats, recent: Sequence[float] = (), exclude: Iterable[float] = ()) -> Optional[RateBaseline]:
+    """
+    Band for one VendorItemRate row and the item's rates on the vendor's
+    recent invoices, optionally with the checked document's own rates taken
+    out first (it is already part of the history). None while there are
+    fewer than PRICE_HISTORY_MIN_SAMPLES prior rates. Constant work per
+    item: Welford removal plus quantiles of the bounded recent window.
+    """
+    exclude = list(exclude)
+    s = rate_stats.RateAccumulator(count=stats.count, mean=stats.mean, m2=stats.m2)
+    for rate in exclude:
+        rate_stats.remove_rate(s, rate)
+    if s.count < settings.PRICE_HISTORY_MIN_SAMPLES:
+        return None
+
+    std = rate_stats.std(s)
+    recent = rate_stats.without(recent, exclude)
+    q_low, _, q_high = rate_stats.quantiles_of(recent) if recent else (s.mean, s.mean, s.mean)
+    sigma, slack = settings.PRICE_HISTORY_SIGMA, settings.PRICE_HISTORY_MIN_DEVIATION
+    high = max(s.mean + sigma * std, q_high) * (1 + slack)
+    low = min(s.mean - sigma * std, q_low) * (1 - slack)
+    return RateBaseline(count=s.count, mean=s.mean, std=std, low=max(0.0, low), high=high)
+
+
+def baselines_digest(baselines: Dict[str, RateBaseline]) -> Optional[str]:
+    """
+    Short hash of the bands a match was checked against (for its
+    fingerprint); None when there was no history to check against.
+    """
+    if not baselines:
+        return None
+    raw = json.dumps(sorted((item, b.count, round(b.low, 4), round(b.high, 4)) for item, b in baselines.items()))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def rate_anomalies(inv: dict, baselines: Dict[str, RateBaseline]) -> Tuple[List[dict], List[str], float]:
+    """
+    Invoice lines whose unit rate falls outside the vendor's band for the
+    item: one dictionary lookup per line. Returns (mismatches, fraud_flags,
+    score penalty).
+    """
+    mismatches = []
+    for _, item, rate in rate_stats.item_rates(inv):
+        baseline = baselines.get(item)
+        if baseline is None or baseline.low <= rate <= baseline.high:
+            continue
+        mismatches.append({
+            "type": "rate_above_history" if rate > baseline.high else "rate_below_history",
+            "item": item,
+            "rate": rate,
+            "historical_mean": round(baseline.mean, 4),
+            "expected_range": [round(baseline.low, 4), round(baseline.high, 4)],
+            "samples": baseline.count
+        })
+
+    fraud_flags = ["rate_spike"] if any(m["type"] == "rate_above_history" for m in mismatches) else []
+    penalty = min(RATE_ANOMALY_PENALTY_CAP, RATE_ANOMALY_PENALTY * len(mismatches))
+    return mismatches, fraud_flags, penalty
+
+
+def flag_rate_anomalies(result: dict, inv: dict, baselines: Dict[str, RateBaseline]) -> dict:
+    """
+    Add rate anomalies to a matcher result (in place) and lower its score.
+    """
+    mismatches, fraud_flags, penalty = rate_anomalies(inv, baselines)
+    result["mismatches"].extend(mismatches)
+    result["fraud_flags"].extend(flag for flag in fraud_flags if flag not in result["fraud_flags"])
+    result["score"] = max(0, round(result["score"] - penalty, 2))
+    return result
+
+
+class PriceHistoryService:
+    """
+    Reads the rate history kept by crud.update_document_parsed (every
+    parsed invoice adds its line rates) and rebuilds it from the stored
+    invoices when needed.
+    """
+
+    def __init__(self, engine: Engine = None):
+        if engine is None:
+            from backend.app.db.session import engine as default_engine
+            engine = default_engine
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._invoice_rates: "OrderedDict[int, Dict[str, List[float]]]" = OrderedDict()
+
+    def recent_rates(self, session: Session, company_id: int, vendor: str) -> List[Dict[str, List[float]]]:
+        """
+        rates_by_item of the vendor's recent invoices. A re-parsed invoice
+        gets a new row rather than an updated one, so decoded rows are kept
+        by id and only rows not seen before are read and decoded.
+        """
+        ids = crud.get_recent_invoice_rate_ids(session, company_id, vendor)
+        with self._lock:
+            found = {}
+            for row_id in ids:
+                if row_id in self._invoice_rates:
+                    self._invoice_rates.move_to_end(row_id)
+                    found[row_id] = self._invoice_rates[row_id]
+
+        missing = [row_id for row_id in ids if row_id not in found]
+        if missing:
+            fetched = crud.get_invoice_rates(session, missing)
+            found.update(fetched)
+            with self._lock:
+                self._invoice_rates.update(fetched)
+                while len(self._invoice_rates) > INVOICE_RATES_CACHE_ROWS:
+                    self._invoice_rates.popitem(last=False)
+        return [found[row_id] for row_id in ids if row_id in found]
+
+    def baselines(self, session: Session, company_id: int, inv: dict, exclude_own: bool = True) -> Dict[str, RateBaseline]:
+        """
+        Bands for the invoice's items from its vendor's history: one query
+        for the statistics and, when some item has enough of them, one for
+        the vendor's recent invoices. exclude_own: the invoice is a stored,
+        parsed INVOICE document, so its own rates are in the history and
+        must not vouch for themselves.
+        """
+        if not settings.PRICE_HISTORY_ENABLED:
+            return {}
+        rates = rate_stats.item_rates(inv)
+        if not rates:
+            return {}
+
+        own = defaultdict(list)
+        for _, item, rate in rates:
+            own[item].append(rate)
+        vendor = rates[0][0]
+        rows = crud.get_item_rates(session, company_id, vendor, list(own))
+        rows = {
+            item: row for item, row in rows.items()
+            if row.count - (len(own[item]) if exclude_own else 0) >= settings.PRICE_HISTORY_MIN_SAMPLES
+        }
+        if not rows:
+            return {}
+
+        recent = defaultdict(list)
+        for invoice_rates in self.recent_rates(session, company_id, vendor):
+            for item in rows.keys() & invoice_rates.keys():
+                recent[item].extend(invoice_rates[item])
+
+        baselines = {}
+        for item, row in rows.items():
+            baseline = baseline_from(row, recent[item], own[item] if exclude_own else ())
+            if baseline is not None:
+                baselines[item] = baseline
+        return baselines
+
+    def rebuild(self, company_id: int = None) -> dict:
+        """
+        Recompute the statistics from every parsed invoice, oldest first.
+        """
+        with Session(self.engine) as session:
+            invoices = 0
+
+            def counted(rows):
+                nonlocal invoices
+                for row in rows:
+                    invoices += 1
+                    yield row
+
+            stats, rates = rate_stats.accumulate_rates(counted(crud.iter_parsed_invoices(session, company_id)))
+            items = crud.replace_item_rates(session, stats, rates, company_id)
+        return {"invoices": invoices, "items": items}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--company-id", type=int, help="only rebuild this company's history")
+    args = parser.parse_args(argv)
+
+    from backend.app.db.session import init_db
+    init_db()
+
+    summary = PriceHistoryService().rebuild(args.company_id)
+    print(f"[PriceHistory] Rebuilt {summary['items']} item histories from {summary['invoices']} invoices")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
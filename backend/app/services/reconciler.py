@@ -0,0 +1,243 @@
+import math
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlmodel import Session
+from backend.app.config import settings
+from backend.app.db import crud
+from backend.app.services.matcher import MatcherService, match_fingerprint, match_status
+from backend.app.services.price_history import PriceHistoryService, baselines_digest, flag_rate_anomalies
+from backend.app.utils.validation import normalize_key
+
+
+# Invoice fields that may carry the PO number they bill against
+PO_REFERENCE_KEYS = ("po_number", "po_reference", "po_ref", "purchase_order")
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9/\-_.]*[A-Za-z0-9]")
+
+
+def amount_band(total, width: float) -> Optional[int]:
+    """
+    Logarithmic amount bucket: neighbouring bands differ by `width` (e.g. 5%).
+    """
+    try:
+        total = float(total)
+    except (TypeError, ValueError):
+        return None
+    if total <= 0:
+        return None
+    return int(math.floor(math.log(total) / math.log1p(width)))
+
+
+class CandidateIndex:
+    """
+    Inverted indexes over a company's parsed POs so each invoice is only
+    scored against plausible POs instead of all of them.
+    """
+
+    def __init__(self, pos: List[Tuple[int, dict]], band_width: float):
+        self.band_width = band_width
+        self.by_doc_number: Dict[str, Set[int]] = defaultdict(set)
+        self.by_gstin: Dict[str, Set[int]] = defaultdict(set)
+        self.by_vendor: Dict[str, Set[int]] = defaultdict(set)
+        self.by_band: Dict[int, Set[int]] = defaultdict(set)
+
+        for po_id, po in pos:
+            if po.get("doc_number"):
+                self.by_doc_number[normalize_key(po["doc_number"])].add(po_id)
+            if po.get("vendor_gstin"):
+                self.by_gstin[normalize_key(po["vendor_gstin"])].add(po_id)
+            if po.get("vendor_name"):
+                self.by_vendor[normalize_key(po["vendor_name"])].add(po_id)
+            band = amount_band(po.get("grand_total"), band_width)
+            if band is not None:
+                self.by_band[band].add(po_id)
+
+    def _band_candidates(self, total) -> Set[int]:
+        band = amount_band(total, self.band_width)
+        if band is None:
+            return set()
+        return self.by_band.get(band - 1, set()) | self.by_band.get(band, set()) | self.by_band.get(band + 1, set())
+
+    def candidates(self, inv: dict, ocr_text: Optional[str] = None) -> Set[int]:
+        # 1. Explicit PO reference is the strongest signal
+        refs = [inv.get(k) for k in PO_REFERENCE_KEYS if inv.get(k)]
+        if ocr_text:
+            # Short tokens (quantities, page numbers) would collide with numeric PO numbers
+            refs.extend(t for t in _TOKEN_RE.findall(ocr_text) if len(t) >= 4)
+
+        by_ref = set()
+        for ref in refs:
+            by_ref |= self.by_doc_number.get(normalize_key(ref), set())
+        if by_ref:
+            return by_ref
+
+        # 2. Same supplier (GSTIN or normalized vendor name)
+        by_supplier = set()
+        if inv.get("vendor_gstin"):
+            by_supplier |= self.by_gstin.get(normalize_key(inv["vendor_gstin"]), set())
+        if inv.get("vendor_name"):
+            by_supplier |= self.by_vendor.get(normalize_key(inv["vendor_name"]), set())
+
+        by_amount = self._band_candidates(inv.get("grand_total"))
+
+        if by_supplier:
+            # Narrow a busy supplier down by amount when that leaves anything
+            narrowed = by_supplier & by_amount
+            return narrowed or by_supplier
+
+        # 3. Unknown supplier: fall back to similar amounts only
+        return by_amount
+
+
+def score_invoice(inv_id: int, inv: dict, candidates: List[Tuple[int, dict]]) -> Tuple[int, Optional[int], Optional[dict]]:
+    """
+    Score one invoice against its candidate POs and keep the best.
+    Module-level so it can be pickled into the process pool.
+    """
+    matcher = MatcherService()
+    best_po_id, best = None, None
+
+    for po_id, po in candidates:
+        result = matcher.match_po_and_invoice(po, inv)
+        if best is None or (result["score"], -len(result["mismatches"])) > (best["score"], -len(best["mismatches"])):
+            best_po_id, best = po_id, result
+
+    return inv_id, best_po_id, best
+
+
+def _score_task(task) -> Tuple[int, Optional[int], Optional[dict]]:
+    return score_invoice(*task)
+
+
+class ReconciliationService:
+    """
+    Bulk PO ↔ Invoice reconciliation for one company:
+    1. Load all parsed POs and invoices once
+    2. Index POs by PO number, GSTIN, vendor and amount band
+    3. Score only candidate pairs, in parallel; an invoice whose stored
+       match is still clean and fresh (same fingerprint) is not re-scored
+    4. Persist the best PO per invoice in one commit, updating stored
+       matches in place and leaving unchanged ones unwritten
+    """
+
+    # A stored result this good cannot be beaten by another candidate
+    CLEAN_SCORE = 100
+
+    def __init__(self, workers: int = None, band_width: float = None, history: PriceHistoryService = None):
+        self.workers = workers or settings.RECONCILE_WORKERS
+        self.band_width = band_width or settings.RECONCILE_AMOUNT_BAND
+        self.history = history or PriceHistoryService()
+
+    def reconcile(self, session: Session, company_id: int,
+                  progress: Optional[Callable[[float], None]] = None) -> dict:
+        pos, invoices = [], []
+        for doc in crud.list_parsed_documents(session, company_id, doc_types=["PO", "INVOICE"]):
+            parsed = crud.decode_parsed(doc)
+            if not isinstance(parsed, dict):
+                continue
+            if doc.doc_type == "PO":
+                pos.append((doc.id, parsed))
+            else:
+                invoices.append((doc.id, parsed, doc.ocr_text))
+
+        index = CandidateIndex(pos, self.band_width)
+        po_by_id = dict(pos)
+        inv_by_id = {inv_id: inv for inv_id, inv, _ in invoices}
+
+        stored = crud.get_two_way_matches(session, company_id, list(inv_by_id))
+        baselines_by_invoice = {}
+
+        def baselines_for(inv_id: int):
+            if inv_id not in baselines_by_invoice:
+                baselines_by_invoice[inv_id] = self.history.baselines(session, company_id, inv_by_id[inv_id])
+            return baselines_by_invoice[inv_id]
+
+        def fingerprint_for(po_id: int, inv_id: int) -> str:
+            return match_fingerprint(po_by_id[po_id], inv_by_id[inv_id], history=baselines_digest(baselines_for(inv_id)))
+
+        tasks, fresh = [], []
+        pairs = 0
+        for inv_id, inv, ocr_text in invoices:
+            ids = sorted(index.candidates(inv, ocr_text))[:settings.RECONCILE_MAX_CANDIDATES]
+            match_record = self._fresh_match(stored, inv_id, ids, fingerprint_for)
+            if match_record is not None:
+                fresh.append(match_record)
+                continue
+            pairs += len(ids)
+            tasks.append((inv_id, inv, [(po_id, po_by_id[po_id]) for po_id in ids]))
+
+        results = []
+        total = len(tasks) or 1
+        report_every = max(1, total // 50)
+
+        def collect(outcomes):
+            for n, outcome in enumerate(outcomes, start=1):
+                results.append(outcome)
+                if progress and (n % report_every == 0 or n == total):
+                    progress(n / total)
+
+        if len(tasks) < settings.RECONCILE_PARALLEL_MIN_INVOICES:
+            # Not worth the process start-up cost
+            collect(score_invoice(*task) for task in tasks)
+        else:
+            chunksize = max(1, len(tasks) // (self.workers * 8))
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                collect(pool.map(_score_task, tasks, chunksize=chunksize))
+
+        records = [
+            {
+                "po_id": m.po_id,
+                "invoice_id": m.invoice_id,
+                "status": m.status,
+                "mismatches": m.mismatches,
+                "fraud_flags": m.fraud_flags,
+                "confidence_score": m.confidence_score,
+                "fingerprint": m.fingerprint
+            }
+            for m in fresh
+        ]
+        for inv_id, po_id, result in results:
+            if po_id is None:
+                continue
+            # Rate history is checked once per invoice, on the PO it was matched to
+            inv = inv_by_id[inv_id]
+            baselines = baselines_for(inv_id)
+            if baselines:
+                flag_rate_anomalies(result, inv, baselines)
+            records.append({
+                "po_id": po_id,
+                "invoice_id": inv_id,
+                "status": match_status(result),
+                "mismatches": result["mismatches"],
+                "fraud_flags": result["fraud_flags"],
+                "confidence_score": result["score"],
+                "fingerprint": fingerprint_for(po_id, inv_id)
+            })
+        written = crud.bulk_upsert_matches(session, company_id, records)
+
+        return {
+            **written,
+            "purchase_orders": len(pos),
+            "invoices": len(invoices),
+            "matched": len(records),
+            "unmatched": len(invoices) - len(records),
+            "invoices_fresh": len(fresh),
+            "pairs_scored": pairs,
+            "pairs_skipped": len(pos) * len(invoices) - pairs
+        }
+
+    def _fresh_match(self, stored, inv_id: int, candidate_ids: List[int], fingerprint_for):
+        """
+        The invoice's stored clean match against one of its current
+        candidates, when its fingerprint shows nothing it depends on has
+        changed; re-scoring would only reproduce it. None otherwise.
+        """
+        for po_id in candidate_ids:
+            rows = stored.get((po_id, inv_id))
+            if not rows or rows[-1].confidence_score < self.CLEAN_SCORE or rows[-1].status != "Matched":
+                continue
+            if rows[-1].fingerprint == fingerprint_for(po_id, inv_id):
+                return rows[-1]
+        return None
@@ -0,0 +1,57 @@
+from typing import Dict
+from sqlmodel import Session
+from backend.app.db import crud
+from backend.app.services.matcher import MatcherService, match_fingerprint, match_status
+from backend.app.services.price_history import PriceHistoryService, baselines_digest
+
+
+class RematchService:
+    """
+    Keeps stored matches in step with their documents. After a document is
+    re-parsed, every match it takes part in is checked against the
+    fingerprint of its current inputs; only those whose fingerprint changed
+    are re-scored, and all of them are written in one commit.
+    """
+
+    def __init__(self, matcher: MatcherService = None, history: PriceHistoryService = None):
+        self.matcher = matcher or MatcherService()
+        self.history = history or PriceHistoryService()
+
+    def rematch_document(self, session: Session, doc_id: int) -> Dict[str, int]:
+        checked = recomputed = 0
+        for match_record in crud.list_matches_for_document(session, doc_id):
+            inv_doc = crud.get_document(session, match_record.invoice_id)
+            po, inv = self._parsed(session, match_record.po_id), self._parsed(session, match_record.invoice_id)
+            grn = self._parsed(session, match_record.delivery_id) if match_record.delivery_id else None
+            if po is None or inv is None or (match_record.delivery_id and grn is None):
+                continue
+
+            checked += 1
+            baselines = self.history.baselines(session, match_record.company_id, inv,
+                                               exclude_own=inv_doc.doc_type == "INVOICE")
+            fingerprint = match_fingerprint(po, inv, grn, baselines_digest(baselines))
+            if fingerprint == match_record.fingerprint:
+                continue
+
+            result = self.matcher.match(po, inv, grn, rate_baselines=baselines)
+            crud.update_match_result(
+                session, match_record,
+                status=match_status(result),
+                mismatches=result["mismatches"],
+                fraud_flags=result["fraud_flags"],
+                confidence_score=result["score"],
+                fingerprint=fingerprint,
+                line_variances=result.get("line_variances"),
+                commit=False
+            )
+            recomputed += 1
+
+        if recomputed:
+            session.commit()
+        return {"checked": checked, "recomputed": recomputed}
+
+    @staticmethod
+    def _parsed(session: Session, doc_id: int):
+        doc = crud.get_document(session, doc_id) if doc_id else None
+        parsed = crud.decode_parsed(doc) if doc else None
+        return parsed if isinstance(parsed, dict) else None
@@ -1,8 +1,20 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from pathlib import Path
+from collections import defaultdict
+import hashlib
 import json
+import os
+import threading
 import uuid
+from backend.app.utils.metrics import REPORT_SECONDS, timed
+
+
+# Bump when the PDF layout changes so previously rendered reports are re-rendered
+REPORT_VERSION = "1"
+
+# Header fields printed for each document (only these affect the report content)
+SUMMARY_KEYS = ["doc_number", "date", "vendor_name", "grand_total"]
 
 
 class ReportService:
@@ -13,6 +25,58 @@ class ReportService:
     def __init__(self, output_dir: str = "./uploads/reports"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._render_locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    # -------------------------------------------------------
+    # Content-addressed report name
+    # -------------------------------------------------------
+    def report_key(self, match_id: int, po: dict, inv: dict, result: dict) -> str:
+        """
+        SHA-256 over everything the PDF shows, so the same match result always
+        maps to the same file and any change produces a new one.
+        """
+        content = {
+            "version": REPORT_VERSION,
+            "match_id": match_id,
+            "po": {k: po.get(k) for k in SUMMARY_KEYS},
+            "inv": {k: inv.get(k) for k in SUMMARY_KEYS},
+            "score": result.get("score"),
+            "mismatches": result.get("mismatches", []),
+            "fraud_flags": result.get("fraud_flags", [])
+        }
+        raw = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # -------------------------------------------------------
+    # Render once, then serve from disk
+    # -------------------------------------------------------
+    def get_or_render(self, match_id: int, po: dict, inv: dict, result: dict) -> tuple:
+        """
+        Returns (path, key). Renders only if no report exists for this content;
+        concurrent requests for the same report wait for a single render.
+        """
+        key = self.report_key(match_id, po, inv, result)
+        file_path = self.output_dir / f"report_{key}.pdf"
+
+        if file_path.exists():
+            return file_path, key
+
+        with self._locks_guard:
+            lock = self._render_locks[key]
+
+        with lock:
+            if not file_path.exists():
+                # Render to a temp name so a half-written PDF is never served
+                tmp = file_path.with_name(f"{file_path.stem}.{uuid.uuid4().hex}.tmp")
+                with timed(REPORT_SECONDS, "report"):
+                    self._render(tmp, match_id, po, inv, result)
+                os.replace(tmp, file_path)
+
+        with self._locks_guard:
+            self._render_locks.pop(key, None)
+
+        return file_path, key
 
     # -------------------------------------------------------
     # Generate PDF report
@@ -28,10 +92,10 @@ class ReportService:
 
         Returns: file path to the PDF report.
         """
+        file_path, _ = self.get_or_render(match_id, po, inv, result)
+        return str(file_path)
 
-        filename = f"report_{match_id}_{uuid.uuid4().hex}.pdf"
-        file_path = self.output_dir / filename
-
+    def _render(self, file_path: Path, match_id: int, po: dict, inv: dict, result: dict):
         # Create PDF
         c = canvas.Canvas(str(file_path), pagesize=A4)
         width, height = A4
@@ -63,7 +127,7 @@ class ReportService:
         y -= 25
 
         c.setFont("Helvetica", 12)
-        for key in ["doc_number", "date", "vendor_name", "grand_total"]:
+        for key in SUMMARY_KEYS:
             c.drawString(60, y, f"{key}: {po.get(key)}")
             y -= 18
 
@@ -77,7 +141,7 @@ class ReportService:
         y -= 25
 
         c.setFont("Helvetica", 12)
-        for key in ["doc_number", "date", "vendor_name", "grand_total"]:
+        for key in SUMMARY_KEYS:
             c.drawString(60, y, f"{key}: {inv.get(key)}")
             y -= 18
 
@@ -128,5 +192,3 @@ class ReportService:
 
         # Save PDF
         c.save()
-
-        return str(file_path)
@@ -1,10 +1,136 @@
 from backend.app.config import settings
-from backend.app.utils.file_helpers import save_local_file, ensure_upload_dir
+from backend.app.utils.disk_cache import DiskCache
+from backend.app.utils.file_helpers import save_local_file, ensure_upload_dir, max_upload_bytes, FileTooLargeError
+from backend.app.utils.metrics import STORAGE_SECONDS, timed
+import asyncio
+import hashlib
+import os
+import threading
+import aiofiles
 import boto3
+from botocore.config import Config
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict
 import uuid
 
 
+class ObjectCache:
+    """
+    Read-through local copy of S3 objects, for consumers that need a file
+    path (pdfminer, Tesseract).
+
+    - Objects are downloaded as streamed ranged GETs; objects larger than
+      S3_DOWNLOAD_PART_MB fetch their ranges in parallel into one file.
+    - Files live in a DiskCache: written to a temp file and renamed into
+      place, evicted least-recently-used past S3_CACHE_MAX_MB. A file
+      fetched within S3_CACHE_MIN_IDLE_SECONDS is not evicted by any
+      process sharing the cache, so it stays in place while being OCR'd.
+    - Objects larger than the whole cache are refused (FileTooLargeError).
+    - Concurrent requests for the same key in this process share one
+      download. Other processes don't see it, so worker pools are handed
+      paths resolved in the parent (see JobQueue).
+
+    Upload keys are unique and never overwritten, so a cached copy is
+    served without asking S3 whether it changed.
+    """
+
+    def __init__(self, s3, bucket: str, cache: DiskCache):
+        self.s3 = s3
+        self.bucket = bucket
+        self.cache = cache
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.downloads = 0
+
+    @staticmethod
+    def entry_name(key: str) -> str:
+        # Keep the extension: OCR picks PDF vs image extraction by it
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + Path(key).suffix.lower()
+
+    def fetch(self, key: str) -> str:
+        """
+        Local path of the object, downloading it on a miss.
+        """
+        name = self.entry_name(key)
+        path = self.cache.get_path(name)
+        if path is not None:
+            with self._lock:
+                self.hits += 1
+            return str(path)
+
+        with self._lock:
+            future = self._inflight.get(name)
+            owner = future is None
+            if owner:
+                future = self._inflight[name] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            path = self.cache.get_path(name)
+            if path is None:
+                with timed(STORAGE_SECONDS, "storage", backend="s3", op="download"):
+                    path = self._download(key, name)
+            future.set_result(str(path))
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(name, None)
+        return str(path)
+
+    def evict(self, key: str) -> bool:
+        return self.cache.delete(self.entry_name(key))
+
+    def _download(self, key: str, name: str) -> Path:
+        head = self.s3.head_object(Bucket=self.bucket, Key=key)
+        size = head["ContentLength"]
+        if size > self.cache.max_bytes:
+            raise FileTooLargeError(f"Object {key} ({size} bytes) is larger than the local cache (S3_CACHE_MAX_MB).")
+        part = max(1, settings.S3_DOWNLOAD_PART_MB) * 1024 * 1024
+        ranges = [(start, min(start + part, size) - 1) for start in range(0, size, part)]
+
+        tmp = self.cache.temp_path(name)
+        try:
+            with open(tmp, "wb") as f:
+                f.truncate(size)
+
+            if len(ranges) == 1:
+                self._fetch_range(key, head["ETag"], tmp, *ranges[0])
+            elif ranges:
+                workers = min(len(ranges), max(1, settings.S3_DOWNLOAD_CONCURRENCY))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-range") as pool:
+                    futures = [pool.submit(self._fetch_range, key, head["ETag"], tmp, start, end)
+                               for start, end in ranges]
+                    for f in futures:
+                        f.result()
+
+            path = self.cache.put_file(name, tmp)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self.downloads += 1
+        return path
+
+    def _fetch_range(self, key: str, etag: str, tmp: Path, start: int, end: int):
+        # IfMatch: every range must come from the same version of the object
+        body = self.s3.get_object(
+            Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag
+        )["Body"]
+        chunk_size = settings.UPLOAD_CHUNK_SIZE_KB * 1024
+        with open(tmp, "r+b") as f:
+            f.seek(start)
+            for chunk in body.iter_chunks(chunk_size):
+                f.write(chunk)
+
+
 class StorageService:
 
     def __init__(self):
@@ -15,13 +141,36 @@ class StorageService:
                 "s3",
                 region_name=settings.S3_REGION,
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
             )
+            self.objects = ObjectCache(
+                self.s3,
+                settings.S3_BUCKET,
+                DiskCache(Path(settings.CACHE_DIR) / "objects", max_bytes=settings.S3_CACHE_MAX_MB * 1024 * 1024,
+                          min_idle_seconds=settings.S3_CACHE_MIN_IDLE_SECONDS)
+            )
+
+    # ------------------------------------------------
+    # Startup warm-up
+    # ------------------------------------------------
+    def warm_up(self):
+        """
+        Create the upload dir, or open a pooled connection to the bucket in S3 mode.
+        """
+        if self.storage_type == "local":
+            ensure_upload_dir()
+        elif self.storage_type == "s3":
+            self.s3.head_bucket(Bucket=settings.S3_BUCKET)
 
     # ------------------------------------------------
     # Save file (local or S3)
     # ------------------------------------------------
     def save(self, file_bytes: bytes, filename: str) -> str:
+        with timed(STORAGE_SECONDS, "storage", backend=self.storage_type, op="save"):
+            return self._save(file_bytes, filename)
+
+    def _save(self, file_bytes: bytes, filename: str) -> str:
         if self.storage_type == "local":
             return save_local_file(file_bytes, filename)
 
@@ -37,6 +186,121 @@ class StorageService:
         else:
             raise ValueError("Invalid STORAGE_TYPE in settings.")
 
+    # ------------------------------------------------
+    # Save an upload stream chunk by chunk (local or S3)
+    # ------------------------------------------------
+    async def save_stream(self, stream, filename: str) -> dict:
+        """
+        Copy an async stream (anything with `await read(n)`, e.g. UploadFile)
+        to storage in fixed-size chunks, hashing as it goes.
+        Raises FileTooLargeError as soon as more than MAX_UPLOAD_SIZE_MB has
+        been read from the stream. For an UploadFile that is after Starlette
+        has spooled the request; the network-side limit is applied by
+        UploadSizeLimitMiddleware.
+        Returns {"path": ..., "sha256": ..., "size": ...}.
+        """
+        if self.storage_type == "local":
+            with timed(STORAGE_SECONDS, "storage", backend="local", op="save"):
+                return await self._save_stream_local(stream, filename)
+
+        elif self.storage_type == "s3":
+            with timed(STORAGE_SECONDS, "storage", backend="s3", op="save"):
+                return await self._save_stream_s3(stream, filename)
+
+        else:
+            raise ValueError("Invalid STORAGE_TYPE in settings.")
+
+    async def _read_chunks(self, stream, digest):
+        chunk_size = settings.UPLOAD_CHUNK_SIZE_KB * 1024
+        limit = max_upload_bytes()
+        size = 0
+
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise FileTooLargeError("File exceeds maximum upload size.")
+            digest.update(chunk)
+            yield chunk
+
+    async def _save_stream_local(self, stream, filename: str) -> dict:
+        dest = ensure_upload_dir() / filename
+        tmp = dest.with_name(f"{dest.name}.part")
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                async for chunk in self._read_chunks(stream, digest):
+                    await f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        return {"path": str(dest), "sha256": digest.hexdigest(), "size": size}
+
+    async def _save_stream_s3(self, stream, filename: str) -> dict:
+        key = f"uploads/{uuid.uuid4().hex}_{filename}"
+        part_size = max(5, settings.S3_MULTIPART_PART_MB) * 1024 * 1024
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        size = 0
+        upload_id = None
+        parts = []
+
+        async def flush_part():
+            nonlocal upload_id
+            if upload_id is None:
+                created = await asyncio.to_thread(
+                    self.s3.create_multipart_upload, Bucket=settings.S3_BUCKET, Key=key
+                )
+                upload_id = created["UploadId"]
+            number = len(parts) + 1
+            res = await asyncio.to_thread(
+                self.s3.upload_part,
+                Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id,
+                PartNumber=number, Body=bytes(buffer)
+            )
+            parts.append({"ETag": res["ETag"], "PartNumber": number})
+            buffer.clear()
+
+        try:
+            async for chunk in self._read_chunks(stream, digest):
+                buffer.extend(chunk)
+                size += len(chunk)
+                if len(buffer) >= part_size:
+                    await flush_part()
+
+            if upload_id is None:
+                # Small file: a single PUT is cheaper than a multipart upload
+                await asyncio.to_thread(
+                    self.s3.put_object, Bucket=settings.S3_BUCKET, Key=key, Body=bytes(buffer)
+                )
+            else:
+                if buffer:
+                    await flush_part()
+                await asyncio.to_thread(
+                    self.s3.complete_multipart_upload,
+                    Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id,
+                    MultipartUpload={"Parts": parts}
+                )
+        except BaseException:
+            if upload_id is not None:
+                try:
+                    await asyncio.to_thread(
+                        self.s3.abort_multipart_upload,
+                        Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id
+                    )
+                except Exception:
+                    pass
+            raise
+
+        return {"path": key, "sha256": digest.hexdigest(), "size": size}
+
     # ------------------------------------------------
     # Retrieve file (returns local path or S3 URL)
     # ------------------------------------------------
@@ -54,3 +318,39 @@ class StorageService:
 
         else:
             raise ValueError("Invalid STORAGE_TYPE in settings.")
+
+    # ------------------------------------------------
+    # Local file for a stored path (S3 objects via the read-through cache)
+    # ------------------------------------------------
+    def local_path(self, path: str) -> str:
+        if self.storage_type == "local":
+            return Path(path).as_posix()
+
+        elif self.storage_type == "s3":
+            return self.objects.fetch(path)
+
+        else:
+            raise ValueError("Invalid STORAGE_TYPE in settings.")
+
+    # ------------------------------------------------
+    # Delete file (local or S3)
+    # ------------------------------------------------
+    def delete(self, path: str):
+        if self.storage_type == "local":
+            Path(path).unlink(missing_ok=True)
+
+        elif self.storage_type == "s3":
+            with timed(STORAGE_SECONDS, "storage", backend="s3", op="delete"):
+                self.s3.delete_object(Bucket=settings.S3_BUCKET, Key=path)
+            self.objects.evict(path)
+
+        else:
+            raise ValueError("Invalid STORAGE_TYPE in settings.")
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> StorageService:
+    """
+    Process-wide storage service, so concurrent fetches of one object share a download.
+    """
+    return StorageService()
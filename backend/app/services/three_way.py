@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+from backend.app.services.line_matching import LINE_TOLERANCE, assign_descriptions, to_float
+
+MISSING_LINE_PENALTY = 10
+MISSING_LINE_PENALTY_CAP = 40
+VARIANCE_PENALTY = 3
+VARIANCE_PENALTY_CAP = 30
+
+# Line issue code -> (mismatch type or None when informational only, penalty kind)
+LINE_ISSUES = {
+    "open": (None, None),                                          # neither delivered nor billed yet
+    "short_delivery": (None, None),                                # partial delivery, billed accordingly
+    "missing_item_in_invoice": ("missing_item_in_invoice", "missing"),   # delivered, not billed
+    "not_delivered": ("item_not_delivered", "missing"),            # billed, never received
+    "over_delivery": ("over_delivery", "variance"),
+    "billed_exceeds_delivered": ("billed_qty_exceeds_delivered", "variance"),
+    "rate_mismatch": ("item_rate_mismatch", "variance"),
+}
+
+
+@dataclass
+class LineColumns:
+    """
+    One document's line items as parallel arrays, NaN where a value is
+    missing. A missing rate is derived from line_total / qty.
+    """
+    description: List[str]
+    qty: np.ndarray
+    rate: np.ndarray
+    line_total: np.ndarray
+
+    @classmethod
+    def from_items(cls, items) -> "LineColumns":
+        items = [item for item in (items or []) if isinstance(item, dict) and item.get("description")]
+
+        def column(field: str) -> np.ndarray:
+            return np.fromiter((to_float(item.get(field)) for item in items), dtype=np.float64, count=len(items))
+
+        qty, rate, line_total = column("qty"), column("rate"), column("line_total")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(np.isnan(rate) & (qty != 0), line_total / qty, rate)
+        return cls([str(item["description"]) for item in items], qty, rate, line_total)
+
+    def __len__(self) -> int:
+        return len(self.description)
+
+
+def take(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """
+    values[index], NaN where index is -1 (no counterpart line).
+    """
+    if len(values) == 0:
+        return np.full(len(index), np.nan)
+    return np.where(index >= 0, values[np.maximum(index, 0)], np.nan)
+
+
+def align(anchor: LineColumns, other: LineColumns):
+    """
+    For each anchor line, the index of its counterpart in `other` (-1 when
+    none), plus the indices of `other` lines left unpaired.
+    """
+    rows, cols, _ = assign_descriptions(anchor.description, other.description)
+    index = np.full(len(anchor), -1, dtype=np.intp)
+    index[rows] = cols
+    return index, np.setdiff1d(np.arange(len(other)), cols)
+
+
+def relative(diff: np.ndarray, base: np.ndarray) -> np.ndarray:
+    # Same convention as compare_matched_lines: a zero base counts as 1
+    with np.errstate(invalid="ignore"):
+        return diff / np.where(base != 0, np.abs(base), 1.0)
+
+
+def _json_list(values: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else round(v, 4) for v in values.tolist()]  # v != v: NaN
+
+
+# ---------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------
+def reconcile_three_way(po_items, inv_items, grn_items, tolerance: float = LINE_TOLERANCE) -> dict:
+    """
+    Pair invoice and delivery lines to PO lines by description, then compare
+    ordered / delivered / billed quantities and PO / invoice rates as whole
+    columns. Returns mismatches, fraud flags, a score penalty and
+    line_variances: one entry per PO line, then any invoice or delivery
+    lines that match no PO line.
+    """
+    po = LineColumns.from_items(po_items)
+    inv = LineColumns.from_items(inv_items)
+    grn = LineColumns.from_items(grn_items)
+
+    inv_index, extra_inv = align(po, inv)
+    grn_index, extra_grn = align(po, grn)
+    invoiced, received = inv_index >= 0, grn_index >= 0
+
+    ordered = po.qty
+    delivered = take(grn.qty, grn_index)
+    billed = take(inv.qty, inv_index)
+    po_rate = po.rate
+    inv_rate = take(inv.rate, inv_index)
+
+    delivery_var = delivered - ordered
+    billing_var = billed - delivered
+    rate_var = inv_rate - po_rate
+    amount_var = billed * inv_rate - delivered * po_rate
+    delivery_pct = relative(delivery_var, ordered)
+    billing_pct = relative(billing_var, delivered)
+    rate_pct = relative(rate_var, po_rate)
+
+    # NaN (a value missing on either side) compares False: no issue raised
+    issue_masks = {
+        "open": ~invoiced & ~received,
+        "short_delivery": received & (delivery_pct < -tolerance),
+        "missing_item_in_invoice": received & ~invoiced,
+        "not_delivered": invoiced & ~received,
+        "over_delivery": received & (delivery_pct > tolerance),
+        "billed_exceeds_delivered": invoiced & received & (billing_pct > tolerance),
+        "rate_mismatch": invoiced & (np.abs(rate_pct) > tolerance),
+    }
+
+    issues: List[List[str]] = [[] for _ in range(len(po))]
+    for code, mask in issue_masks.items():
+        for k in np.flatnonzero(mask):
+            issues[k].append(code)
+
+    columns = {
+        "ordered_qty": _json_list(ordered),
+        "delivered_qty": _json_list(delivered),
+        "billed_qty": _json_list(billed),
+        "po_rate": _json_list(po_rate),
+        "invoice_rate": _json_list(inv_rate),
+        "delivery_qty_variance": _json_list(delivery_var),
+        "billing_qty_variance": _json_list(billing_var),
+        "rate_variance": _json_list(rate_var),
+        "amount_variance": _json_list(amount_var),
+    }
+    percentages = {
+        "over_delivery": delivery_pct,
+        "billed_exceeds_delivered": billing_pct,
+        "rate_mismatch": rate_pct,
+    }
+
+    line_variances, mismatches = [], []
+    penalties = {"missing": 0, "variance": 0}
+    for k, description in enumerate(po.description):
+        entry = {"line": k, "description": description, **{name: values[k] for name, values in columns.items()},
+                 "issues": issues[k]}
+        line_variances.append(entry)
+
+        for code in issues[k]:
+            mismatch_type, kind = LINE_ISSUES[code]
+            if mismatch_type is None:
+                continue
+            mismatch = {"type": mismatch_type, "item": description.lower(), "line": k}
+            if code in percentages:
+                mismatch.update({name: entry[name] for name in ("ordered_qty", "delivered_qty", "billed_qty",
+                                                                "po_rate", "invoice_rate")})
+                mismatch["difference_percentage"] = float(percentages[code][k])
+            mismatches.append(mismatch)
+            penalties[kind] += 1
+
+    # Lines on the invoice / delivery note that were never ordered
+    blank = {name: None for name in columns}
+    for source, lines, extra, qty_field, rate_field in (("invoice", inv, extra_inv, "billed_qty", "invoice_rate"),
+                                                        ("delivery", grn, extra_grn, "delivered_qty", None)):
+        qty, rate = _json_list(lines.qty[extra]), _json_list(lines.rate[extra])
+        for n, k in enumerate(extra.tolist()):
+            entry = {"line": None, "description": lines.description[k], **blank, qty_field: qty[n]}
+            if rate_field:
+                entry[rate_field] = rate[n]
+            line_variances.append({**entry, "issues": ["not_ordered"], "source": source})
+            mismatches.append({"type": f"unordered_{source}_item", "item": lines.description[k].lower()})
+            penalties["missing"] += 1
+
+    fraud_flags = []
+    if np.any(issue_masks["not_delivered"] & (np.nan_to_num(billed) > 0)):
+        fraud_flags.append("billed_without_delivery")
+
+    penalty = (min(MISSING_LINE_PENALTY_CAP, MISSING_LINE_PENALTY * penalties["missing"])
+               + min(VARIANCE_PENALTY_CAP, VARIANCE_PENALTY * penalties["variance"]))
+
+    # Whole-document check: billed value vs value of goods received at PO rates
+    billed_value = float(np.nansum(billed * inv_rate) + np.nansum(inv.qty[extra_inv] * inv.rate[extra_inv]))
+    delivered_value = float(np.nansum(delivered * po_rate))
+    if billed_value > 0 and delivered_value > 0:
+        excess = (billed_value - delivered_value) / delivered_value
+        if excess > tolerance:
+            mismatches.append({
+                "type": "billed_amount_exceeds_delivered_value",
+                "billed_value": round(billed_value, 2),
+                "delivered_value": round(delivered_value, 2),
+                "difference_percentage": excess
+            })
+            penalty += min(50, excess * 100)
+
+    return {
+        "mismatches": mismatches,
+        "fraud_flags": fraud_flags,
+        "penalty": penalty,
+        "line_variances": line_variances
+    }
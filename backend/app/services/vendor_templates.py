@@ -0,0 +1,476 @@
+import logging
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from backend.app.config import settings
+from backend.app.db import crud
+from backend.app.db.models import VendorTemplate
+from backend.app.utils.validation import normalize_key, vendor_key
+
+logger = logging.getLogger(__name__)
+
+
+# A number as printed on a document ("1,180.00"), not part of a code like "INV1180"
+NUMBER_PATTERN = r"(?<![\w.])[-+]?\d[\d,]*(?:\.\d+)?(?![\w])"
+GSTIN_RE = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z][A-Z\d]Z[A-Z\d]\b")
+
+TEXT_FIELDS = ("doc_number", "date")
+AMOUNT_FIELDS = ("subtotal", "grand_total")
+ITEM_NUMBER_FIELDS = ("qty", "rate", "line_total")
+
+_NUMBER_RE = re.compile(NUMBER_PATTERN)
+_TOKEN_SPLIT_RE = re.compile(r"[ \t|]+")
+_LABEL_SPLIT_RE = re.compile(r"\s{2,}|\|")
+_SEPARATOR = r"[ \t|]+"
+
+# Building blocks of an item line pattern, by column kind
+_ITEM_PIECES = {
+    "description": r"(?P<description>\S.*?)",
+    "unit": r"(?P<unit>[A-Za-z][A-Za-z.]*)",
+    "qty": rf"(?P<qty>{NUMBER_PATTERN})",
+    "rate": rf"(?P<rate>{NUMBER_PATTERN})",
+    "line_total": rf"(?P<line_total>{NUMBER_PATTERN})",
+    "num": rf"(?:{NUMBER_PATTERN})",
+    "word": r"\S+",
+}
+
+
+def to_number(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def _same_number(a: Optional[float], b: Optional[float]) -> bool:
+    return a is not None and b is not None and abs(a - b) <= 0.005
+
+
+def _close(actual: float, expected: float, tolerance: float) -> bool:
+    return abs(actual - expected) <= max(0.05, tolerance * abs(expected))
+
+
+# ---------------------------------------------------------
+# Validation (template output and LLM output alike)
+# ---------------------------------------------------------
+def validate_totals(parsed: dict, tolerance: float = None) -> bool:
+    """
+    Internal consistency of an extraction:
+    - there are line items and every one has a line total
+    - line totals add up to the subtotal (when the document states one)
+    - subtotal plus taxes equals the grand total
+    """
+    tolerance = settings.TEMPLATE_TOTAL_TOLERANCE if tolerance is None else tolerance
+    items = parsed.get("items") or []
+    line_totals = [to_number(item.get("line_total")) for item in items if isinstance(item, dict)]
+    if not line_totals or any(total is None for total in line_totals):
+        return False
+
+    grand_total = to_number(parsed.get("grand_total"))
+    if grand_total is None:
+        return False
+
+    line_sum = sum(line_totals)
+    subtotal = to_number(parsed.get("subtotal"))
+    if subtotal:
+        if not _close(line_sum, subtotal, tolerance):
+            return False
+    else:
+        subtotal = line_sum
+
+    taxes = sum(to_number(t.get("amount")) or 0.0 for t in (parsed.get("taxes") or []) if isinstance(t, dict))
+    return _close(subtotal + taxes, grand_total, tolerance)
+
+
+# ---------------------------------------------------------
+# Deriving a template from an LLM-parsed document
+# ---------------------------------------------------------
+def _label_before(text: str, start: int) -> Optional[str]:
+    """
+    The label printed left of a value on the same line ("Invoice No:"),
+    i.e. the text after the previous column gap.
+    """
+    line_start = text.rfind("\n", 0, start) + 1
+    label = _LABEL_SPLIT_RE.split(text[line_start:start].rstrip())[-1].strip()
+    return label if re.search(r"[A-Za-z]", label) else None
+
+
+def _label_regex(label: str, value_pattern: str) -> str:
+    label_pattern = r"\s+".join(re.escape(part) for part in label.split())
+    return rf"{label_pattern}[ \t]*(?P<value>{value_pattern})"
+
+
+def _derive_field(text: str, occurrences, matches_value, value_pattern: str,
+                  taken: set, prefer: str = None) -> Optional[str]:
+    """
+    Try each occurrence of the value; keep the first label-anchored regex
+    whose first match in the text yields that value and isn't used by another field.
+    """
+    candidates = []
+    for start in occurrences:
+        label = _label_before(text, start)
+        if label:
+            candidates.append(label)
+    if prefer:
+        candidates.sort(key=lambda label: prefer.lower() not in label.lower())
+
+    for label in candidates:
+        pattern = _label_regex(label, value_pattern)
+        if pattern in taken:
+            continue
+        match = re.search(pattern, text)
+        if match and matches_value(match.group("value")):
+            taken.add(pattern)
+            return pattern
+    return None
+
+
+def _derive_text_field(text: str, value, taken: set) -> Optional[str]:
+    value = str(value or "").strip()
+    if not value:
+        return None
+    occurrences = [m.start() for m in re.finditer(re.escape(value), text)]
+    value_pattern = r"\S+" + r"(?:[ \t]+\S+)" * (len(value.split()) - 1)
+    return _derive_field(text, occurrences, lambda found: found == value, value_pattern, taken)
+
+
+def _derive_amount_field(text: str, value, taken: set, prefer: str = None) -> Optional[str]:
+    target = to_number(value)
+    if target is None:
+        return None
+    occurrences = [m.start() for m in _NUMBER_RE.finditer(text) if _same_number(to_number(m.group()), target)]
+    return _derive_field(
+        text, occurrences, lambda found: _same_number(to_number(found), target), NUMBER_PATTERN, taken, prefer
+    )
+
+
+def _classify_token(token: str, item: dict, used: set) -> str:
+    if _NUMBER_RE.fullmatch(token):
+        number = to_number(token)
+        for field in ITEM_NUMBER_FIELDS:
+            if field not in used and _same_number(number, to_number(item.get(field))):
+                used.add(field)
+                return field
+        return "num"
+    if "unit" not in used and item.get("unit") and token.lower() == str(item["unit"]).lower():
+        used.add("unit")
+        return "unit"
+    return "word"
+
+
+def _item_shape(text: str, item: dict) -> Optional[tuple]:
+    """
+    Column layout of the line holding this item, e.g.
+    ("num", "description", "qty", "unit", "rate", "line_total").
+    """
+    words = str(item.get("description") or "").split()
+    if not words:
+        return None
+
+    # The description may also appear elsewhere (e.g. in a note); use the first
+    # occurrence that sits on a line carrying the item's line total
+    for match in re.finditer(r"[ \t]+".join(re.escape(w) for w in words), text, re.IGNORECASE):
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        line_end = text.find("\n", match.end())
+        line_end = len(text) if line_end == -1 else line_end
+
+        # Leading columns (serial numbers, codes) are never item fields
+        leading = set(ITEM_NUMBER_FIELDS) | {"unit"}
+        used = set()
+        before = [t for t in _TOKEN_SPLIT_RE.split(text[line_start:match.start()]) if t]
+        after = [t for t in _TOKEN_SPLIT_RE.split(text[match.end():line_end]) if t]
+        shape = tuple(
+            [_classify_token(t, item, leading) for t in before] + ["description"] +
+            [_classify_token(t, item, used) for t in after]
+        )
+        if "line_total" in shape:
+            return shape
+    return None
+
+
+def item_pattern_for(shape: tuple) -> str:
+    return r"^[ \t|]*" + _SEPARATOR.join(_ITEM_PIECES[kind] for kind in shape) + r"[ \t|]*$"
+
+
+def derive_template(text: str, parsed: dict, doc_type: str = None) -> Optional[dict]:
+    """
+    Build a vendor template from OCR text and its (validated) parsed result.
+    doc_type is the stored document's type; the parsed "doc_type" is only a
+    fallback. Returns None unless every item line shares one layout, the key
+    header fields can be anchored to labels, and the template reproduces the
+    same result from the same text.
+    """
+    if not text or not isinstance(parsed, dict) or not validate_totals(parsed):
+        return None
+    key = vendor_key(parsed)
+    items = [item for item in parsed.get("items") or [] if isinstance(item, dict)]
+    if not key or not items:
+        return None
+
+    shapes = {_item_shape(text, item) for item in items}
+    if len(shapes) != 1 or None in shapes:
+        return None
+
+    taken = set()
+    fields = {}
+    for field in TEXT_FIELDS:
+        pattern = _derive_text_field(text, parsed.get(field), taken)
+        if pattern:
+            fields[field] = pattern
+    for field in AMOUNT_FIELDS:
+        pattern = _derive_amount_field(text, parsed.get(field), taken)
+        if pattern:
+            fields[field] = pattern
+    if "grand_total" not in fields:
+        return None
+
+    taxes = {}
+    for tax in parsed.get("taxes") or []:
+        if not isinstance(tax, dict) or not tax.get("type") or to_number(tax.get("amount")) is None:
+            continue
+        pattern = _derive_amount_field(text, tax["amount"], taken, prefer=str(tax["type"]))
+        if pattern is None:
+            return None     # a tax we can't find would break the totals check later
+        taxes[str(tax["type"])] = pattern
+
+    template = {
+        "vendor_key": key,
+        "doc_type": str(doc_type or parsed.get("doc_type") or "UNKNOWN").upper(),
+        "vendor_name": parsed.get("vendor_name"),
+        "vendor_gstin": parsed.get("vendor_gstin"),
+        "currency": parsed.get("currency"),
+        "fields": fields,
+        "taxes": taxes,
+        "item_pattern": item_pattern_for(shapes.pop()),
+    }
+
+    # Round trip: the template must find exactly the items the LLM found
+    extracted = CompiledTemplate(template).extract(text)
+    if extracted is None or len(extracted["items"]) != len(items) or not validate_totals(extracted):
+        return None
+    for got, expected in zip(extracted["items"], items):
+        if not _same_number(to_number(got.get("line_total")), to_number(expected.get("line_total"))):
+            return None
+
+    return template
+
+
+# ---------------------------------------------------------
+# Applying a template
+# ---------------------------------------------------------
+class CompiledTemplate:
+    """
+    A vendor template with its regexes compiled once.
+    """
+
+    def __init__(self, data: dict, template_id: int = None):
+        self.id = template_id
+        self.data = data
+        self.fields = {name: re.compile(p) for name, p in (data.get("fields") or {}).items()}
+        self.taxes = {name: re.compile(p) for name, p in (data.get("taxes") or {}).items()}
+        self.items = re.compile(data["item_pattern"], re.MULTILINE)
+
+    def extract(self, text: str) -> Optional[dict]:
+        """
+        Parsed dict in the LLM schema, or None when any anchored field is missing.
+        """
+        values = {}
+        for name, regex in self.fields.items():
+            match = regex.search(text)
+            if not match:
+                return None
+            values[name] = match.group("value")
+
+        taxes = []
+        for tax_type, regex in self.taxes.items():
+            match = regex.search(text)
+            if not match:
+                return None
+            taxes.append({"type": tax_type, "amount": to_number(match.group("value"))})
+
+        items = []
+        for match in self.items.finditer(text):
+            groups = match.groupdict()
+            item = {"description": groups["description"].strip()}
+            for field in ITEM_NUMBER_FIELDS:
+                if groups.get(field) is not None:
+                    item[field] = to_number(groups[field])
+            if groups.get("unit") is not None:
+                item["unit"] = groups["unit"]
+            items.append(item)
+
+        return {
+            "doc_type": self.data.get("doc_type"),
+            "doc_number": values.get("doc_number"),
+            "date": values.get("date"),
+            "vendor_name": self.data.get("vendor_name"),
+            "vendor_gstin": self.data.get("vendor_gstin"),
+            "items": items,
+            "subtotal": to_number(values.get("subtotal")),
+            "taxes": taxes,
+            "grand_total": to_number(values.get("grand_total")),
+            "currency": self.data.get("currency"),
+        }
+
+
+def _template_data(row: VendorTemplate) -> dict:
+    return {
+        "vendor_key": row.vendor_key,
+        "doc_type": row.doc_type,
+        "vendor_name": row.vendor_name,
+        "vendor_gstin": row.vendor_gstin,
+        "currency": row.currency,
+        "fields": row.fields,
+        "taxes": row.taxes,
+        "item_pattern": row.item_pattern,
+    }
+
+
+# ---------------------------------------------------------
+# Template store + fast-path parser
+# ---------------------------------------------------------
+class VendorTemplateService:
+    """
+    Rule-based extraction tier in front of the LLM.
+    Vendors are identified by a GSTIN printed anywhere in the text, or by
+    their name in the header; only templates for the document's type are
+    tried. Templates are loaded once and kept compiled; learn() derives new
+    ones from LLM results.
+    """
+
+    def __init__(self, engine: Engine = None):
+        if engine is None:
+            from backend.app.db.session import engine as default_engine
+            engine = default_engine
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._by_gstin: Optional[Dict[str, List[CompiledTemplate]]] = None
+        self._by_name: Dict[str, List[CompiledTemplate]] = {}
+        self._by_key: Dict[Tuple[str, str], CompiledTemplate] = {}
+
+    # -----------------------------------------------------
+    # Loading
+    # -----------------------------------------------------
+    def warm_up(self):
+        self.reload()
+
+    def reload(self):
+        with Session(self.engine) as session:
+            rows = crud.list_vendor_templates(session)
+
+        by_gstin, by_name, by_key = defaultdict(list), defaultdict(list), {}
+        for row in rows:
+            try:
+                compiled = CompiledTemplate(_template_data(row), template_id=row.id)
+            except (re.error, KeyError) as e:
+                logger.warning("Skipping template %s: %s", row.id, e)
+                continue
+            by_key[(row.vendor_key, row.doc_type)] = compiled
+            if row.vendor_gstin:
+                by_gstin[normalize_key(row.vendor_gstin)].append(compiled)
+            if row.vendor_name and len(normalize_key(row.vendor_name)) >= 4:
+                by_name[normalize_key(row.vendor_name)].append(compiled)
+
+        with self._lock:
+            self._by_gstin, self._by_name, self._by_key = dict(by_gstin), dict(by_name), by_key
+
+    def _ensure_loaded(self):
+        if self._by_gstin is None:
+            self.reload()
+
+    # -----------------------------------------------------
+    # Identification + extraction
+    # -----------------------------------------------------
+    def identify(self, text: str, doc_type: str = None) -> List[CompiledTemplate]:
+        self._ensure_loaded()
+        wanted = doc_type.upper() if doc_type else None
+        found, seen = [], set()
+
+        def add(templates: List[CompiledTemplate]):
+            for template in templates:
+                # A supplier's PO / invoice / delivery note layouts differ:
+                # only the document's own type is tried
+                if template.id in seen or (wanted and template.data.get("doc_type") != wanted):
+                    continue
+                seen.add(template.id)
+                found.append(template)
+
+        for gstin in GSTIN_RE.findall(text.upper()):
+            add(self._by_gstin.get(normalize_key(gstin), []))
+
+        header = normalize_key(text[:settings.TEMPLATE_HEADER_CHARS])
+        for name, templates in self._by_name.items():
+            if name in header:
+                add(templates)
+
+        return found
+
+    def extract(self, text: str, doc_type: str = None) -> Optional[dict]:
+        """
+        Parsed result from the first matching vendor template for doc_type
+        that passes the totals checks, or None (caller falls back to the LLM).
+        """
+        if not text:
+            return None
+        for template in self.identify(text, doc_type):
+            parsed = template.extract(text)
+            if parsed is not None and validate_totals(parsed):
+                logger.info("Parsed with template %s (%s)", template.id, template.data.get("vendor_name"))
+                return parsed
+        return None
+
+    # -----------------------------------------------------
+    # Learning from LLM results
+    # -----------------------------------------------------
+    def learn(self, text: str, parsed: dict, document_id: int = None, doc_type: str = None,
+              reload: bool = True) -> Optional[dict]:
+        """
+        Derive and store a template from an LLM parse (replacing the vendor's
+        previous one for that doc type). Returns the derived template, or None
+        when no reliable template can be derived. A template identical to the
+        stored one is not written again.
+        """
+        data = derive_template(text, parsed, doc_type)
+        if data is None:
+            return None
+
+        self._ensure_loaded()
+        current = self._by_key.get((data["vendor_key"], data["doc_type"]))
+        if current is not None and current.data == data:
+            return data
+
+        with Session(self.engine) as session:
+            crud.upsert_vendor_template(session, data, source_document_id=document_id)
+        if reload:
+            self.reload()
+        return data
+
+    def rebuild(self, company_id: int = None) -> dict:
+        """
+        Derive templates from every stored parsed document. Later documents
+        win, so each vendor ends up with its most recent layout.
+        """
+        with Session(self.engine) as session:
+            docs = crud.list_documents_for_templates(session, company_id)
+            samples = [(doc.id, doc.doc_type, doc.ocr_text, doc.parsed_json) for doc in docs]
+
+        derived = 0
+        for doc_id, doc_type, text, parsed in samples:
+            if self.learn(text, parsed, document_id=doc_id, doc_type=doc_type, reload=False) is not None:
+                derived += 1
+
+        self.reload()
+        return {"documents": len(samples), "derived": derived}
+
+
+@lru_cache(maxsize=1)
+def get_template_service() -> VendorTemplateService:
+    return VendorTemplateService()
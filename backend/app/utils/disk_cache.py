@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+
+class DiskCache:
+    """
+    Persistent key -> bytes cache stored as one file per entry.
+
+    Entries are sharded by the first two characters of the key. Every hit
+    bumps the file's mtime, so eviction (oldest mtime first) gives LRU
+    behaviour once the directory grows past max_bytes.
+
+    Entries used within the last min_idle_seconds are never evicted, so a
+    file handed out by get_path() stays put while it is being read, also
+    when another process sharing the directory evicts. The directory can
+    exceed max_bytes while that much is in use.
+    """
+
+    def __init__(self, directory, max_bytes: int, min_idle_seconds: float = 0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self._lock = threading.Lock()
+        self._size = self._scan_size()
+
+    # -------------------------------------------------
+    # Internal helpers
+    # -------------------------------------------------
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _entries(self):
+        for shard in self.directory.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    yield entry
+
+    def _scan_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _evict(self, keep: Optional[Path] = None):
+        """
+        Remove least recently used entries until the cache fits max_bytes.
+        Rescans the directory so entries written by other processes count too.
+        `keep` (the entry just written) and entries still in use are skipped.
+        """
+        in_use_since = time.time() - self.min_idle_seconds
+        entries = []
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort(key=lambda e: e[0])
+
+        for mtime, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep or (self.min_idle_seconds and mtime > in_use_since):
+                continue
+            try:
+                entry.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+
+        self._size = total
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def _stored_size(self, path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def set(self, key: str, value: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial entry
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(value)
+        with self._lock:
+            # An overwritten entry no longer counts towards the total
+            replaced = self._stored_size(path)
+            os.replace(tmp, path)
+            self._size += len(value) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    # -------------------------------------------------
+    # File entries (for values too large to hold in memory)
+    # -------------------------------------------------
+    def get_path(self, key: str) -> Optional[Path]:
+        """
+        Path of a cached entry (counted as a hit for LRU), or None.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temp_path(self, key: str) -> Path:
+        """
+        A fresh temp file location next to the entry, for put_file().
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def put_file(self, key: str, src: Path) -> Path:
+        """
+        Move a fully written temp file into place (atomic on one filesystem).
+        The new entry itself is never evicted to make room for it.
+        """
+        path = self._path(key)
+        size = Path(src).stat().st_size
+
+        with self._lock:
+            replaced = self._stored_size(path)
+            os.replace(src, path)
+            self._size += size - replaced
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def delete(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return False
+
+        with self._lock:
+            self._size = max(0, self._size - size)
+        return True
+
+    def clear(self) -> int:
+        """
+        Drop every entry. Returns the number of entries removed.
+        """
+        removed = 0
+        with self._lock:
+            for entry in list(self._entries()):
+                try:
+                    entry.unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+        return removed
@@ -1,5 +1,6 @@
 import os
 import uuid
+import hashlib
 from pathlib import Path
 from backend.app.config import settings
 
@@ -37,10 +38,30 @@ def save_local_file(upload_file, filename: str) -> str:
     return str(dest)
 
 
+class FileTooLargeError(Exception):
+    """
+    Raised when an upload crosses MAX_UPLOAD_SIZE_MB.
+    """
+
+
+def max_upload_bytes() -> int:
+    return settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
 def validate_file_size(file_bytes: bytes):
     """
     Validate uploaded file size against MAX_UPLOAD_SIZE_MB.
     """
-    max_size_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if len(file_bytes) > max_size_bytes:
-        raise Exception("File exceeds maximum upload size.")
+    if len(file_bytes) > max_upload_bytes():
+        raise FileTooLargeError("File exceeds maximum upload size.")
+
+
+def sha256_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it fully into memory.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,19 @@
+import orjson
+
+
+# Non-string keys and NumPy scalars/arrays show up in matcher output
+_DUMP_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(obj, sort_keys: bool = False) -> str:
+    """
+    Compact JSON (no whitespace) for JSON columns. Anything orjson can't
+    encode natively (Decimal, Path, ...) falls back to str().
+    sort_keys gives a canonical form for hashing.
+    """
+    option = _DUMP_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _DUMP_OPTIONS
+    return orjson.dumps(obj, default=str, option=option).decode("utf-8")
+
+
+def loads(raw):
+    return orjson.loads(raw)
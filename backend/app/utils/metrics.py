@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from backend.app.logging_config import record_stage
+
+# OCR and LLM calls take seconds, not milliseconds
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+
+# ---------------------------------------------------------
+# Metrics (process-wide, default Prometheus registry)
+# ---------------------------------------------------------
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"]
+)
+OCR_SECONDS = Histogram(
+    "ocr_duration_seconds",
+    "Text extraction by engine (pdfminer = a PDF's text-layer pass, tesseract = an image or "
+    "one scanned PDF page, cache = OCR cache hit)",
+    ["engine"], buckets=SLOW_BUCKETS
+)
+LLM_SECONDS = Histogram(
+    "llm_call_duration_seconds", "LLM chat completion, retries included",
+    ["outcome"], buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "llm_tokens", "LLM tokens as reported by the provider",
+    ["kind"]
+)
+DB_COMMIT_SECONDS = Histogram(
+    "db_commit_duration_seconds", "Session commit (flush + database commit)"
+)
+STORAGE_SECONDS = Histogram(
+    "storage_duration_seconds", "Storage I/O",
+    ["backend", "op"], buckets=SLOW_BUCKETS
+)
+REPORT_SECONDS = Histogram(
+    "report_render_duration_seconds", "PDF match report rendering"
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, stage: str, **labels):
+    """
+    Observe the block's duration on `histogram` and add it to the current
+    request's stage breakdown as `stage`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(histogram, stage, time.perf_counter() - start, **labels)
+
+
+def observe(histogram: Histogram, stage: str, seconds: float, **labels):
+    """
+    Same as timed, for a duration measured by the caller.
+    """
+    (histogram.labels(**labels) if labels else histogram).observe(seconds)
+    record_stage(stage, seconds, **labels)
+
+
+def render_latest() -> tuple:
+    """
+    (body, content type) for the /metrics endpoint.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,148 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+from backend.app.utils.validation import parse_amount, vendor_key
+
+# A vendor's latest invoices whose rates feed the quantiles; bounds the
+# read per check no matter how long the history is
+RECENT_WINDOW = 50
+QUANTILES = (0.05, 0.5, 0.95)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def item_key(description) -> str:
+    """
+    Lower-case words of an item description, single-spaced.
+    """
+    return " ".join(_WORD_RE.findall(str(description or "").lower()))[:255]
+
+
+def item_rates(parsed) -> List[Tuple[str, str, float]]:
+    """
+    (vendor_key, item_key, unit rate) for each priced line of a parsed
+    document. A missing rate is taken from line_total / qty.
+    """
+    if not isinstance(parsed, dict):
+        return []
+    vendor = vendor_key(parsed)
+    if not vendor:
+        return []
+
+    rates = []
+    for item in parsed.get("items") or []:
+        if not isinstance(item, dict):
+            continue
+        key = item_key(item.get("description"))
+        rate = parse_amount(item.get("rate"))
+        if rate is None:
+            qty, total = parse_amount(item.get("qty")), parse_amount(item.get("line_total"))
+            rate = total / qty if qty and total is not None else None
+        if key and rate is not None and math.isfinite(rate) and rate > 0:
+            rates.append((vendor, key, rate))
+    return rates
+
+
+def rates_by_item(rates: Iterable[Tuple[str, str, float]]) -> Dict[str, List[float]]:
+    """
+    One invoice's item_rates grouped by item_key, as stored for the recent window.
+    """
+    grouped: Dict[str, List[float]] = {}
+    for _, item, rate in rates:
+        grouped.setdefault(item, []).append(rate)
+    return grouped
+
+
+# ---------------------------------------------------------
+# Running statistics (Welford), updated one rate at a time.
+# Work on any object with count / mean / m2 attributes: a VendorItemRate
+# row as well as RateAccumulator below. crud.record_item_rates applies the
+# same updates in SQL.
+# ---------------------------------------------------------
+def add_rate(stats, rate: float):
+    count = (stats.count or 0) + 1
+    mean = stats.mean or 0.0
+    delta = rate - mean
+    mean += delta / count
+    stats.m2 = (stats.m2 or 0.0) + delta * (rate - mean)
+    stats.count, stats.mean = count, mean
+
+
+def remove_rate(stats, rate: float):
+    """
+    Undo add_rate for a rate that was added earlier (a document re-parsed).
+    """
+    count = (stats.count or 0) - 1
+    if count <= 0:
+        stats.count, stats.mean, stats.m2 = 0, 0.0, 0.0
+    else:
+        mean = stats.mean
+        new_mean = (count + 1) * mean / count - rate / count
+        stats.m2 = max(0.0, stats.m2 - (rate - mean) * (rate - new_mean))
+        stats.count, stats.mean = count, new_mean
+
+
+def without(values: Iterable[float], removed: Iterable[float]) -> List[float]:
+    """
+    values minus one occurrence of each removed value, if present.
+    """
+    values = list(values)
+    for rate in removed:
+        for i in range(len(values) - 1, -1, -1):
+            if math.isclose(values[i], rate):
+                del values[i]
+                break
+    return values
+
+
+def quantiles_of(values: Sequence[float], qs: Sequence[float] = QUANTILES) -> List[float]:
+    """
+    Quantiles by linear interpolation between the closest ranks (numpy's
+    default method). One sort of the small recent window: cheaper than a
+    numpy call, which costs more to set up than to run at this size.
+    """
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    result = []
+    for q in qs:
+        position = last * q
+        low = int(position)
+        high = min(low + 1, last)
+        result.append(ordered[low] + (ordered[high] - ordered[low]) * (position - low))
+    return result
+
+
+def std(stats) -> float:
+    return math.sqrt(stats.m2 / (stats.count - 1)) if stats.count and stats.count > 1 else 0.0
+
+
+@dataclass
+class RateAccumulator:
+    """
+    In-memory stand-in for a VendorItemRate row while rebuilding or checking.
+    """
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+
+def accumulate_rates(documents: Iterable[Tuple[int, int, dict]]) -> Tuple[
+        Dict[Tuple[int, str, str], RateAccumulator], Dict[int, Tuple[int, str, Dict[str, List[float]]]]]:
+    """
+    Rate history over (document_id, company_id, parsed) triples: statistics
+    for every (company_id, vendor_key, item_key), and each invoice's
+    (company_id, vendor_key, rates_by_item) keyed by document_id.
+    """
+    stats: Dict[Tuple[int, str, str], RateAccumulator] = {}
+    invoices: Dict[int, Tuple[int, str, Dict[str, List[float]]]] = {}
+    for document_id, company_id, parsed in documents:
+        rates = item_rates(parsed)
+        for vendor, item, rate in rates:
+            key = (company_id, vendor, item)
+            if key not in stats:
+                stats[key] = RateAccumulator()
+            add_rate(stats[key], rate)
+        if rates:
+            invoices[document_id] = (company_id, rates[0][0], rates_by_item(rates))
+    return stats, invoices
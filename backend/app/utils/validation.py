@@ -0,0 +1,103 @@
+import re
+from datetime import date, datetime
+from typing import Optional
+
+# Day-first variants seen on Indian invoices, then US/long forms
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%B-%Y", "%b %d, %Y", "%B %d, %Y",
+)
+
+_AMOUNT_NOISE = re.compile(r"[^\d.\-]")
+
+
+def parse_date(value) -> Optional[date]:
+    """
+    A parsed document's date as a date; ISO first, then DATE_FORMATS.
+    None when missing or unrecognised.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+
+    text = value.strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value) -> Optional[float]:
+    """
+    Numbers as floats; strings with currency symbols or thousands separators
+    ("Rs. 1,23,456.50") are cleaned first. None when nothing numeric is left.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    cleaned = _AMOUNT_NOISE.sub("", value).strip(".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def normalize_key(value) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value or "").lower())
+
+
+def vendor_key(parsed: dict) -> Optional[str]:
+    """
+    Normalized GSTIN, or the vendor name for documents without one.
+    """
+    return normalize_key(parsed.get("vendor_gstin")) or normalize_key(parsed.get("vendor_name")) or None
+
+
+def clean_text(value, max_length: int = 255) -> Optional[str]:
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text[:max_length] or None
+
+
+def vendor_search_key(value) -> Optional[str]:
+    """
+    Lower-case, single-spaced vendor name: what vendor prefix searches
+    compare against (stored as Document.vendor_name_key).
+    """
+    text = clean_text(value)
+    return text.lower() if text else None
+
+
+def header_fields(parsed) -> dict:
+    """
+    Typed header values of a parsed document, as stored in the Document
+    columns of the same names (doc_date for "date", plus vendor_name_key).
+    All None when unparsed.
+    """
+    parsed = parsed if isinstance(parsed, dict) else {}
+    currency = clean_text(parsed.get("currency"), max_length=8)
+    gstin = clean_text(parsed.get("vendor_gstin"), max_length=32)
+    vendor_name = clean_text(parsed.get("vendor_name"))
+    return {
+        "doc_number": clean_text(parsed.get("doc_number"), max_length=64),
+        "doc_date": parse_date(parsed.get("date")),
+        "vendor_name": vendor_name,
+        "vendor_name_key": vendor_search_key(vendor_name),
+        "vendor_gstin": gstin.upper().replace(" ", "") if gstin else None,
+        "grand_total": parse_amount(parsed.get("grand_total")),
+        "currency": currency.upper() if currency else None,
+    }
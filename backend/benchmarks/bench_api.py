@@ -0,0 +1,140 @@
+"""
+End-to-end throughput through the ASGI app: /upload, /documents/{id}/parse, /match.
+
+Requests go through httpx's ASGI transport (no sockets), with the app's
+startup/shutdown run around each benchmark. The LLM is FakeLLMBackend.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+import httpx
+from sqlmodel import Session
+from backend.app.db import crud
+from backend.app.db.session import engine
+from backend.app.main import app
+from backend.app.services import llm_adapter
+from backend.benchmarks.datagen import make_po_invoice_pair, write_pdf
+from backend.benchmarks.fake_llm import FakeLLMBackend
+from backend.benchmarks.harness import Context, benchmark, throughput
+
+LLM_LATENCY_MS = 150.0
+CONCURRENCY = 8
+
+
+@asynccontextmanager
+async def api_client(llm: FakeLLMBackend = None):
+    runner = llm.runner() if llm is not None else None
+    original = llm_adapter.get_llm_runner
+    if runner is not None:
+        llm_adapter.get_llm_runner = lambda: runner
+    try:
+        async with app.router.lifespan_context(app):
+            await app.state.warmup
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                yield client
+    finally:
+        llm_adapter.get_llm_runner = original
+        if runner is not None:
+            runner.close()
+
+
+async def drive(send: Callable[[int], Awaitable[httpx.Response]], requests: int, concurrency: int) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int):
+        async with slots:
+            start = time.perf_counter()
+            response = await send(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 300:
+                raise RuntimeError(f"{response.request.url.path}: HTTP {response.status_code} {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return throughput(requests, concurrency, time.perf_counter() - start, latencies)
+
+
+def _company() -> int:
+    with Session(engine) as session:
+        return crud.create_company(session, "Bench Co").id
+
+
+def _invoice_pdf(ctx: Context) -> bytes:
+    path = ctx.workdir / "api_invoice.pdf"
+    if not path.exists():
+        _, inv = make_po_invoice_pair(items=30, seed=7)
+        write_pdf(path, inv, pages=2)
+    return path.read_bytes()
+
+
+async def _upload(client: httpx.AsyncClient, company_id: int, data: bytes, n: int) -> httpx.Response:
+    return await client.post(
+        "/api/upload",
+        data={"company_id": company_id, "doc_type": "INVOICE"},
+        files={"file": (f"invoice_{n}.pdf", data, "application/pdf")},
+    )
+
+
+# ---------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------
+@benchmark("api.upload", group="api")
+def api_upload(ctx: Context) -> dict:
+    data = _invoice_pdf(ctx)
+    company_id = _company()
+    requests = ctx.rounds(200)
+
+    async def run():
+        async with api_client() as client:
+            return await drive(lambda n: _upload(client, company_id, data, n), requests, CONCURRENCY)
+
+    return asyncio.run(run())
+
+
+@benchmark("api.parse", group="api")
+def api_parse(ctx: Context) -> dict:
+    data = _invoice_pdf(ctx)
+    company_id = _company()
+    _, parsed = make_po_invoice_pair(items=30, seed=7)
+    llm = FakeLLMBackend(parsed, latency_ms=LLM_LATENCY_MS, jitter_ms=LLM_LATENCY_MS / 3)
+    requests = ctx.rounds(80)
+
+    async def run():
+        async with api_client(llm) as client:
+            uploads = [await _upload(client, company_id, data, n) for n in range(requests)]
+            doc_ids = [r.json()["data"]["document_id"] for r in uploads]
+            result = await drive(lambda n: client.post(f"/api/documents/{doc_ids[n]}/parse"), requests, CONCURRENCY)
+        result["llm_calls"] = llm.calls
+        result["llm_peak_concurrency"] = llm.peak
+        return result
+
+    return asyncio.run(run())
+
+
+@benchmark("api.match", group="api")
+def api_match(ctx: Context) -> dict:
+    company_id = _company()
+    requests = ctx.rounds(200)
+    pairs = []
+    with Session(engine) as session:
+        for n in range(requests):
+            po, inv = make_po_invoice_pair(items=25, seed=100 + n)
+            po_doc = crud.create_document(session, company_id, f"uploads/po_{n}.pdf", "PO")
+            inv_doc = crud.create_document(session, company_id, f"uploads/inv_{n}.pdf", "INVOICE")
+            crud.update_document_parsed(session, po_doc.id, po)
+            crud.update_document_parsed(session, inv_doc.id, inv)
+            pairs.append((po_doc.id, inv_doc.id))
+
+    async def run():
+        async with api_client() as client:
+            return await drive(
+                lambda n: client.post("/api/match", json={
+                    "company_id": company_id, "po_id": pairs[n][0], "invoice_id": pairs[n][1]
+                }),
+                requests, CONCURRENCY
+            )
+
+    return asyncio.run(run())
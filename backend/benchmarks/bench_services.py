@@ -0,0 +1,177 @@
+"""
+Microbenchmarks: matcher, report rendering, OCR extraction, CRUD.
+"""
+import itertools
+import tempfile
+from PIL import Image
+from sqlmodel import Session, SQLModel
+from backend.app.db import crud
+from backend.app.db.session import build_engine
+from backend.app.services.image_preprocess import preprocess_image
+from backend.app.services.matcher import MatcherService
+from backend.app.services.ocr_adapter import OCRService, tesseract_version
+from backend.app.services.report import ReportService
+from backend.app.utils.disk_cache import DiskCache
+from backend.app.utils.file_helpers import sha256_file
+from backend.benchmarks.datagen import make_po_invoice_pair, write_image, write_pdf
+from backend.benchmarks.harness import Context, SkipBenchmark, benchmark, measure
+
+
+# ---------------------------------------------------------
+# Matcher
+# ---------------------------------------------------------
+@benchmark("matcher.match_20_items", group="matcher")
+def match_small(ctx: Context) -> dict:
+    po, inv = make_po_invoice_pair(items=20, seed=1)
+    matcher = MatcherService()
+    return measure(lambda: matcher.match_po_and_invoice(po, inv), repeat=ctx.rounds(15), number=20)
+
+
+@benchmark("matcher.match_300_items", group="matcher")
+def match_large(ctx: Context) -> dict:
+    po, inv = make_po_invoice_pair(items=300, seed=2)
+    matcher = MatcherService()
+    return measure(lambda: matcher.match_po_and_invoice(po, inv), repeat=ctx.rounds(9))
+
+
+@benchmark("matcher.three_way_2000_items", group="matcher")
+def match_three_way(ctx: Context) -> dict:
+    po, inv = make_po_invoice_pair(items=2000, seed=8, drift=0.1)
+    # Delivery note: most lines received, some short
+    grn = {"items": [
+        {"description": item["description"], "qty": item.get("qty", 1) * (0.5 if n % 7 == 0 else 1)}
+        for n, item in enumerate(po["items"][:1900])
+    ]}
+    matcher = MatcherService()
+    return measure(lambda: matcher.match_three_way(po, inv, grn), repeat=ctx.rounds(5))
+
+
+# ---------------------------------------------------------
+# Report
+# ---------------------------------------------------------
+@benchmark("report.generate_match_report", group="report")
+def report_render(ctx: Context) -> dict:
+    po, inv = make_po_invoice_pair(items=40, seed=3, drift=0.3)
+    result = MatcherService().match_po_and_invoice(po, inv)
+    report = ReportService(output_dir=tempfile.mkdtemp(prefix="reports-", dir=ctx.workdir))
+    # A new match id each call, so every call renders instead of hitting the file
+    ids = itertools.count(1)
+    return measure(lambda: report.generate_match_report(next(ids), po, inv, result), repeat=ctx.rounds(9))
+
+
+# ---------------------------------------------------------
+# OCR / text extraction
+# ---------------------------------------------------------
+def _pdf(ctx: Context, pages: int) -> str:
+    path = ctx.workdir / f"bench_{pages}p.pdf"
+    if not path.exists():
+        _, inv = make_po_invoice_pair(items=40, seed=4)
+        write_pdf(path, inv, pages=pages)
+    return str(path)
+
+
+@benchmark("ocr.extract_text_pdf_1_page", group="ocr")
+def ocr_pdf_single(ctx: Context) -> dict:
+    path = _pdf(ctx, 1)
+    ocr = OCRService(cache=None)
+    return measure(lambda: ocr.extract_text(path), repeat=ctx.rounds(9), number=5)
+
+
+@benchmark("ocr.extract_text_pdf_40_pages", group="ocr")
+def ocr_pdf_multi(ctx: Context) -> dict:
+    path = _pdf(ctx, 40)
+    ocr = OCRService(cache=None)
+    return measure(lambda: ocr.extract_text(path), repeat=ctx.rounds(5))
+
+
+@benchmark("ocr.extract_text_cached", group="ocr")
+def ocr_cached(ctx: Context) -> dict:
+    path = _pdf(ctx, 40)
+    file_hash = sha256_file(path)
+    ocr = OCRService(cache=DiskCache(ctx.workdir / "ocr-cache", max_bytes=64 * 1024 * 1024))
+    return measure(lambda: ocr.extract_text(path, file_hash=file_hash), repeat=ctx.rounds(15), number=20)
+
+
+def _photo(ctx: Context) -> str:
+    path = ctx.workdir / "photo_12mp.jpg"
+    if not path.exists():
+        _, inv = make_po_invoice_pair(items=25, seed=5)
+        write_image(path, inv)
+    return str(path)
+
+
+@benchmark("ocr.preprocess_12mp_photo", group="ocr")
+def ocr_preprocess(ctx: Context) -> dict:
+    path = _photo(ctx)
+
+    def run():
+        with Image.open(path) as image:
+            preprocess_image(image)
+
+    return measure(run, repeat=ctx.rounds(7))
+
+
+@benchmark("ocr.extract_text_12mp_photo", group="ocr")
+def ocr_image(ctx: Context) -> dict:
+    if tesseract_version() == "unknown":
+        raise SkipBenchmark("Tesseract not installed")
+    path = _photo(ctx)
+    ocr = OCRService(cache=None)
+    return measure(lambda: ocr.extract_text(path), repeat=ctx.rounds(5))
+
+
+# ---------------------------------------------------------
+# CRUD layer (file-backed SQLite, as in development)
+# ---------------------------------------------------------
+def _crud_engine(ctx: Context):
+    if "crud_engine" not in ctx.data:
+        engine = build_engine(f"sqlite:///{ctx.workdir / 'crud.db'}")
+        SQLModel.metadata.create_all(engine)
+        _, inv = make_po_invoice_pair(items=30, seed=6)
+        with Session(engine) as session:
+            company_id = crud.create_company(session, "Bench Co").id
+            for n in range(2000):
+                doc = crud.create_document(session, company_id, f"uploads/doc_{n}.pdf", "INVOICE")
+                if n % 2 == 0:
+                    crud.update_document_parsed(session, doc.id, inv)
+        ctx.data["crud_engine"] = engine
+        ctx.data["crud_company"] = company_id
+        ctx.data["crud_parsed"] = inv
+    return ctx.data["crud_engine"], ctx.data["crud_company"], ctx.data["crud_parsed"]
+
+
+@benchmark("crud.create_and_store_parsed", group="crud")
+def crud_write(ctx: Context) -> dict:
+    engine, company_id, parsed = _crud_engine(ctx)
+
+    def run():
+        with Session(engine) as session:
+            doc = crud.create_document(session, company_id, "uploads/new.pdf", "INVOICE")
+            crud.update_document_parsed(session, doc.id, parsed)
+
+    return measure(run, repeat=ctx.rounds(9), number=10)
+
+
+@benchmark("crud.get_document", group="crud")
+def crud_get(ctx: Context) -> dict:
+    engine, _, _ = _crud_engine(ctx)
+    ids = itertools.cycle(range(1, 2001))
+
+    def run():
+        with Session(engine) as session:
+            doc = crud.get_document(session, next(ids))
+            crud.decode_parsed(doc)
+
+    return measure(run, repeat=ctx.rounds(9), number=50)
+
+
+@benchmark("crud.list_documents_page", group="crud")
+def crud_list(ctx: Context) -> dict:
+    engine, company_id, _ = _crud_engine(ctx)
+
+    def run():
+        with Session(engine) as session:
+            rows, cursor = crud.list_documents(session, company_id, limit=50)
+            crud.list_documents(session, company_id, limit=50, cursor=cursor)
+
+    return measure(run, repeat=ctx.rounds(9), number=10)
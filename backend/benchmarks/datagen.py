@@ -0,0 +1,154 @@
+"""
+Synthetic PO / invoice data for the benchmarks.
+
+Everything is seeded, so two runs of the suite work on identical inputs.
+"""
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+PRODUCTS = [
+    "Hex Bolt", "Lock Nut", "Spring Washer", "Flat Washer", "Anchor Bolt", "Cable Tie",
+    "PVC Conduit", "Copper Lug", "MCB Switch", "Junction Box", "Ball Bearing", "V Belt",
+    "Gate Valve", "Pipe Elbow", "Hose Clamp", "Gear Oil", "Safety Gloves", "Drill Bit",
+]
+SIZES = ["M6", "M8", "M10", "M12", "20mm", "25mm", "32mm", "6205", "A42", "1 inch", "2 inch"]
+UNITS = ["pcs", "nos", "box", "mtr", "kg", "set"]
+
+
+# ---------------------------------------------------------
+# Parsed documents (the shape the LLM / templates produce)
+# ---------------------------------------------------------
+def make_items(rng: random.Random, count: int) -> List[dict]:
+    items = []
+    for n in range(count):
+        qty = rng.choice([5, 10, 20, 25, 50, 100, 200, 500])
+        rate = round(rng.uniform(0.5, 900), 2)
+        items.append({
+            "description": f"{rng.choice(PRODUCTS)} {rng.choice(SIZES)} #{n + 1}",
+            "qty": qty,
+            "unit": rng.choice(UNITS),
+            "rate": rate,
+            "line_total": round(qty * rate, 2),
+        })
+    return items
+
+
+def make_document(doc_type: str, number: str, items: List[dict], doc_date: date, vendor: int = 1) -> dict:
+    subtotal = round(sum(item["line_total"] for item in items), 2)
+    gst = round(subtotal * 0.09, 2)
+    return {
+        "doc_type": doc_type,
+        "doc_number": number,
+        "date": doc_date.isoformat(),
+        "vendor_name": f"Vendor {vendor} Industrial Supplies Pvt Ltd",
+        "vendor_gstin": f"29ABCDE{vendor:04d}F1Z5",
+        "items": items,
+        "subtotal": subtotal,
+        "taxes": [{"type": "CGST", "amount": gst}, {"type": "SGST", "amount": gst}],
+        "grand_total": round(subtotal + 2 * gst, 2),
+        "currency": "INR",
+    }
+
+
+def make_po_invoice_pair(items: int = 20, seed: int = 0, drift: float = 0.1) -> Tuple[dict, dict]:
+    """
+    A PO and the invoice billed against it. About `drift` of the invoice
+    lines differ (quantity short-shipped, rate changed, description reworded),
+    and the invoice lists lines in a different order, like real ones do.
+    """
+    rng = random.Random(seed)
+    po_items = make_items(rng, items)
+    inv_items = []
+    for item in po_items:
+        item = dict(item)
+        if rng.random() < drift:
+            change = rng.choice(["qty", "rate", "description"])
+            if change == "qty":
+                item["qty"] = max(1, item["qty"] - rng.choice([1, 5, 10]))
+            elif change == "rate":
+                item["rate"] = round(item["rate"] * rng.uniform(1.01, 1.2), 2)
+            else:
+                item["description"] = item["description"].upper().replace(" ", "-", 1)
+            item["line_total"] = round(item["qty"] * item["rate"], 2)
+        inv_items.append(item)
+    rng.shuffle(inv_items)
+
+    po_date = date(2024, 1, 1) + timedelta(days=rng.randrange(300))
+    po = make_document("PO", f"PO-{seed:05d}", po_items, po_date)
+    inv = make_document("INVOICE", f"INV-{seed:05d}", inv_items, po_date + timedelta(days=rng.randrange(1, 30)))
+    return po, inv
+
+
+# ---------------------------------------------------------
+# Rendered documents
+# ---------------------------------------------------------
+def document_lines(doc: dict) -> List[str]:
+    lines = [
+        doc["vendor_name"].upper(),
+        f"GSTIN: {doc['vendor_gstin']}",
+        f"{'Invoice' if doc['doc_type'] == 'INVOICE' else 'Purchase Order'} No: {doc['doc_number']}    Date: {doc['date']}",
+        "",
+        "S.No  Description  Qty  Unit  Rate  Amount",
+    ]
+    for n, item in enumerate(doc["items"]):
+        lines.append(
+            f"{n + 1}  {item['description']}  {item['qty']}  {item['unit']}  {item['rate']:,.2f}  {item['line_total']:,.2f}"
+        )
+    lines += [
+        "",
+        f"Sub Total: {doc['subtotal']:,.2f}",
+        *(f"{tax['type']} @9%: {tax['amount']:,.2f}" for tax in doc["taxes"]),
+        f"Grand Total: {doc['grand_total']:,.2f}",
+    ]
+    return lines
+
+
+def write_pdf(path: Path, doc: dict, pages: int = 1) -> Path:
+    """
+    Text-layer PDF; the document's lines are repeated on every page so
+    multi-page files have realistic text density.
+    """
+    c = canvas.Canvas(str(path), pagesize=A4)
+    lines = document_lines(doc)
+    for page in range(pages):
+        y = 800
+        c.setFont("Helvetica", 9)
+        c.drawString(40, y, f"Page {page + 1} of {pages}")
+        for line in lines:
+            y -= 13
+            if y < 40:
+                break
+            c.drawString(40, y, line)
+        c.showPage()
+    c.save()
+    return path
+
+
+def render_photo(doc: dict, size: Tuple[int, int] = (3024, 4032), skew: float = 2.5) -> Image.Image:
+    """
+    A phone-photo-like page: 12 MP, off-white paper on a darker background,
+    slightly rotated.
+    """
+    width, height = size
+    page = Image.new("RGB", (int(width * 0.8), int(height * 0.8)), (236, 232, 224))
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=max(12, width // 90))
+    y = page.height // 12
+    for line in document_lines(doc):
+        draw.text((page.width // 14, y), line, fill=(25, 25, 30), font=font)
+        y += int(font.size * 1.6)
+
+    photo = Image.new("RGB", size, (90, 80, 70))
+    page = page.rotate(skew, expand=True, fillcolor=(90, 80, 70))
+    photo.paste(page, ((width - page.width) // 2, (height - page.height) // 2))
+    return photo
+
+
+def write_image(path: Path, doc: dict, size: Tuple[int, int] = (3024, 4032)) -> Path:
+    render_photo(doc, size).save(path, quality=90)
+    return path
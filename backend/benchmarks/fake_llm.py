@@ -0,0 +1,45 @@
+"""
+OpenAI-compatible fake for the LLM client, with injected latency.
+"""
+import asyncio
+import json
+import random
+import httpx
+from backend.app.services.llm_client import AsyncLLMClient, LLMClientRunner
+
+
+class FakeLLMBackend:
+    """
+    httpx transport answering /chat/completions with a fixed parsed document
+    after `latency_ms` (± `jitter_ms`). Counts calls and tracks peak concurrency.
+    """
+
+    def __init__(self, parsed: dict, latency_ms: float = 200.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.content = json.dumps(parsed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000)
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(200, json={"choices": [{"message": {"content": self.content}}]})
+
+    def runner(self) -> LLMClientRunner:
+        """
+        A client runner whose HTTP calls land here. Provider rate limits are
+        off: the benchmarks measure our pipeline, not the configured quota.
+        """
+        transport = httpx.MockTransport(self.handle)
+        return LLMClientRunner(lambda: AsyncLLMClient(
+            api_key="bench", requests_per_minute=0, tokens_per_minute=0, transport=transport
+        ))
@@ -0,0 +1,166 @@
+"""
+Benchmark registry, timing and baseline comparison.
+
+Every benchmark reports milliseconds per operation (for throughput runs:
+wall time / requests), so lower is always better and one threshold applies
+to all of them.
+"""
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+class SkipBenchmark(Exception):
+    """
+    Raised by a benchmark whose dependency (e.g. Tesseract) is missing here.
+    """
+
+
+@dataclass
+class Benchmark:
+    name: str
+    fn: Callable[["Context"], dict]
+    group: str
+
+
+REGISTRY: List[Benchmark] = []
+
+
+def benchmark(name: str, group: str):
+    """
+    Register fn(ctx) -> result dict (see measure / throughput).
+    """
+    def register(fn):
+        REGISTRY.append(Benchmark(name=name, fn=fn, group=group))
+        return fn
+    return register
+
+
+@dataclass
+class Context:
+    """
+    Scratch space shared by the benchmarks of one run.
+    """
+    workdir: Path
+    quick: bool = False
+    data: Dict[str, object] = field(default_factory=dict)
+
+    def rounds(self, full: int) -> int:
+        return max(3, full // 4) if self.quick else full
+
+
+# ---------------------------------------------------------
+# Timing
+# ---------------------------------------------------------
+def measure(fn: Callable[[], object], repeat: int = 7, number: int = 1) -> dict:
+    """
+    One warm-up call, then `repeat` rounds of `number` calls.
+    ms_per_op is the fastest round divided by `number`: noise (other
+    processes, GC, frequency scaling) only ever adds time, so the minimum is
+    the most repeatable figure to compare. The median is kept for reference.
+    """
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+
+    return {
+        "ms_per_op": min(samples),
+        "median_ms": statistics.median(samples),
+        "max_ms": max(samples),
+        "rounds": repeat,
+        "ops_per_round": number,
+    }
+
+
+def throughput(requests: int, concurrency: int, elapsed_s: float, latencies_ms: List[float]) -> dict:
+    latencies = sorted(latencies_ms)
+    return {
+        "ms_per_op": elapsed_s * 1000 / requests,
+        "requests_per_sec": requests / elapsed_s,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "requests": requests,
+        "concurrency": concurrency,
+    }
+
+
+# ---------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------
+def machine() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu": platform.processor()}
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(results: Dict[str, dict], path: Path = BASELINE_PATH, merge: bool = True):
+    """
+    Write results as the new baseline. With merge, benchmarks that didn't run
+    (filtered out or skipped) keep their previous numbers.
+    """
+    baseline = load_baseline(path) if merge else {}
+    benchmarks = baseline.get("benchmarks", {})
+    for name, result in results.items():
+        if "ms_per_op" in result:
+            benchmarks[name] = {k: round(v, 3) if isinstance(v, float) else v for k, v in result.items()}
+
+    path.write_text(json.dumps(
+        {"machine": machine(), "benchmarks": dict(sorted(benchmarks.items()))}, indent=2
+    ) + "\n")
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> List[dict]:
+    """
+    One row per benchmark: baseline vs current and whether it regressed
+    (current slower than baseline by more than `threshold`, e.g. 0.25 = 25%).
+    """
+    rows = []
+    known = baseline.get("benchmarks", {})
+    for name, result in results.items():
+        row = {"name": name, "current": result.get("ms_per_op"), "baseline": None, "change": None, "regressed": False}
+        if "skipped" in result:
+            row["note"] = f"skipped: {result['skipped']}"
+        elif name in known:
+            row["baseline"] = known[name]["ms_per_op"]
+            row["change"] = row["current"] / row["baseline"] - 1 if row["baseline"] else None
+            row["regressed"] = row["change"] is not None and row["change"] > threshold
+        else:
+            row["note"] = "no baseline"
+        rows.append(row)
+    return rows
+
+
+def run_benchmark(bench: Benchmark, ctx: Context) -> dict:
+    try:
+        return bench.fn(ctx)
+    except SkipBenchmark as e:
+        return {"skipped": str(e)}
+
+
+def format_rows(rows: List[dict]) -> str:
+    lines = [f"{'benchmark':<40} {'baseline ms':>12} {'current ms':>12} {'change':>8}"]
+    for row in rows:
+        baseline = f"{row['baseline']:.3f}" if row["baseline"] is not None else "-"
+        current = f"{row['current']:.3f}" if row["current"] is not None else "-"
+        change = f"{row['change']:+.0%}" if row["change"] is not None else ""
+        flag = "  REGRESSED" if row["regressed"] else (f"  ({row['note']})" if row.get("note") else "")
+        lines.append(f"{row['name']:<40} {baseline:>12} {current:>12} {change:>8}{flag}")
+    return "\n".join(lines)
+
+
+def regressions(rows: List[dict]) -> List[dict]:
+    return [row for row in rows if row["regressed"]]
@@ -0,0 +1,105 @@
+"""
+Run the benchmark suite and compare against baseline.json.
+
+    python -m backend.benchmarks.run                     # compare, exit 1 on regression
+    python -m backend.benchmarks.run --only matcher ocr  # benchmark groups or names
+    python -m backend.benchmarks.run --update-baseline   # record current numbers
+    python -m backend.benchmarks.run --quick             # fewer rounds (smoke run)
+
+A benchmark regresses when its ms/op is more than --threshold (default 25%)
+above the baseline. Baselines are machine specific: re-record them on the
+machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+
+def configure_environment(workdir: Path):
+    """
+    Point the app at throwaway storage before anything imports its settings.
+    Result caches and vendor templates are off so every parse does the full
+    OCR + LLM work; the LLM itself is FakeLLMBackend. Logging is cut to
+    warnings so the per-request log lines don't flood the output.
+    """
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "CACHE_DIR": str(workdir / "cache"),
+        "STORAGE_TYPE": "local",
+        "OPENAI_API_KEY": "bench",
+        "OCR_CACHE_ENABLED": "false",
+        "LLM_CACHE_ENABLED": "false",
+        "TEMPLATE_PARSING_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", help="benchmark groups or names to run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="write results to baseline.json")
+    parser.add_argument("--quick", action="store_true", help="fewer rounds; numbers are noisier")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="re-run a regressed benchmark this many times and keep its best result")
+    parser.add_argument("--output", type=Path, help="also write raw results to this JSON file")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="invoice-bench-"))
+    configure_environment(workdir)
+
+    # Imported late: these import the app, which reads settings at import time
+    from backend.benchmarks import bench_services, bench_api  # noqa: F401  (registers benchmarks)
+    from backend.benchmarks.harness import (
+        REGISTRY, Context, compare, format_rows, load_baseline, regressions, run_benchmark, save_baseline
+    )
+
+    selected = [
+        b for b in REGISTRY
+        if not args.only or b.group in args.only or b.name in args.only
+    ]
+    ctx = Context(workdir=workdir, quick=args.quick)
+
+    baseline = load_baseline()
+    results = {}
+    try:
+        for bench in selected:
+            print(f"[Bench] {bench.name} ...", flush=True)
+            results[bench.name] = run_benchmark(bench, ctx)
+
+            # A one-off slow run (noisy neighbour, GC) shouldn't fail the suite
+            for attempt in range(args.retries if not args.update_baseline else 0):
+                if not regressions(compare({bench.name: results[bench.name]}, baseline, args.threshold)):
+                    break
+                print(f"[Bench] {bench.name} looks slower than baseline, re-running ({attempt + 1}/{args.retries})")
+                retry = run_benchmark(bench, ctx)
+                if retry.get("ms_per_op", float("inf")) < results[bench.name]["ms_per_op"]:
+                    results[bench.name] = retry
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.update_baseline:
+        save_baseline(results)
+        print(f"[Bench] Baseline updated ({len(results)} benchmarks)")
+        return 0
+
+    rows = compare(results, baseline, args.threshold)
+    print(format_rows(rows))
+
+    failed = regressions(rows)
+    if failed:
+        print(f"[Bench] {len(failed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
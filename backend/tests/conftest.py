@@ -0,0 +1,39 @@
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.pool import StaticPool
+from backend.app.db import crud
+
+
+@pytest.fixture
+def engine():
+    """
+    Empty in-memory database with every table. StaticPool keeps it on one
+    connection, so every session (and thread) sees the same data.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+def _add_doc(session, company_id, doc_type, parsed, ocr_text=None, filename="x.pdf"):
+    doc = crud.create_document(session, company_id=company_id, filename=filename, doc_type=doc_type)
+    if ocr_text:
+        crud.update_document_ocr(session, doc.id, ocr_text)
+    crud.update_document_parsed(session, doc.id, parsed)
+    return doc
+
+
+@pytest.fixture
+def add_doc():
+    """
+    add_doc(session, company_id, doc_type, parsed, ocr_text=None, filename="x.pdf"):
+    store a document as uploaded, OCR'd and parsed.
+    """
+    return _add_doc
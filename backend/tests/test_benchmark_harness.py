@@ -0,0 +1,24 @@
+from backend.benchmarks.harness import compare, regressions, save_baseline, load_baseline
+
+
+def test_regression_is_flagged_only_beyond_threshold(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline({"a": {"ms_per_op": 10.0}, "b": {"ms_per_op": 2.0}, "c": {"skipped": "no tesseract"}}, path)
+    baseline = load_baseline(path)
+
+    rows = compare(
+        {"a": {"ms_per_op": 12.0}, "b": {"ms_per_op": 2.6}, "c": {"skipped": "no tesseract"}, "d": {"ms_per_op": 1.0}},
+        baseline, threshold=0.25
+    )
+
+    assert set(baseline["benchmarks"]) == {"a", "b"}
+    assert [row["name"] for row in regressions(rows)] == ["b"]
+    assert {row["name"]: row.get("note") for row in rows}["d"] == "no baseline"
+
+
+def test_partial_update_keeps_other_baselines(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline({"a": {"ms_per_op": 10.0}, "b": {"ms_per_op": 2.0}}, path)
+    save_baseline({"a": {"ms_per_op": 8.0}}, path)
+
+    assert {name: b["ms_per_op"] for name, b in load_baseline(path)["benchmarks"].items()} == {"a": 8.0, "b": 2.0}
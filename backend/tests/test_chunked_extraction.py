@@ -0,0 +1,99 @@
+import asyncio
+import json
+import time
+from backend.app.config import settings
+from backend.app.services.chunking import chunk_text, split_into_chunks, merge_items
+from backend.app.services.llm_adapter import LLMService
+from backend.app.services.llm_client import LLMClientRunner
+
+
+def item_line(n: int) -> str:
+    return f"Hex bolt M{n} | {n} | pcs | 10.00 | {n * 10}.00"
+
+
+def test_chunks_follow_page_and_size_limits():
+    pages = ["\n".join(item_line(n) for n in range(p * 40, p * 40 + 40)) for p in range(5)]
+    text = "\f".join(pages)
+
+    chunks = split_into_chunks(text, max_chars=2500)
+
+    assert all(len(chunk) <= 2500 for chunk in chunks)
+    assert 2 <= len(chunks) <= 5
+    for n in range(200):
+        assert any(item_line(n) in chunk for chunk in chunks)
+
+
+def test_merge_drops_overlap_but_keeps_real_repeats():
+    bolt = {"description": "Hex Bolt", "qty": 1, "rate": 10, "line_total": 10}
+    nut = {"description": "Nut", "qty": 2, "rate": 1, "line_total": 2}
+    washer = {"description": "Washer", "qty": 5, "rate": 1, "line_total": 5}
+
+    merged = merge_items([[bolt, bolt, nut], [dict(nut, description="nut "), washer], [bolt]], overlaps=[0, 2, 0])
+
+    assert merged == [bolt, bolt, nut, washer, bolt]
+
+    # The same line ending one page and starting the next is two real lines
+    assert merge_items([[bolt, nut], [nut, washer]], overlaps=[0, 0]) == [bolt, nut, nut, washer]
+
+
+def test_forced_splits_stay_within_limit_and_report_overlap():
+    # Every third row is long: the overlap must shrink to leave room for it
+    lines = [f"Row {n} " + "x" * (40 if n % 3 else 120) for n in range(60)]
+    chunks, overlaps = chunk_text("\n".join(lines), max_chars=220)
+
+    assert all(len(chunk) <= 220 for chunk in chunks)
+    assert overlaps[0] == 0 and all(n <= 2 for n in overlaps) and any(overlaps)
+    for previous, chunk, overlap in zip(chunks, chunks[1:], overlaps[1:]):
+        if overlap:
+            assert chunk.split("\n")[:overlap] == previous.split("\n")[-overlap:]
+    assert [line for line in lines if not any(line in chunk for chunk in chunks)] == []
+
+
+class FakeLLM:
+    """
+    Fake chat client: echoes the item lines it was given, with a fixed latency.
+    """
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+
+    async def chat(self, messages, max_tokens=1200, temperature=0):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        if '"items": [' in prompt and "Extract every line item" in prompt:
+            items = []
+            for line in prompt.splitlines():
+                if line.startswith("Hex bolt"):
+                    desc, qty, unit, rate, total = [part.strip() for part in line.split("|")]
+                    items.append({"description": desc, "qty": int(qty), "unit": unit,
+                                  "rate": float(rate), "line_total": float(total)})
+            return json.dumps({"items": items})
+        return json.dumps({"doc_number": "INV-LONG", "grand_total": 1.0})
+
+    async def aclose(self):
+        pass
+
+
+def test_long_documents_are_extracted_in_parallel_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CHUNK_CHARS", 2000)
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    fake = FakeLLM()
+    runner = LLMClientRunner(client_factory=lambda: fake)
+    llm = LLMService(cache=None, runner=runner)
+    llm.enabled = True
+
+    text = "\f".join("\n".join(item_line(n) for n in range(p * 30, p * 30 + 30)) for p in range(10))
+    try:
+        start = time.monotonic()
+        parsed = llm.parse_ocr_text(text)
+        elapsed = time.monotonic() - start
+    finally:
+        runner.close()
+
+    assert parsed["doc_number"] == "INV-LONG"
+    assert [item["description"] for item in parsed["items"]] == [f"Hex bolt M{n}" for n in range(300)]
+    assert fake.calls > 3
+    # All calls overlap: latency is about one call, not one per chunk
+    assert elapsed < fake.latency * 3
@@ -0,0 +1,18 @@
+from sqlalchemy import text
+from backend.app.config import settings
+from backend.app.db.session import build_engine
+
+
+def test_sqlite_pragmas_follow_the_engine_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", "sqlite://")
+    monkeypatch.setattr(settings, "SQLITE_JOURNAL_MODE", "WAL")
+
+    file_engine = build_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    with file_engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    file_engine.dispose()
+
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    memory_engine = build_engine("sqlite://")
+    with memory_engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "memory"
@@ -0,0 +1,38 @@
+from datetime import datetime
+from backend.app.db import crud
+from backend.app.db.models import Document
+
+
+def test_keyset_pages_cover_every_document_once(session):
+    company = crud.create_company(session, name="Acme")
+    same_time = datetime(2024, 1, 1)
+    for n in range(7):
+        session.add(Document(company_id=company.id, filename=f"{n}.pdf", doc_type="PO" if n % 2 else "INVOICE",
+                             uploaded_at=same_time, ocr_text="big text"))
+    session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = crud.list_documents(session, company.id, limit=3, cursor=cursor)
+        seen.extend(d["id"] for d in page)
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(set(seen)) == 7
+    assert "ocr_text" not in page[0]
+
+
+def test_projection_and_filters(session):
+    company = crud.create_company(session, name="Acme")
+    po = crud.create_document(session, company_id=company.id, filename="po.pdf", doc_type="PO")
+    crud.update_document_parsed(session, po.id, {"doc_number": "PO-1"})
+    crud.create_document(session, company_id=company.id, filename="inv.pdf", doc_type="INVOICE")
+
+    rows, cursor = crud.list_documents(session, company.id, fields=["doc_type", "parsed_json"], parsed=True)
+
+    assert cursor is None
+    assert list(rows[0].keys()) == ["doc_type", "parsed_json"]
+    assert rows[0]["doc_type"] == "PO"
+    assert crud.count_documents(session, company.id, parsed=False) == 1
+    assert crud.count_documents(session, company.id, doc_type="PO") == 1
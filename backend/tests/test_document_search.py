@@ -0,0 +1,77 @@
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import select
+from backend.app.db import crud
+from backend.app.db.models import Document
+from backend.app.db.session import get_session
+from backend.app.main import app
+from backend.app.utils.validation import header_fields
+
+
+def seed(session):
+    company = crud.create_company(session, name="Acme")
+    rows = [
+        ("INVOICE", {"doc_number": "INV-1", "date": "2024-03-01", "vendor_name": "Acme Steel", "grand_total": 1200.0}),
+        ("INVOICE", {"doc_number": "INV-2", "date": "15/03/2024", "vendor_name": "acme tools", "grand_total": "Rs. 5,400.50"}),
+        ("INVOICE", {"doc_number": "INV-3", "date": "2024-04-02", "vendor_name": "Beta Corp", "grand_total": 800}),
+        ("PO", {"doc_number": "PO-1", "date": "not a date", "vendor_name": "Acme Steel", "grand_total": None}),
+    ]
+    for n, (doc_type, parsed) in enumerate(rows):
+        doc = crud.create_document(session, company.id, f"{n}.pdf", doc_type)
+        crud.update_document_parsed(session, doc.id, {**parsed, "currency": "inr", "vendor_gstin": "29abcde1234f1z5"})
+    crud.create_document(session, company.id, "unparsed.pdf", "INVOICE")
+    return company.id
+
+
+def test_header_fields_are_typed_and_normalized():
+    fields = header_fields({"date": "15 Mar 2024", "grand_total": "1,23,456.50", "currency": " usd ",
+                            "vendor_name": "  Acme   Ltd ", "vendor_gstin": "29 abcde1234f1z5"})
+    assert fields["doc_date"] == date(2024, 3, 15)
+    assert fields["grand_total"] == 123456.5
+    assert fields["currency"] == "USD"
+    assert fields["vendor_name"] == "Acme Ltd"
+    assert fields["vendor_gstin"] == "29ABCDE1234F1Z5"
+    assert header_fields(None)["doc_number"] is None
+
+
+def test_search_filters_and_sorts_in_sql(session):
+    company_id = seed(session)
+
+    rows, total = crud.search_documents(session, company_id, vendor="acme", sort="grand_total")
+    assert total == 3
+    # Ascending by total, the PO without a total last
+    assert [r["doc_number"] for r in rows] == ["INV-1", "INV-2", "PO-1"]
+
+    rows, total = crud.search_documents(session, company_id, doc_type="INVOICE",
+                                        date_from=date(2024, 3, 1), date_to=date(2024, 3, 31),
+                                        min_total=1000, currency="INR", vendor_gstin="29ABCDE1234F1Z5")
+    assert total == 2
+    assert [r["doc_number"] for r in rows] == ["INV-2", "INV-1"]
+
+
+def test_vendor_prefix_is_literal_and_uses_the_index(session):
+    company_id = seed(session)
+
+    assert crud.search_documents(session, company_id, vendor="  ACME   st")[1] == 2
+    assert crud.search_documents(session, company_id, vendor="acme%")[1] == 0
+    assert crud.search_documents(session, company_id, vendor="acm_")[1] == 0
+
+    statement = select(Document.id).where(*crud._prefix_filters(Document.vendor_name_key, "acme"),
+                                          Document.company_id == company_id)
+    compiled = statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = " ".join(str(row) for row in session.exec(text(f"EXPLAIN QUERY PLAN {compiled}")))
+    assert "ix_document_company_vendor_key" in plan
+
+
+def test_search_route_is_not_shadowed_by_document_id(session):
+    company_id = seed(session)
+    app.dependency_overrides[get_session] = lambda: session
+    try:
+        client = TestClient(app)
+        res = client.get("/api/documents/search", params={"company_id": company_id, "max_total": 1000})
+        assert res.status_code == 200
+        assert [d["doc_number"] for d in res.json()["data"]["documents"]] == ["INV-3"]
+        assert client.get("/api/documents/search", params={"company_id": company_id, "sort": "ocr_text"}).status_code == 400
+    finally:
+        app.dependency_overrides.pop(get_session, None)
@@ -0,0 +1,60 @@
+from PIL import Image, ImageDraw
+from backend.app.config import settings
+from backend.app.services import ocr_adapter
+from backend.app.services.image_preprocess import estimate_skew, binarize, preprocess_image
+
+
+def page_photo(angle: float = 0.0, size=(2480, 3508)) -> Image.Image:
+    """
+    A4 at 300 dpi: grey paper, dark text-like bars, optionally rotated.
+    """
+    img = Image.new("RGB", size, (225, 220, 210))
+    draw = ImageDraw.Draw(img)
+    for row in range(30):
+        y = 600 + row * 70
+        for x in range(300, 2000, 140):
+            draw.rectangle([x, y, x + 100, y + 24], fill=(30, 30, 40))
+    if angle:
+        img = img.rotate(angle, expand=True, fillcolor=(225, 220, 210))
+    return img
+
+
+def test_skew_is_estimated_and_removed():
+    for angle in (3.0, -5.0):
+        assert abs(estimate_skew(binarize(page_photo(angle).convert("L")), 10) - angle) <= 0.2
+
+    image, stats = preprocess_image(page_photo(4.0))
+    assert abs(stats["skew_degrees"] - 4.0) <= 0.2
+    assert abs(estimate_skew(image.convert("L"), 10)) <= 0.2
+
+
+def test_photo_is_downscaled_binarized_and_cropped():
+    # 2x the pixels of an A4 page at 300 dpi and no DPI metadata, like a phone photo
+    photo = page_photo(size=(4960, 7016))
+
+    image, stats = preprocess_image(photo)
+
+    assert image.mode == "1"
+    assert stats["dpi"] == settings.OCR_TARGET_DPI
+    # Bars span about 1700 x 2100 px of the original, i.e. half that after downscaling
+    assert 850 <= image.width <= 1000 and 1050 <= image.height <= 1200
+    assert stats["output_pixels"] < stats["input_pixels"] / 20
+    assert {"decode", "grayscale", "downscale", "binarize", "deskew", "crop"} <= set(stats["steps_ms"])
+
+
+def test_image_ocr_reports_tesseract_time(tmp_path, monkeypatch):
+    path = tmp_path / "photo.png"
+    page_photo(2.0).save(path)
+    seen = []
+
+    def fake_tesseract(image, dpi=None):
+        seen.append((image.mode, dpi))
+        return "Invoice INV-1"
+
+    monkeypatch.setattr(ocr_adapter, "run_tesseract", fake_tesseract)
+
+    text, stats = ocr_adapter.ocr_image_file(str(path))
+
+    assert text == "Invoice INV-1"
+    assert seen == [("1", settings.OCR_TARGET_DPI)]
+    assert "tesseract" in stats["steps_ms"]
@@ -0,0 +1,178 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from backend.app.db import crud
+from backend.app.db.session import get_session
+from backend.app.main import app
+from backend.app.services import jobs
+
+PARSED = {"doc_number": "INV-9", "vendor_name": "Acme", "grand_total": 100.0, "items": []}
+
+
+class StubParser:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def parse_text(self, ocr_text, document_id=None, doc_type=None):
+        self.calls.append((ocr_text, document_id, doc_type))
+        if self.error:
+            raise RuntimeError(self.error)
+        return PARSED
+
+
+@pytest.fixture
+def queue(engine, monkeypatch):
+    """
+    A JobQueue on the test database, with OCR stubbed and run on threads
+    (no worker processes) and a stub parser in place of the LLM.
+    The in-memory database is one shared connection, so the test thread and
+    the workers take turns: jobs wait for queue.release before their first
+    stage, and queue.finished collects the ids of jobs whose last stage returned.
+    """
+    monkeypatch.setattr(jobs, "engine", engine)
+    monkeypatch.setattr(jobs, "run_ocr_stage", lambda local_path, file_hash=None: f"text of {local_path}")
+    statuses = []
+    update_job_status = crud.update_job_status
+
+    def record_status(session, job_id, status, **kwargs):
+        statuses.append((job_id, status))
+        return update_job_status(session, job_id, status, **kwargs)
+
+    monkeypatch.setattr(crud, "update_job_status", record_status)
+
+    queue = jobs.JobQueue(ocr_workers=1, llm_workers=2)
+    queue.ocr_pool.shutdown()
+    queue.ocr_pool = ThreadPoolExecutor(max_workers=1)
+    queue.parser = StubParser()
+    queue.statuses = statuses
+    queue.release, queue.finished = threading.Event(), set()
+    fetch_stage, llm_stage = queue._fetch_stage, queue._llm_stage
+
+    def fetch_stage_when_released(*args):
+        queue.release.wait(10)
+        fetch_stage(*args)
+
+    def llm_stage_then_signal(job_id, doc_id, ocr_future):
+        try:
+            llm_stage(job_id, doc_id, ocr_future)
+        finally:
+            queue.finished.add(job_id)
+
+    queue._fetch_stage, queue._llm_stage = fetch_stage_when_released, llm_stage_then_signal
+    monkeypatch.setattr(jobs, "_queue", queue)
+    yield queue
+    queue.shutdown()
+
+
+def wait_for(queue, engine, job_id, timeout=10.0):
+    queue.release.set()
+    deadline = time.monotonic() + timeout
+    while job_id not in queue.finished:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"job {job_id} did not finish")
+        time.sleep(0.01)
+    queue.release.clear()
+    with Session(engine) as session:
+        return crud.get_job(session, job_id)
+
+
+def test_parse_job_goes_through_ocr_and_llm_to_done(engine, session, add_doc, queue):
+    company = crud.create_company(session, name="Acme")
+    doc = add_doc(session, company.id, "INVOICE", {"doc_number": "OLD"}, filename="inv.pdf")
+
+    job = queue.submit_parse(session, doc)
+    finished = wait_for(queue, engine, job.id)
+
+    assert [status for job_id, status in queue.statuses if job_id == job.id] == ["ocr", "llm", "done"]
+    assert queue.parser.calls == [("text of inv.pdf", doc.id, "INVOICE")]
+    assert finished.progress == 1.0 and finished.error is None
+    assert finished.started_at is not None and finished.finished_at is not None
+
+    session.expire_all()
+    stored = crud.get_document(session, doc.id)
+    assert stored.ocr_text == "text of inv.pdf"
+    assert stored.parsed_json == PARSED
+
+
+def test_failed_stage_marks_the_job_failed_with_its_error(engine, session, add_doc, queue, monkeypatch):
+    company = crud.create_company(session, name="Acme")
+    doc = add_doc(session, company.id, "INVOICE", {"doc_number": "OLD"})
+
+    queue.parser = StubParser(error="LLM unavailable")
+    failed = wait_for(queue, engine, queue.submit_parse(session, doc).id)
+    assert (failed.status, failed.error) == ("failed", "LLM unavailable")
+
+    def broken_ocr(local_path, file_hash=None):
+        raise OSError("tesseract crashed")
+
+    monkeypatch.setattr(jobs, "run_ocr_stage", broken_ocr)
+    failed = wait_for(queue, engine, queue.submit_parse(session, doc).id)
+    assert (failed.status, failed.error) == ("failed", "tesseract crashed")
+
+    session.expire_all()
+    assert crud.get_document(session, doc.id).parsed_json == {"doc_number": "OLD"}
+
+
+def test_stored_object_is_fetched_before_the_ocr_worker_runs(engine, session, add_doc, queue, monkeypatch):
+    # The worker gets a local path: S3 objects come through the parent's
+    # object cache, which shares downloads between jobs
+    fetched = []
+
+    class FakeS3Storage:
+        def local_path(self, path):
+            fetched.append(path)
+            return f"/cache/objects/{path.rsplit('/', 1)[-1]}"
+
+    monkeypatch.setattr(jobs, "get_storage", FakeS3Storage)
+    company = crud.create_company(session, name="Acme")
+    doc = add_doc(session, company.id, "INVOICE", {"doc_number": "OLD"}, filename="uploads/abc_inv.pdf")
+
+    assert wait_for(queue, engine, queue.submit_parse(session, doc).id).status == "done"
+    assert fetched == ["uploads/abc_inv.pdf"]
+    assert queue.parser.calls[0][0] == "text of /cache/objects/abc_inv.pdf"
+
+
+def test_unfinished_jobs_are_resumed_at_startup(engine, session, add_doc, queue):
+    assert jobs.resume_unfinished_jobs() == 0
+
+    company = crud.create_company(session, name="Acme")
+    doc = add_doc(session, company.id, "PO", {"doc_number": "OLD"})
+    # Resumed in id order: the orphan is failed before any worker starts
+    orphan = crud.create_job(session, kind="parse", document_id=doc.id + 1)
+    interrupted = crud.create_job(session, kind="parse", document_id=doc.id)
+    crud.update_job_status(session, interrupted.id, "llm")
+    finished = crud.create_job(session, kind="parse", document_id=doc.id)
+    crud.update_job_status(session, finished.id, "done")
+
+    assert jobs.resume_unfinished_jobs() == 1
+    assert wait_for(queue, engine, interrupted.id).status == "done"
+
+    session.expire_all()
+    assert crud.get_job(session, orphan.id).error == "Document not found"
+    assert [job_id for job_id, status in queue.statuses if status == "ocr"] == [interrupted.id]
+
+
+def test_parse_async_endpoint_and_job_polling(engine, session, add_doc, queue):
+    company = crud.create_company(session, name="Acme")
+    doc = add_doc(session, company.id, "INVOICE", {"doc_number": "OLD"})
+    app.dependency_overrides[get_session] = lambda: session
+    try:
+        client = TestClient(app)
+        res = client.post(f"/api/documents/{doc.id}/parse/async")
+        assert res.status_code == 202
+        job_id = res.json()["data"]["job_id"]
+
+        wait_for(queue, engine, job_id)
+        session.expire_all()
+        data = client.get(f"/api/jobs/{job_id}").json()["data"]
+        assert (data["kind"], data["document_id"], data["status"]) == ("parse", doc.id, "done")
+        assert data["result"]["parsed"] == PARSED
+
+        assert client.get("/api/jobs/999999").status_code == 404
+        assert client.post("/api/documents/999999/parse/async").status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_session, None)
@@ -0,0 +1,35 @@
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session
+from backend.app.db import crud
+from backend.app.db.session import build_engine
+
+
+def test_json_columns_store_compact_and_read_decoded():
+    engine = build_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        company = crud.create_company(session, name="Acme")
+        doc = crud.create_document(session, company_id=company.id, filename="po.pdf", doc_type="PO")
+        crud.update_document_parsed(session, doc.id, {"doc_number": "PO-1", "line_items": [{"qty": 2}]})
+        match = crud.create_match(session, company.id, doc.id, doc.id, "Warning",
+                                  mismatches=[{"type": "grand_total_mismatch"}], fraud_flags=[],
+                                  confidence_score=80.0)
+
+        raw = session.execute(text("SELECT parsed_json FROM document")).scalar_one()
+        assert raw == '{"doc_number":"PO-1","line_items":[{"qty":2}]}'
+
+        session.expire_all()
+        assert crud.get_document(session, doc.id).parsed_json["line_items"][0]["qty"] == 2
+        assert crud.get_match(session, match.id).mismatches == [{"type": "grand_total_mismatch"}]
+
+
+def test_unparsed_documents_stay_sql_null():
+    engine = build_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        company = crud.create_company(session, name="Acme")
+        crud.create_document(session, company_id=company.id, filename="inv.pdf", doc_type="INVOICE")
+
+        assert crud.count_documents(session, company.id, parsed=False) == 1
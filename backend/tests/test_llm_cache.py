@@ -0,0 +1,71 @@
+import json
+from backend.app.utils.disk_cache import DiskCache
+from backend.app.services.llm_cache import LLMResponseCache
+from backend.app.config import settings
+from backend.app.services.llm_adapter import LLMService, PROMPT_VERSION
+from backend.app.services.parser import ParserService
+
+
+def make_service(tmp_path, monkeypatch, ttl=None):
+    cache = LLMResponseCache(DiskCache(tmp_path, max_bytes=1024 * 1024), ttl_seconds=ttl)
+    llm = LLMService(cache=cache)
+    llm.enabled = True
+    calls = []
+
+    async def fake_call(text):
+        calls.append(text)
+        return {"doc_number": "INV-1"}
+
+    monkeypatch.setattr(llm, "_call_llm", fake_call)
+    return llm, cache, calls
+
+
+def test_repeated_parse_is_served_from_cache(tmp_path, monkeypatch):
+    llm, cache, calls = make_service(tmp_path, monkeypatch)
+
+    assert llm.parse_ocr_text("Invoice  INV-1\n Total 100") == {"doc_number": "INV-1"}
+    # Whitespace differences normalize to the same key
+    assert llm.parse_ocr_text("Invoice INV-1 Total 100 ") == {"doc_number": "INV-1"}
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_and_invalidation(tmp_path, monkeypatch):
+    llm, cache, calls = make_service(tmp_path, monkeypatch, ttl=60)
+
+    llm.parse_ocr_text("Invoice INV-1")
+
+    # Age the entry past its TTL
+    key = cache.make_key("Invoice INV-1", settings.OPENAI_MODEL, PROMPT_VERSION)
+    entry = json.loads(cache.store.get(key))
+    entry["cached_at"] -= 120
+    cache.store.set(key, json.dumps(entry).encode("utf-8"))
+
+    llm.parse_ocr_text("Invoice INV-1")
+    assert len(calls) == 2
+    assert cache.stats()["expired"] == 1
+
+    assert llm.invalidate_cache("Invoice INV-1") == 1
+    llm.parse_ocr_text("Invoice INV-1")
+    assert len(calls) == 3
+
+
+def test_cached_llm_answer_is_not_learned_again(tmp_path, monkeypatch):
+    llm, cache, calls = make_service(tmp_path, monkeypatch)
+    learned = []
+
+    class Templates:
+        def extract(self, text, doc_type=None):
+            return None
+
+        def learn(self, text, parsed, document_id=None, doc_type=None):
+            learned.append(text)
+
+    parser = ParserService(ocr=object(), llm=llm, templates=Templates())
+    assert parser.parse_text("Invoice INV-1", doc_type="INVOICE") == {"doc_number": "INV-1"}
+    assert parser.parse_text("Invoice INV-1", doc_type="INVOICE") == {"doc_number": "INV-1"}
+
+    assert len(calls) == 1
+    assert learned == ["Invoice INV-1"]
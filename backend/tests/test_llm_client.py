@@ -0,0 +1,122 @@
+import asyncio
+import json
+import httpx
+import pytest
+from backend.app.services.llm_client import AsyncLLMClient, LLMRequestError, TokenBucket
+
+
+MESSAGES = [{"role": "user", "content": "Invoice INV-1 Total 100"}]
+
+
+def completion(content: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+class FakeProvider:
+    """
+    Fake chat-completions endpoint: every request fails `failures` times first
+    (429 with Retry-After, then 503), and in-flight requests are counted.
+    """
+
+    def __init__(self, failures: int = 2, latency: float = 0.01):
+        self.failures = failures
+        self.latency = latency
+        self.attempts = {}
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            attempt = self.attempts[prompt] = self.attempts.get(prompt, 0) + 1
+            if attempt <= self.failures:
+                if attempt % 2:
+                    return httpx.Response(429, headers={"Retry-After": "0"})
+                return httpx.Response(503)
+            return completion(f"ok:{prompt}")
+        finally:
+            self.in_flight -= 1
+
+
+def make_client(handler, **kwargs) -> AsyncLLMClient:
+    options = dict(api_key="test", max_concurrency=8, requests_per_minute=0, tokens_per_minute=0,
+                   timeout=1.0, max_retries=3, backoff_base=0.001)
+    options.update(kwargs)
+    return AsyncLLMClient(base_url="http://llm.test/v1", transport=httpx.MockTransport(handler), **options)
+
+
+def test_hundreds_of_concurrent_calls_retry_and_respect_the_limit():
+    provider = FakeProvider(failures=2)
+
+    async def run():
+        client = make_client(provider)
+        try:
+            return await asyncio.gather(*[
+                client.chat([{"role": "user", "content": f"doc {n}"}]) for n in range(300)
+            ])
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+
+    assert results == [f"ok:doc {n}" for n in range(300)]
+    assert provider.peak <= 8
+    assert all(count == 3 for count in provider.attempts.values())
+
+
+def test_client_errors_are_not_retried_and_retries_are_bounded():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400 if len(calls) == 1 else 500)
+
+    async def run():
+        client = make_client(handler, max_retries=2)
+        try:
+            with pytest.raises(LLMRequestError, match="HTTP 400"):
+                await client.chat(MESSAGES)
+            with pytest.raises(LLMRequestError, match="after 3 attempts"):
+                await client.chat(MESSAGES)
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert len(calls) == 4
+
+
+def test_slow_responses_time_out_and_are_retried():
+    provider = FakeProvider(failures=0, latency=0.2)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return await provider(request)
+
+    async def run():
+        client = make_client(handler, timeout=0.5)
+        try:
+            return await client.chat(MESSAGES)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "ok:Invoice INV-1 Total 100"
+    assert len(calls) == 2
+
+
+def test_token_bucket_paces_requests():
+    async def run():
+        bucket = TokenBucket(per_minute=600)     # 10 per second, burst of 600
+        bucket.tokens = 0
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(3):
+            await bucket.acquire(1)
+        return loop.time() - start
+
+    assert asyncio.run(run()) >= 0.25
@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+from datetime import datetime
+from backend.app.db import crud
+from backend.app.db.models import Match
+from backend.app.services.match_export import csv_chunks, ndjson_chunks
+
+
+def seed(session):
+    company = crud.create_company(session, name="Acme")
+    other = crud.create_company(session, name="Other")
+    for day in range(1, 8):
+        session.add(Match(company_id=company.id, po_id=1, invoice_id=2, status="Warning",
+                          mismatches=[{"type": "price", "line": day}], fraud_flags=["duplicate_invoice"],
+                          confidence_score=0.5, created_at=datetime(2024, 3, day)))
+    session.add(Match(company_id=other.id, status="Matched", created_at=datetime(2024, 3, 2)))
+    session.commit()
+    return company.id
+
+
+def test_batches_cover_date_range_in_order(session):
+    company_id = seed(session)
+
+    batches = list(crud.iter_matches(session, company_id, datetime(2024, 3, 2), datetime(2024, 3, 7), batch_size=2))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    days = [row["created_at"].day for batch in batches for row in batch]
+    assert days == [2, 3, 4, 5, 6]
+    assert batches[0][0]["mismatches"] == [{"type": "price", "line": 2}]
+
+
+def test_ndjson_and_csv_encoding(session):
+    company_id = seed(session)
+
+    lines = b"".join(ndjson_chunks(crud.iter_matches(session, company_id, batch_size=3))).decode().splitlines()
+    assert len(lines) == 7
+    first = json.loads(lines[0])
+    assert first["fraud_flags"] == ["duplicate_invoice"]
+    assert first["created_at"].startswith("2024-03-01")
+
+    text = b"".join(csv_chunks(crud.iter_matches(session, company_id, batch_size=3))).decode()
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert len(rows) == 7
+    assert json.loads(rows[-1]["mismatches"]) == [{"type": "price", "line": 7}]
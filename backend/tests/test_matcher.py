@@ -0,0 +1,39 @@
+import time
+from backend.app.services.matcher import MatcherService
+from backend.app.services.line_matching import assign_line_items
+
+
+def line(desc, qty=1, rate=10.0):
+    return {"description": desc, "qty": qty, "rate": rate, "line_total": qty * rate}
+
+
+def test_reordered_words_match_and_short_names_do_not():
+    po_items = [line("Steel Bolt M8"), line("Pen")]
+    inv_items = [line("M8 bolt, steel"), line("Pencil sharpener")]
+
+    pairs = assign_line_items(po_items, inv_items)
+
+    assert [(p, i) for p, i, _ in pairs] == [(0, 0)]
+
+
+def test_matched_lines_compare_quantity_and_rate():
+    po = {"items": [line("A4 copier paper", qty=10, rate=5.0), line("Stapler", qty=2, rate=40.0)]}
+    inv = {"items": [line("Stapler", qty=2, rate=40.0), line("Copier paper A4", qty=12, rate=5.0)]}
+
+    result = MatcherService().match_po_and_invoice(po, inv)
+    types = sorted(m["type"] for m in result["mismatches"])
+
+    assert types == ["item_qty_mismatch", "item_total_mismatch"]
+    assert all(m["item"] == "a4 copier paper" for m in result["mismatches"])
+
+
+def test_large_invoices_match_quickly():
+    po = {"items": [line(f"Part {n} hex nut grade {n % 7}", qty=n % 5 + 1) for n in range(1000)]}
+    inv = {"items": list(reversed(po["items"]))}
+
+    start = time.perf_counter()
+    result = MatcherService().match_po_and_invoice(po, inv)
+    elapsed = time.perf_counter() - start
+
+    assert result["mismatches"] == []
+    assert elapsed < 2.0
@@ -0,0 +1,48 @@
+import json
+import logging
+from fastapi.testclient import TestClient
+from backend.app.logging_config import JsonFormatter, end_request, record_stage, stage_breakdown_ms, start_request
+from backend.app.main import app
+
+client = TestClient(app)
+
+
+def test_request_id_is_echoed_and_generated():
+    res = client.get("/api/health", headers={"X-Request-ID": "abc123"})
+    assert res.headers["X-Request-ID"] == "abc123"
+
+    res = client.get("/api/health")
+    assert len(res.headers["X-Request-ID"]) == 32
+
+
+def test_metrics_endpoint_reports_route_templates():
+    client.get("/api/documents/999999")
+    body = client.get("/metrics").text
+    assert "http_request_duration_seconds" in body
+    assert 'documents/{doc_id}"' in body
+    assert "db_commit_duration_seconds" in body
+
+
+def test_json_log_lines_carry_request_id_and_extras():
+    record = logging.LogRecord("backend.app.test", logging.INFO, __file__, 1, "parsed", None, None)
+    record.document_id = 7
+    tokens = start_request("req-1")
+    try:
+        entry = json.loads(JsonFormatter().format(record))
+    finally:
+        end_request(tokens)
+    assert entry["request_id"] == "req-1"
+    assert entry["document_id"] == 7
+    assert entry["message"] == "parsed"
+
+
+def test_stage_times_accumulate_per_request():
+    tokens = start_request("req-2")
+    try:
+        record_stage("ocr", 0.5)
+        record_stage("ocr", 0.25)
+        record_stage("llm", 1.0)
+        assert stage_breakdown_ms() == {"ocr": 750.0, "llm": 1000.0}
+    finally:
+        end_request(tokens)
+    assert stage_breakdown_ms() == {}
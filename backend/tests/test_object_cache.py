@@ -0,0 +1,92 @@
+import threading
+import pytest
+from backend.app.config import settings
+from backend.app.services.storage import StorageService
+from backend.app.utils.file_helpers import FileTooLargeError
+
+moto = pytest.importorskip("moto")
+
+
+@pytest.fixture
+def s3_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_TYPE", "s3")
+    monkeypatch.setattr(settings, "S3_BUCKET", "invoices")
+    monkeypatch.setattr(settings, "S3_REGION", "us-east-1")
+    monkeypatch.setattr(settings, "AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setattr(settings, "AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "S3_DOWNLOAD_PART_MB", 1)
+    monkeypatch.setattr(settings, "S3_CACHE_MAX_MB", 3)
+    monkeypatch.setattr(settings, "S3_CACHE_MIN_IDLE_SECONDS", 0)
+
+    with moto.mock_aws():
+        storage = StorageService()
+        storage.s3.create_bucket(Bucket="invoices")
+        yield storage
+
+
+def counting_gets(storage):
+    calls = []
+    get_object = storage.s3.get_object
+
+    def wrapped(**kwargs):
+        calls.append(kwargs["Range"])
+        return get_object(**kwargs)
+
+    storage.s3.get_object = wrapped
+    return calls
+
+
+def test_object_is_downloaded_in_ranges_once(s3_storage):
+    data = bytes(range(256)) * 10_000    # 2.5 MB → 3 ranges of 1 MB
+    key = s3_storage.save(data, "scan.pdf")
+    calls = counting_gets(s3_storage)
+
+    path = s3_storage.local_path(key)
+    again = s3_storage.local_path(key)
+
+    assert path == again and path.endswith(".pdf")
+    assert open(path, "rb").read() == data
+    assert sorted(calls) == ["bytes=0-1048575", "bytes=1048576-2097151", "bytes=2097152-2559999"]
+
+
+def test_concurrent_fetches_share_one_download(s3_storage):
+    key = s3_storage.save(b"%PDF" + b"x" * 500_000, "inv.pdf")
+    calls = counting_gets(s3_storage)
+    barrier = threading.Barrier(10)
+    paths = []
+
+    def parse():
+        barrier.wait()
+        paths.append(s3_storage.local_path(key))
+
+    threads = [threading.Thread(target=parse) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(paths)) == 1 and len(paths) == 10
+    assert len(calls) == 1
+    assert s3_storage.objects.downloads == 1
+
+
+def test_least_recently_used_objects_are_evicted(s3_storage):
+    keys = [s3_storage.save(bytes([n]) * 1_200_000, f"doc{n}.png") for n in range(3)]
+    first = s3_storage.local_path(keys[0])
+    s3_storage.local_path(keys[1])
+    s3_storage.local_path(keys[0])        # touch: keys[1] is now the oldest
+    s3_storage.local_path(keys[2])
+    s3_storage.local_path(keys[2])
+
+    downloads = s3_storage.objects.downloads
+    assert s3_storage.local_path(keys[0]) == first
+    assert s3_storage.objects.downloads == downloads
+    s3_storage.local_path(keys[1])
+    assert s3_storage.objects.downloads == downloads + 1
+
+
+def test_object_larger_than_cache_is_refused(s3_storage):
+    key = s3_storage.save(b"x" * (4 * 1024 * 1024), "huge.pdf")
+    with pytest.raises(FileTooLargeError):
+        s3_storage.local_path(key)
@@ -0,0 +1,76 @@
+import os
+import time
+from backend.app.utils.disk_cache import DiskCache
+from backend.app.services.ocr_adapter import OCRService
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=25)
+    cache.set("aa1", b"x" * 10)
+    cache.set("bb2", b"y" * 10)
+
+    # Make aa1 the most recently used entry
+    old = time.time() - 100
+    os.utime(cache._path("bb2"), (old, old))
+    assert cache.get("aa1") == b"x" * 10
+
+    cache.set("cc3", b"z" * 10)
+
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") is not None
+    assert cache.get("cc3") is not None
+
+
+def test_disk_cache_overwrite_replaces_entry_size(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=25)
+    cache.set("aa1", b"x" * 10)
+    cache.set("bb2", b"y" * 10)
+    cache.set("bb2", b"z" * 10)
+
+    assert cache._size == 20
+    assert cache.get("aa1") == b"x" * 10
+
+
+def test_disk_cache_keeps_new_and_in_use_files(tmp_path):
+    writer = DiskCache(tmp_path, max_bytes=25, min_idle_seconds=60)
+    other = DiskCache(tmp_path, max_bytes=25, min_idle_seconds=60)    # another process, same directory
+
+    src = writer.temp_path("aa1")
+    src.write_bytes(b"x" * 20)
+    in_use = writer.put_file("aa1", src)
+
+    src = other.temp_path("bb2")
+    src.write_bytes(b"y" * 30)
+    assert other.put_file("bb2", src).exists()    # larger than the cache, but just written
+    assert in_use.exists()                        # fetched moments ago: still being read
+
+    old = time.time() - 100
+    os.utime(in_use, (old, old))
+    src = other.temp_path("cc3")
+    src.write_bytes(b"z" * 5)
+    other.put_file("cc3", src)
+    assert not in_use.exists()
+
+
+def test_extract_text_skips_extraction_on_cache_hit(tmp_path, monkeypatch):
+    pdf = tmp_path / "invoice.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+
+    ocr = OCRService(cache=DiskCache(tmp_path / "cache", max_bytes=1024 * 1024))
+    calls = []
+
+    def fake_extract(path, file_hash=None):
+        calls.append(path)
+        return "INVOICE 42"
+
+    monkeypatch.setattr(ocr, "extract_from_pdf", fake_extract)
+
+    assert ocr.extract_text(str(pdf)) == "INVOICE 42"
+    assert ocr.extract_text(str(pdf)) == "INVOICE 42"
+    assert len(calls) == 1
+
+    # Same bytes under another name are a hit as well
+    copy = tmp_path / "resent.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    assert ocr.extract_text(str(copy)) == "INVOICE 42"
+    assert len(calls) == 1
@@ -0,0 +1,115 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from pdfminer.high_level import extract_text
+from prometheus_client import REGISTRY
+from backend.app.config import settings
+from backend.app.services import ocr_adapter
+from backend.app.services.ocr_adapter import OCRService, split_pages
+from backend.app.utils.disk_cache import DiskCache
+
+
+def make_pdf(path, pages):
+    c = canvas.Canvas(str(path), pagesize=A4)
+    for n in range(pages):
+        c.drawString(50, 800, f"Page {n + 1} item WIDGET-{n}")
+        c.showPage()
+    c.save()
+
+
+def test_page_parallel_extraction_matches_single_pass(tmp_path):
+    pdf = tmp_path / "consolidated.pdf"
+    make_pdf(pdf, 10)
+
+    result = OCRService(cache=None).extract_pdf_pages(str(pdf))
+
+    assert result["text"] == extract_text(str(pdf))
+    assert len(result["pages"]) == 10
+    for n, (page, (start, end)) in enumerate(zip(result["pages"], result["boundaries"])):
+        assert f"Page {n + 1} " in page
+        assert result["text"][start:end] == page
+
+
+def test_split_pages_drops_trailing_break():
+    assert split_pages("a\fbc\f") == {"pages": ["a", "bc"], "boundaries": [(0, 1), (2, 4)]}
+
+
+def make_mixed_pdf(path):
+    """
+    Page 1 has a text layer, page 2 only a drawn shape (like a scan).
+    """
+    c = canvas.Canvas(str(path), pagesize=A4)
+    c.drawString(50, 800, "Invoice INV-1 page one with a real text layer")
+    c.showPage()
+    c.rect(50, 500, 200, 200, fill=1)
+    c.showPage()
+    c.save()
+
+
+def test_only_pages_without_text_are_ocrd_and_cached(tmp_path, monkeypatch):
+    pdf = tmp_path / "mixed.pdf"
+    make_mixed_pdf(pdf)
+    calls = []
+
+    def fake_ocr(file_path, index, dpi):
+        calls.append((index, dpi))
+        return f"scanned page {index + 1} Total 100"
+
+    monkeypatch.setattr(ocr_adapter, "tesseract_version", lambda: "5.3.0")
+    monkeypatch.setattr(ocr_adapter, "ocr_pdf_page", fake_ocr)
+    monkeypatch.setattr(settings, "PDF_OCR_DPI", 200)
+    cache = DiskCache(tmp_path / "cache", max_bytes=1024 * 1024)
+
+    result = OCRService(cache=cache).extract_pdf_pages(str(pdf))
+    again = OCRService(cache=cache).extract_pdf_pages(str(pdf))
+
+    assert "real text layer" in result["pages"][0]
+    assert result["pages"][1] == "scanned page 2 Total 100"
+    assert again["text"] == result["text"]
+    assert calls == [(1, 200)]
+
+
+def ocr_samples():
+    return {
+        engine: REGISTRY.get_sample_value("ocr_duration_seconds_count", {"engine": engine}) or 0
+        for engine in ("cache", "pdfminer", "tesseract")
+    }
+
+
+def test_ocr_time_is_observed_per_engine_and_cache_only_on_hits(tmp_path, monkeypatch):
+    pdf = tmp_path / "mixed.pdf"
+    make_mixed_pdf(pdf)
+    monkeypatch.setattr(ocr_adapter, "tesseract_version", lambda: "5.3.0")
+    monkeypatch.setattr(ocr_adapter, "ocr_pdf_page", lambda file_path, index, dpi: "scanned page Total 100")
+    service = OCRService(cache=DiskCache(tmp_path / "cache", max_bytes=1024 * 1024))
+
+    before = ocr_samples()
+    service.extract_text(str(pdf))
+    after_miss = ocr_samples()
+    service.extract_text(str(pdf))
+    after_hit = ocr_samples()
+
+    # Miss: one text-layer pass and one OCR'd page, no cache sample
+    assert {k: after_miss[k] - before[k] for k in before} == {"cache": 0, "pdfminer": 1, "tesseract": 1}
+    assert {k: after_hit[k] - after_miss[k] for k in before} == {"cache": 1, "pdfminer": 0, "tesseract": 0}
+
+
+def test_scanned_page_is_rasterized_at_configured_dpi(tmp_path):
+    pdf = tmp_path / "mixed.pdf"
+    make_mixed_pdf(pdf)
+    width, height = ocr_adapter.render_pdf_page(str(pdf), 1, dpi=144).size
+
+    # A4 is 595 x 842 points; 144 dpi doubles that
+    assert abs(width - 1190) <= 2 and abs(height - 1684) <= 2
+
+
+def test_only_ocr_pool_workers_count_as_worker_processes():
+    # A process started by multiprocessing for another reason (uvicorn
+    # --workers / --reload) still fans OCR out to the pool
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+        assert pool.submit(ocr_adapter.in_worker_process).result() is False
+    with ProcessPoolExecutor(max_workers=1, mp_context=spawn, initializer=ocr_adapter.mark_worker_process) as pool:
+        assert pool.submit(ocr_adapter.in_worker_process).result() is True
+    assert ocr_adapter.in_worker_process() is False
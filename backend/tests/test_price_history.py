@@ -0,0 +1,101 @@
+import numpy as np
+from sqlmodel import Session, select
+from backend.app.db import crud
+from backend.app.db.models import InvoiceItemRates, VendorItemRate
+from backend.app.services.matcher import MatcherService
+from backend.app.services.price_history import PriceHistoryService
+from backend.app.utils import rate_stats
+
+RATES = [100.0, 102.0, 98.0, 101.0, 99.0, 100.5]
+
+
+def invoice(rate, description="Steel Rod 12mm"):
+    return {"doc_number": "INV", "vendor_name": "Acme Steel", "vendor_gstin": "29ABCDE1234F1Z5", "grand_total": rate * 10,
+            "items": [{"description": description, "qty": 10, "rate": rate, "line_total": rate * 10}]}
+
+
+def seed(session, rates):
+    company = crud.create_company(session, name="Acme")
+    ids = []
+    for n, rate in enumerate(rates):
+        ids.append(crud.create_document(session, company.id, f"inv{n}.pdf", "INVOICE").id)
+        crud.update_document_parsed(session, ids[-1], invoice(rate))
+    return company.id, ids
+
+
+def test_welford_add_and_remove_match_numpy():
+    stats = rate_stats.RateAccumulator()
+    for rate in RATES + [250.0]:
+        rate_stats.add_rate(stats, rate)
+    rate_stats.remove_rate(stats, 250.0)
+
+    assert stats.count == len(RATES)
+    assert np.isclose(stats.mean, np.mean(RATES))
+    assert np.isclose(rate_stats.std(stats), np.std(RATES, ddof=1))
+    assert rate_stats.without(RATES + [250.0], [250.0]) == RATES
+    assert np.allclose(rate_stats.quantiles_of(RATES), np.quantile(RATES, rate_stats.QUANTILES))
+
+
+def stored_history(session):
+    row = session.exec(select(VendorItemRate)).one()
+    invoices = session.exec(select(InvoiceItemRates).order_by(InvoiceItemRates.document_id)).all()
+    return (row.count, row.mean, row.m2), [(i.document_id, i.rates) for i in invoices]
+
+
+def test_reparse_replaces_rates_and_rebuild_agrees(engine):
+    with Session(engine) as session:
+        company_id, ids = seed(session, RATES)
+        crud.update_document_parsed(session, ids[0], invoice(110.0))
+        crud.update_document_parsed(session, ids[0], invoice(110.0))
+
+        expected = [110.0] + RATES[1:]
+        (count, mean, m2), invoices = incremental = stored_history(session)
+        assert count == len(RATES)
+        assert np.isclose(mean, np.mean(expected))
+        assert np.isclose(m2, np.var(expected) * len(expected))
+        assert invoices == [(doc_id, {"steel rod 12mm": [rate]}) for doc_id, rate in zip(ids, expected)]
+
+    assert PriceHistoryService(engine).rebuild(company_id) == {"invoices": len(RATES), "items": 1}
+    with Session(engine) as session:
+        (count, mean, m2), invoices = stored_history(session)
+        assert count == incremental[0][0]
+        assert np.allclose((mean, m2), incremental[0][1:])
+        assert invoices == incremental[1]
+
+
+def test_rate_outside_history_is_flagged(engine):
+    history = PriceHistoryService(engine)
+    matcher = MatcherService()
+    with Session(engine) as session:
+        company_id, ids = seed(session, RATES)
+        spike, usual = invoice(150.0), invoice(101.5)
+
+        baselines = history.baselines(session, company_id, spike, exclude_own=False)
+        result = matcher.match(spike, spike, rate_baselines=baselines)
+        assert [m["type"] for m in result["mismatches"]] == ["rate_above_history"]
+        assert result["fraud_flags"] == ["rate_spike"]
+
+        result = matcher.match(usual, usual, rate_baselines=history.baselines(session, company_id, usual, exclude_own=False))
+        assert result["mismatches"] == [] and result["fraud_flags"] == []
+
+        # A stored spike is judged against the other invoices only
+        crud.update_document_parsed(session, ids[-1], spike)
+        baselines = history.baselines(session, company_id, spike)
+        assert baselines["steel rod 12mm"].count == len(RATES) - 1
+        assert matcher.match(spike, spike, rate_baselines=baselines)["fraud_flags"] == ["rate_spike"]
+
+        # Too little history for an item: nothing to judge against
+        other = invoice(500.0, description="Copper Wire")
+        assert history.baselines(session, company_id, other, exclude_own=False) == {}
+
+
+def test_recent_window_follows_reparses(engine):
+    history = PriceHistoryService(engine)
+    with Session(engine) as session:
+        company_id, ids = seed(session, RATES)
+        vendor = rate_stats.item_rates(invoice(1.0))[0][0]
+        assert history.recent_rates(session, company_id, vendor) == [{"steel rod 12mm": [r]} for r in reversed(RATES)]
+
+        # The re-parsed invoice's rates replace the decoded ones kept from the first read
+        crud.update_document_parsed(session, ids[-1], invoice(150.0))
+        assert history.recent_rates(session, company_id, vendor)[0] == {"steel rod 12mm": [150.0]}
@@ -0,0 +1,60 @@
+from sqlmodel import select
+from backend.app.db import crud
+from backend.app.db.models import Match
+from backend.app.services.reconciler import CandidateIndex, ReconciliationService
+
+
+def test_candidate_index_prefers_po_reference_then_supplier_then_amount():
+    pos = [
+        (1, {"doc_number": "PO-1001", "vendor_name": "Acme", "grand_total": 1000}),
+        (2, {"doc_number": "PO-1002", "vendor_name": "Acme", "grand_total": 5000}),
+        (3, {"doc_number": "PO-1003", "vendor_name": "Globex", "grand_total": 1010}),
+    ]
+    index = CandidateIndex(pos, band_width=0.05)
+
+    assert index.candidates({"vendor_name": "Globex"}, ocr_text="Against PO-1002") == {2}
+    assert index.candidates({"vendor_name": "ACME ", "grand_total": 4990}) == {2}
+    assert index.candidates({"vendor_name": "Unknown", "grand_total": 1005}) == {1, 3}
+
+
+def test_reconcile_persists_best_po_per_invoice(session, add_doc):
+    company = crud.create_company(session, name="Acme Buyer")
+    item = [{"description": "widget", "qty": 1, "rate": 100, "line_total": 100}]
+
+    po_a = add_doc(session, company.id, "PO", {"doc_number": "PO-7", "vendor_name": "Acme", "grand_total": 100, "items": item})
+    add_doc(session, company.id, "PO", {"doc_number": "PO-8", "vendor_name": "Acme", "grand_total": 900, "items": item})
+    inv = add_doc(session, company.id, "INVOICE", {"vendor_name": "Acme", "grand_total": 101, "items": item})
+    add_doc(session, company.id, "INVOICE", {"vendor_name": "Nobody", "grand_total": 5})
+
+    progress = []
+    summary = ReconciliationService(workers=1).reconcile(session, company.id, progress=progress.append)
+
+    assert summary["matched"] == 1
+    assert summary["unmatched"] == 1
+    assert summary["pairs_scored"] == 1
+    assert progress[-1] == 1.0
+
+    matches = session.exec(select(Match)).all()
+    assert [(m.po_id, m.invoice_id, m.status) for m in matches] == [(po_a.id, inv.id, "Matched")]
+
+
+def test_reconcile_again_updates_the_stored_match_in_place(session, add_doc):
+    company = crud.create_company(session, name="Acme Buyer")
+    item = [{"description": "widget", "qty": 1, "rate": 100, "line_total": 100}]
+
+    add_doc(session, company.id, "PO", {"doc_number": "PO-7", "vendor_name": "Acme", "grand_total": 100, "items": item})
+    inv = add_doc(session, company.id, "INVOICE", {"vendor_name": "Acme", "grand_total": 100, "items": item})
+
+    service = ReconciliationService(workers=1)
+    assert service.reconcile(session, company.id)["created"] == 1
+    again = service.reconcile(session, company.id)
+    assert (again["unchanged"], again["invoices_fresh"], again["pairs_scored"]) == (1, 1, 0)
+
+    changed = [{"description": "widget", "qty": 1, "rate": 120, "line_total": 120}]
+    crud.update_document_parsed(session, inv.id, {"vendor_name": "Acme", "grand_total": 120, "items": changed})
+    changed_run = service.reconcile(session, company.id)
+    assert (changed_run["updated"], changed_run["invoices_fresh"], changed_run["pairs_scored"]) == (1, 0, 1)
+
+    matches = session.exec(select(Match)).all()
+    assert len(matches) == 1
+    assert matches[0].status != "Matched"
@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+from backend.app.db import crud
+from backend.app.db.session import get_session
+from backend.app.main import app
+from backend.app.services.matcher import match_fingerprint
+from backend.app.services.rematch import RematchService
+
+PO = {"doc_number": "PO-1", "vendor_name": "Acme", "grand_total": 100.0,
+      "items": [{"description": "Widget", "quantity": 10, "rate": 10.0, "total": 100.0}]}
+INV = {"doc_number": "INV-1", "vendor_name": "Acme", "grand_total": 100.0,
+       "items": [{"description": "Widget", "quantity": 10, "rate": 10.0, "total": 100.0}]}
+
+
+def seed(session, add_doc):
+    company = crud.create_company(session, name="Acme")
+    docs = {}
+    for name, doc_type, parsed in (("po", "PO", PO), ("inv", "INVOICE", INV), ("other", "INVOICE", INV)):
+        docs[name] = add_doc(session, company.id, doc_type, parsed, filename=f"{name}.pdf").id
+    return company.id, docs
+
+
+def test_fingerprint_ignores_key_order_but_not_values():
+    assert match_fingerprint(PO, INV) == match_fingerprint(dict(reversed(PO.items())), INV)
+    assert match_fingerprint(PO, INV) != match_fingerprint(PO, {**INV, "grand_total": 120.0})
+
+
+def test_reparse_recomputes_only_changed_matches(session, add_doc):
+    company_id, docs = seed(session, add_doc)
+    rematch = RematchService()
+    for inv in ("inv", "other"):
+        crud.create_match(session, company_id, docs["po"], docs[inv], "Matched", [], [], 100.0,
+                          fingerprint=match_fingerprint(PO, INV))
+
+    # Same parse again: nothing to recompute
+    assert rematch.rematch_document(session, docs["inv"]) == {"checked": 1, "recomputed": 0}
+
+    crud.update_document_parsed(session, docs["inv"], {**INV, "grand_total": 150.0})
+    assert rematch.rematch_document(session, docs["inv"]) == {"checked": 1, "recomputed": 1}
+
+    changed = crud.get_latest_match(session, company_id, docs["po"], docs["inv"])
+    untouched = crud.get_latest_match(session, company_id, docs["po"], docs["other"])
+    assert changed.status != "Matched"
+    assert any(m["type"] == "total_mismatch" for m in changed.mismatches)
+    assert untouched.status == "Matched"
+
+
+def test_match_endpoint_reuses_unchanged_result(session, add_doc):
+    company_id, docs = seed(session, add_doc)
+    app.dependency_overrides[get_session] = lambda: session
+    try:
+        client = TestClient(app)
+        body = {"company_id": company_id, "po_id": docs["po"], "invoice_id": docs["inv"]}
+
+        first = client.post("/api/match", json=body).json()["data"]
+        second = client.post("/api/match", json=body).json()["data"]
+        assert (first["unchanged"], second["unchanged"]) == (False, True)
+        assert second["match_id"] == first["match_id"]
+
+        crud.update_document_parsed(session, docs["inv"], {**INV, "grand_total": 150.0})
+        third = client.post("/api/match", json=body).json()["data"]
+        assert third["unchanged"] is False
+        assert third["match_id"] == first["match_id"]
+        assert third["result"]["score"] < first["result"]["score"]
+    finally:
+        app.dependency_overrides.pop(get_session, None)
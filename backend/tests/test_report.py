@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+from backend.app.services.report import ReportService
+
+
+PO = {"doc_number": "PO-1", "vendor_name": "Acme", "grand_total": 100}
+INV = {"doc_number": "INV-1", "vendor_name": "Acme", "grand_total": 104}
+RESULT = {"score": 90, "mismatches": [{"type": "grand_total_mismatch"}], "fraud_flags": []}
+
+
+def test_report_is_rendered_once_per_content(tmp_path):
+    service = ReportService(output_dir=str(tmp_path))
+    calls = []
+    render = service._render
+    service._render = lambda *args: (calls.append(1), render(*args))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: service.get_or_render(1, PO, INV, RESULT), range(8)))
+
+    assert len({key for _, key in results}) == 1
+    assert len(calls) == 1
+    assert results[0][0].read_bytes().startswith(b"%PDF")
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_report_key_changes_with_result(tmp_path):
+    service = ReportService(output_dir=str(tmp_path))
+    changed = dict(RESULT, score=70)
+
+    assert service.report_key(1, PO, INV, RESULT) == service.report_key(1, dict(PO, notes="x"), INV, RESULT)
+    assert service.report_key(1, PO, INV, RESULT) != service.report_key(1, PO, INV, changed)
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from backend.app.api import dependencies
+from backend.app.api.dependencies import ServiceContainer
+from backend.app.main import app
+
+# Without a `with` block TestClient doesn't run the lifespan, so app.state is set by hand
+client = TestClient(app)
+
+
+def test_ready_is_503_until_warm_up_then_reports_failed_steps(monkeypatch):
+    services = ServiceContainer()
+    for service in (services.llm, services.storage, services.templates):
+        monkeypatch.setattr(service, "warm_up", lambda: None)
+
+    def missing_tesseract():
+        raise RuntimeError("Tesseract binary not found")
+
+    monkeypatch.setattr(services.ocr, "warm_up", missing_tesseract)
+    monkeypatch.setattr(app.state, "services", services, raising=False)
+
+    res = client.get("/api/ready")
+    assert (res.status_code, res.json()) == (503, {"status": "warming_up"})
+
+    services.warm_up()
+    res = client.get("/api/ready")
+    assert res.status_code == 200
+    assert res.json() == {"status": "ready", "warmup_errors": {"ocr": "Tesseract binary not found"}}
+
+
+def test_routes_get_services_from_the_app_container(monkeypatch):
+    services = ServiceContainer()
+    services.llm = SimpleNamespace(cache=SimpleNamespace(stats=lambda: {"hits": 7}))
+    monkeypatch.setattr(app.state, "services", services, raising=False)
+
+    assert client.get("/api/cache/llm").json()["data"] == {"enabled": True, "hits": 7}
+
+
+def test_without_an_app_container_one_fallback_is_built_and_warmed(monkeypatch):
+    built = []
+
+    class StubContainer:
+        def __init__(self):
+            built.append(self)
+            self.ready, self.warmup_errors = False, {}
+            self.llm = SimpleNamespace(cache=None)
+
+        def warm_up(self):
+            self.ready = True
+
+    monkeypatch.setattr(dependencies, "ServiceContainer", StubContainer)
+    monkeypatch.setattr(dependencies, "_fallback", None)
+    monkeypatch.delattr(app.state, "services", raising=False)
+
+    assert client.get("/api/ready").json() == {"status": "ready", "warmup_errors": {}}
+    assert client.get("/api/cache/llm").json()["data"] == {"enabled": False}
+    assert len(built) == 1
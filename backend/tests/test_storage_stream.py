@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import io
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.config import settings
+from backend.app.main import UPLOAD_FORM_OVERHEAD_BYTES, app
+from backend.app.services.storage import StorageService
+from backend.app.utils.file_helpers import FileTooLargeError
+
+
+class FakeUpload:
+    def __init__(self, data: bytes):
+        self.buf = io.BytesIO(data)
+        self.reads = []
+
+    async def read(self, n: int = -1) -> bytes:
+        chunk = self.buf.read(n)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_TYPE", "local")
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE_KB", 64)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_MB", 1)
+    return StorageService()
+
+
+def test_save_stream_writes_in_chunks_and_hashes(local_storage, tmp_path):
+    data = b"%PDF" + b"x" * 300_000
+    upload = FakeUpload(data)
+
+    saved = asyncio.run(local_storage.save_stream(upload, "doc.pdf"))
+
+    assert saved["sha256"] == hashlib.sha256(data).hexdigest()
+    assert saved["size"] == len(data)
+    assert (tmp_path / "doc.pdf").read_bytes() == data
+    assert max(upload.reads) <= 64 * 1024
+
+
+def test_save_stream_aborts_once_limit_is_crossed(local_storage, tmp_path):
+    upload = FakeUpload(b"x" * (3 * 1024 * 1024))
+
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(local_storage.save_stream(upload, "big.pdf"))
+
+    # Stopped reading right after the limit and left nothing behind
+    assert sum(upload.reads) <= 1024 * 1024 + 64 * 1024
+    assert list(tmp_path.iterdir()) == []
+
+
+def multipart_body(data: bytes, boundary: str = "limit-test") -> bytes:
+    fields = [(b'name="company_id"', b"1"), (b'name="doc_type"', b"INVOICE"),
+              (b'name="file"; filename="big.pdf"\r\nContent-Type: application/pdf', data)]
+    body = b"".join(b"--%s\r\nContent-Disposition: form-data; %s\r\n\r\n%s\r\n" % (boundary.encode(), header, value)
+                    for header, value in fields)
+    return body + b"--%s--\r\n" % boundary.encode()
+
+
+def test_upload_route_refuses_oversized_body_before_reading_it(local_storage, tmp_path):
+    body = multipart_body(b"x" * (3 * 1024 * 1024))
+    headers = {"Content-Type": "multipart/form-data; boundary=limit-test"}
+
+    with TestClient(app) as client:
+        response = client.post("/api/upload", content=body, headers=headers)
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chunked_upload_is_cut_off_once_limit_is_crossed(local_storage, tmp_path):
+    body = multipart_body(b"x" * (3 * 1024 * 1024))
+    pieces = [body[start:start + 64 * 1024] for start in range(0, len(body), 64 * 1024)]
+    received, sent = [], []
+
+    async def receive():
+        received.append(pieces.pop(0))
+        return {"type": "http.request", "body": received[-1], "more_body": bool(pieces)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/upload", "headers": [
+        (b"content-type", b"multipart/form-data; boundary=limit-test")]}
+    asyncio.run(app(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    assert sum(map(len, received)) <= 1024 * 1024 + UPLOAD_FORM_OVERHEAD_BYTES + 64 * 1024
+    assert list(tmp_path.iterdir()) == []
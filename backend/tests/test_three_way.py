@@ -0,0 +1,79 @@
+from fastapi.testclient import TestClient
+from backend.app.db import crud
+from backend.app.db.session import get_session
+from backend.app.main import app
+from backend.app.services.matcher import MatcherService
+from backend.app.services.rematch import RematchService
+
+PO = {"date": "2024-01-01", "vendor_name": "Acme", "items": [
+    {"description": "Steel bolt M8", "qty": 100, "rate": 2.0},
+    {"description": "Copper wire 2mm", "qty": 50, "rate": 10.0},
+    {"description": "White paint 1L", "qty": 10, "rate": 5.0},
+]}
+GRN = {"date": "2024-01-05", "items": [
+    {"description": "Steel bolt M8", "qty": 60},
+    {"description": "Copper wire 2mm", "qty": 50},
+]}
+
+
+def invoice(bolts=60, wire_rate=10.0, paint=0):
+    items = [{"description": "Steel bolt M8", "qty": bolts, "rate": 2.0},
+             {"description": "Copper wire 2mm", "qty": 50, "line_total": 50 * wire_rate}]
+    if paint:
+        items.append({"description": "White paint 1L", "qty": paint, "rate": 5.0})
+    return {"date": "2024-01-06", "vendor_name": "Acme", "items": items}
+
+
+def test_partial_delivery_billed_as_received_is_clean():
+    result = MatcherService().match_three_way(PO, invoice(), GRN)
+    assert result["mismatches"] == [] and result["fraud_flags"] == []
+    lines = {line["description"]: line for line in result["line_variances"]}
+    assert lines["Steel bolt M8"]["issues"] == ["short_delivery"]
+    assert lines["Steel bolt M8"]["delivery_qty_variance"] == -40
+    assert lines["White paint 1L"]["issues"] == ["open"]
+
+
+def test_over_billing_rate_drift_and_billing_without_delivery():
+    result = MatcherService().match_three_way(PO, invoice(bolts=80, wire_rate=11.0, paint=10), GRN)
+    types = [m["type"] for m in result["mismatches"]]
+    assert "billed_qty_exceeds_delivered" in types
+    assert "item_rate_mismatch" in types          # rate derived from line_total / qty
+    assert "item_not_delivered" in types
+    assert "billed_amount_exceeds_delivered_value" in types
+    assert result["fraud_flags"] == ["billed_without_delivery"]
+    bolts = result["line_variances"][0]
+    assert (bolts["ordered_qty"], bolts["delivered_qty"], bolts["billed_qty"]) == (100, 60, 80)
+    assert bolts["amount_variance"] == 40
+
+
+def test_day_first_delivery_date_before_po_is_flagged():
+    po = {**PO, "date": "15/03/2024"}
+    result = MatcherService().match_three_way(po, {**invoice(), "date": "20/03/2024"}, {**GRN, "date": "02/03/2024"})
+    assert result["fraud_flags"] == ["delivery_date_before_po"]
+
+
+def test_three_way_match_is_stored_and_rematched(session, add_doc):
+    company_id = crud.create_company(session, name="Acme").id
+    ids = {}
+    for name, doc_type, parsed in (("po", "PO", PO), ("inv", "INVOICE", invoice()), ("grn", "DELIVERY", GRN)):
+        ids[name] = add_doc(session, company_id, doc_type, parsed, filename=f"{name}.pdf").id
+
+    app.dependency_overrides[get_session] = lambda: session
+    try:
+        body = {"company_id": company_id, "po_id": ids["po"], "invoice_id": ids["inv"], "delivery_id": ids["grn"]}
+        client = TestClient(app)
+        # An invoice passed as the delivery note is refused
+        wrong = client.post("/api/match", json={**body, "delivery_id": ids["inv"]})
+        assert wrong.status_code == 400
+        data = client.post("/api/match", json=body).json()["data"]
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+    assert data["result"]["score"] == 100
+    assert len(data["result"]["line_variances"]) == 3
+
+    # A corrected delivery note changes the three-way result
+    crud.update_document_parsed(session, ids["grn"], {**GRN, "items": GRN["items"][:1]})
+    assert RematchService().rematch_document(session, ids["grn"]) == {"checked": 1, "recomputed": 1}
+    match = crud.get_match(session, data["match_id"])
+    assert match.delivery_id == ids["grn"]
+    assert "item_not_delivered" in [m["type"] for m in match.mismatches]
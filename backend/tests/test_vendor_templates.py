@@ -0,0 +1,109 @@
+import pytest
+from backend.app.db import crud
+from backend.app.services.vendor_templates import VendorTemplateService, derive_template, validate_totals
+
+
+def invoice_text(number: str, lines, gst: float) -> str:
+    rows = "\n".join(
+        f"{n + 1}  {desc}  {qty}  pcs  {rate:,.2f}  {qty * rate:,.2f}"
+        for n, (desc, qty, rate) in enumerate(lines)
+    )
+    subtotal = sum(qty * rate for _, qty, rate in lines)
+    return (
+        "ACME FASTENERS PVT LTD\n"
+        "GSTIN: 29ABCDE1234F1Z5\n"
+        f"Invoice No: {number}      Date: 12/03/2024\n"
+        "Bill To: Buyer Industries  GSTIN: 27PQRSX9876L1Z2\n\n"
+        "S.No  Description  Qty  Unit  Rate  Amount\n"
+        f"{rows}\n\n"
+        f"Sub Total:  {subtotal:,.2f}\n"
+        f"CGST @9%:  {gst / 2:,.2f}\n"
+        f"SGST @9%:  {gst / 2:,.2f}\n"
+        f"Grand Total:  {subtotal + gst:,.2f}\n"
+    )
+
+
+LINES = [("Hex Bolt M8", 100, 2.5), ("Spring Washer", 200, 0.75), ("Lock Nut M8", 100, 1.2)]
+PARSED = {
+    "doc_type": "INVOICE",
+    "doc_number": "INV-1001",
+    "date": "12/03/2024",
+    "vendor_name": "Acme Fasteners Pvt Ltd",
+    "vendor_gstin": "29ABCDE1234F1Z5",
+    "items": [
+        {"description": "Hex Bolt M8", "qty": 100, "unit": "pcs", "rate": 2.5, "line_total": 250.0},
+        {"description": "Spring Washer", "qty": 200, "unit": "pcs", "rate": 0.75, "line_total": 150.0},
+        {"description": "Lock Nut M8", "qty": 100, "unit": "pcs", "rate": 1.2, "line_total": 120.0},
+    ],
+    "subtotal": 520.0,
+    "taxes": [{"type": "CGST", "amount": 46.8}, {"type": "SGST", "amount": 46.8}],
+    "grand_total": 613.6,
+    "currency": "INR",
+}
+
+
+@pytest.fixture
+def service(engine):
+    return VendorTemplateService(engine=engine)
+
+
+def test_validation_checks_line_and_tax_totals():
+    assert validate_totals(PARSED)
+    assert not validate_totals(dict(PARSED, grand_total=700.0))
+    assert not validate_totals(dict(PARSED, subtotal=600.0))
+    assert not validate_totals(dict(PARSED, items=[]))
+
+
+def test_template_learned_from_llm_result_parses_next_invoice(service):
+    assert service.learn(invoice_text("INV-1001", LINES, 93.6), PARSED) is not None
+
+    # Different number, items and totals, same layout
+    lines = [("Hex Bolt M10", 50, 4.0), ("Flat Washer", 500, 0.2), ("Anchor Bolt", 10, 35.5), ("Lock Nut M8", 40, 1.2)]
+    subtotal = sum(q * r for _, q, r in lines)
+    parsed = service.extract(invoice_text("INV-2002", lines, round(subtotal * 0.18, 2)))
+
+    assert parsed["doc_number"] == "INV-2002"
+    assert parsed["vendor_gstin"] == "29ABCDE1234F1Z5"
+    assert [item["description"] for item in parsed["items"]] == [d for d, _, _ in lines]
+    assert parsed["items"][2] == {"description": "Anchor Bolt", "qty": 10.0, "unit": "pcs", "rate": 35.5, "line_total": 355.0}
+    assert parsed["grand_total"] == round(subtotal * 1.18, 2)
+    assert {t["type"] for t in parsed["taxes"]} == {"CGST", "SGST"}
+
+
+def test_unknown_vendor_or_inconsistent_totals_fall_back(service):
+    service.learn(invoice_text("INV-1001", LINES, 93.6), PARSED)
+
+    other_vendor = invoice_text("X-1", LINES, 93.6).replace("29ABCDE1234F1Z5", "07ZZZZZ0000Z1Z9").replace("ACME", "OTHER")
+    assert service.extract(other_vendor) is None
+
+    broken = invoice_text("INV-3003", LINES, 93.6).replace("Grand Total:  613.60", "Grand Total:  999.00")
+    assert service.extract(broken) is None
+
+
+def test_templates_are_only_tried_on_their_own_doc_type(service):
+    text = invoice_text("INV-1001", LINES, 93.6)
+    service.learn(text, dict(PARSED, doc_type="TAX INVOICE"), doc_type="INVOICE")
+
+    assert service.extract(text, doc_type="INVOICE")["doc_type"] == "INVOICE"
+    assert service.extract(text, doc_type="PO") is None
+    assert service.extract(text, doc_type="DELIVERY") is None
+
+
+def test_no_template_from_unverifiable_results():
+    text = invoice_text("INV-1001", LINES, 93.6)
+
+    assert derive_template(text, dict(PARSED, grand_total=700.0)) is None
+    wrong_item = dict(PARSED["items"][0], description="Not On The Page")
+    assert derive_template(text, dict(PARSED, items=[wrong_item] + PARSED["items"][1:])) is None
+
+
+def test_unchanged_template_is_not_stored_again(service, monkeypatch):
+    text = invoice_text("INV-1001", LINES, 93.6)
+    assert service.learn(text, PARSED) is not None
+
+    writes = []
+    monkeypatch.setattr(service, "reload", lambda: writes.append("reload"))
+    monkeypatch.setattr(crud, "upsert_vendor_template", lambda *args, **kwargs: writes.append("upsert"))
+
+    assert service.learn(text, PARSED) is not None
+    assert writes == []
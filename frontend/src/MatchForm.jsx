@@ -40,9 +40,9 @@ export default function MatchForm({ companyId }) {
         <div className="mt-3">
           <h3 className="font-semibold">Result</h3>
           <pre className="bg-gray-100 p-2 rounded max-h-60 overflow-auto">{JSON.stringify(result, null, 2)}</pre>
-          {result.report_path && (
+          {result.report_url && (
             <div className="mt-2">
-              <a href={`http://127.0.0.1:8000/${result.report_path}`} target="_blank" rel="noreferrer" className="text-blue-600 underline">Open Report</a>
+              <a href={`http://127.0.0.1:8000${result.report_url}`} target="_blank" rel="noreferrer" className="text-blue-600 underline">Open Report</a>
             </div>
           )}
         </div>